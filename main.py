@@ -1,6 +1,10 @@
 if __name__ == "__main__":
 
     import sys
+    from multiprocessing import freeze_support
+
+    # Required by worker processes in packaged (frozen) application
+    freeze_support()
 
     from virtual_warehouse import app
 
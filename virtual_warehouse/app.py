@@ -30,6 +30,7 @@ def run():
     engine = QQmlApplicationEngine()
 
     controller = ViewController()
+    app.aboutToQuit.connect(controller.shutdown)
     engine.rootContext().setContextProperty("ViewController", controller)
     engine.rootContext().setContextProperty("versionNumber", __version__)
 
@@ -0,0 +1,251 @@
+"""Native classification of custom classes defined by simple restrictions.
+
+Conditions made of classes, value restrictions (e.g. ``has_zone.value("A")``) and
+range restrictions (e.g. ``has_max_weight.some(ConstrainedDatatype(float,
+min_exclusive=500))``) combined by ``&`` and ``|`` are evaluated directly over
+tables of the quadstore. Other class expressions (negation, cardinality,
+universal restrictions, ...) require DL reasoning and are left to the reasoner.
+"""
+import datetime
+
+from owlready2 import (
+    SOME,
+    VALUE,
+    And,
+    ConstrainedDatatype,
+    Or,
+    Restriction,
+    ThingClass,
+    rdf_type,
+)
+from owlready2.base import to_literal
+from owlready2.class_construct import _PY_FACETS
+
+# Facets of ConstrainedDatatype mapped to SQL comparison operators
+FACETS = {
+    "min_inclusive": ">=",
+    "min_exclusive": ">",
+    "max_inclusive": "<=",
+    "max_exclusive": "<",
+}
+DATATYPES = (bool, int, float, str, datetime.date, datetime.datetime)
+
+
+class UnsupportedExpression(Exception):
+    """Class expression can't be evaluated without reasoner."""
+
+
+class Classifier:
+    """Evaluates simple class expressions into storage ids of individuals."""
+
+    def __init__(self, world):
+        """Initialize classifier.
+
+        Args:
+            world (World): ontology world containing the individuals
+        """
+        self.world = world
+        self.graph = world.graph
+        # Named classes which are being evaluated (prevents infinite recursion)
+        self._visiting = set()
+
+    def _select(self, sql, params=()):
+        """Get set of subjects selected by SQL query."""
+        return {row[0] for row in self.graph.execute(sql, params)}
+
+    @staticmethod
+    def _properties(prop):
+        """Get storage ids of property and its sub-properties."""
+        if not hasattr(prop, "descendants"):
+            # Inverse properties and property chains
+            raise UnsupportedExpression(prop)
+        storids = [p.storid for p in prop.descendants()]
+        return storids, ",".join("?" * len(storids))
+
+    def evaluate(self, construct):
+        """Get individuals belonging to class expression.
+
+        Args:
+            construct (ThingClass | Construct): class expression
+
+        Returns:
+            set[int]: storage ids of the individuals
+
+        Raises:
+            UnsupportedExpression: if the expression requires reasoner
+        """
+        if isinstance(construct, ThingClass):
+            return self._named(construct)
+        if isinstance(construct, And):
+            results = [self.evaluate(c) for c in construct.Classes]
+            return set.intersection(*results) if results else set()
+        if isinstance(construct, Or):
+            return set().union(*(self.evaluate(c) for c in construct.Classes))
+        if isinstance(construct, Restriction):
+            if construct.type == VALUE:
+                return self._value(construct.property, construct.value)
+            if construct.type == SOME:
+                return self._some(construct.property, construct.value)
+        raise UnsupportedExpression(construct)
+
+    def _named(self, cls):
+        """Get asserted instances of class (and sub-classes) or of its definition."""
+        if cls in self._visiting:
+            return set()
+        self._visiting.add(cls)
+        try:
+            storids = [c.storid for c in cls.descendants()]
+            marks = ",".join("?" * len(storids))
+            result = self._select(
+                f"SELECT s FROM objs WHERE p=? AND o IN ({marks})",
+                (rdf_type, *storids),
+            )
+            # Individuals matching definition of the class (e.g. RackLocation)
+            for construct in cls.equivalent_to:
+                result |= self.evaluate(construct)
+            return result
+        finally:
+            self._visiting.discard(cls)
+
+    def _value(self, prop, value):
+        """Get subjects with given value of the property."""
+        storids, marks = self._properties(prop)
+        if hasattr(value, "storid"):
+            return self._select(
+                f"SELECT s FROM objs WHERE p IN ({marks}) AND o=?",
+                (*storids, value.storid),
+            )
+        o, d = to_literal(value)
+        return self._select(
+            f"SELECT s FROM datas WHERE p IN ({marks}) AND o=? AND d=?",
+            (*storids, o, d),
+        )
+
+    def _some(self, prop, value):
+        """Get subjects with at least one value of the property in given range."""
+        storids, marks = self._properties(prop)
+        if isinstance(value, ConstrainedDatatype):
+            conditions, params = [], []
+            for facet in _PY_FACETS:
+                bound = getattr(value, facet, None)
+                if bound is None:
+                    continue
+                if facet not in FACETS:
+                    # Length and pattern facets
+                    raise UnsupportedExpression(value)
+                conditions.append(f"o {FACETS[facet]} ?")
+                params.append(to_literal(bound)[0])
+            numeric = value.base_datatype in (int, float)
+            # Numbers and literals stored as text must not be compared together
+            conditions.append(
+                "typeof(o) IN ('integer', 'real')" if numeric else "typeof(o)='text'"
+            )
+            return self._select(
+                f"SELECT s FROM datas WHERE p IN ({marks}) AND "
+                + " AND ".join(conditions),
+                (*storids, *params),
+            )
+        if value in DATATYPES:
+            return self._select(
+                f"SELECT s FROM datas WHERE p IN ({marks})", tuple(storids)
+            )
+        targets = self.evaluate(value)
+        return {
+            s
+            for s, o in self.graph.execute(
+                f"SELECT s, o FROM objs WHERE p IN ({marks})", tuple(storids)
+            )
+            if o in targets
+        }
+
+
+def classify(cls, world):
+    """Assert individuals belonging to definition of class as its instances.
+
+    Args:
+        cls (ThingClass): class defined by equivalent_to class expressions
+        world (World): ontology world containing the individuals
+
+    Returns:
+        bool: True if class was classified, False if it requires reasoner
+    """
+    classifier = Classifier(world)
+    storids = set()
+    try:
+        for construct in cls.equivalent_to:
+            storids |= classifier.evaluate(construct)
+    except UnsupportedExpression:
+        return False
+    assert_instances(cls, storids, world)
+    return True
+
+
+def assert_instances(cls, storids, world):
+    """Assert individuals as instances of class (e.g. inferred by reasoner).
+
+    Args:
+        cls (ThingClass): class of the individuals
+        storids (Iterable[int]): storage ids of the individuals
+        world (World): ontology world containing the individuals
+    """
+    c = cls.namespace.ontology.graph.c
+    graph = world.graph
+    graph.acquire_write_lock()
+    try:
+        graph.db.executemany(
+            "INSERT OR IGNORE INTO objs VALUES (?, ?, ?, ?)",
+            [(c, s, rdf_type, cls.storid) for s in storids],
+        )
+        graph.db.commit()
+    finally:
+        graph.release_write_lock()
+    # Update loaded individuals without writing the triples again
+    for s in storids:
+        entity = world._entities.get(s)
+        if entity is not None and cls not in entity.is_a:
+            entity.is_a._append(cls)
+
+
+def clear_instances(cls, world):
+    """Remove asserted instances of class (e.g. before classifying it again).
+
+    Args:
+        cls (ThingClass): class of the individuals
+        world (World): ontology world containing the individuals
+    """
+    graph = world.graph
+    graph.acquire_write_lock()
+    try:
+        storids = [
+            s
+            for (s,) in graph.execute(
+                "SELECT s FROM objs WHERE p=? AND o=?", (rdf_type, cls.storid)
+            )
+        ]
+        graph.execute("DELETE FROM objs WHERE p=? AND o=?", (rdf_type, cls.storid))
+        graph.db.commit()
+    finally:
+        graph.release_write_lock()
+    for s in storids:
+        entity = world._entities.get(s)
+        if entity is not None and cls in entity.is_a:
+            entity.is_a._remove(cls)
+
+
+def count_instances(cls, world):
+    """Get number of asserted instances of class without loading them.
+
+    Args:
+        cls (ThingClass): class of the individuals
+        world (World): ontology world containing the individuals
+
+    Returns:
+        int: number of instances
+    """
+    storids = [c.storid for c in cls.descendants()]
+    marks = ",".join("?" * len(storids))
+    ((count,),) = world.graph.execute(
+        f"SELECT COUNT(DISTINCT s) FROM objs WHERE p=? AND o IN ({marks})",
+        (rdf_type, *storids),
+    )
+    return count
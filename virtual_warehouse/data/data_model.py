@@ -3,12 +3,14 @@ import datetime
 from typing import List
 
 from owlready2 import (
+    LOADING,
     FunctionalProperty,
     Thing,
     default_world,
     destroy_entity,
     get_ontology,
 )
+from owlready2.base import owl_named_individual, rdf_type
 
 from virtual_warehouse.data.utils import (
     convert_date,
@@ -20,6 +22,12 @@ from virtual_warehouse.data.utils import (
 # We could use actual irl with already created ontology
 BASE_IRI = "http://warehouse/onto.owl"
 onto = get_ontology(BASE_IRI)
+# Individuals of each dataset are stored in separate sub-ontology (named graph), so
+# that the dataset can be removed at once. Their IRIs use namespace of onto.
+DATASETS = {
+    name: get_ontology(f"http://warehouse/{name}.owl")
+    for name in ("locations", "items", "inventory", "orders")
+}
 
 
 def destroy_all(cls):
@@ -32,13 +40,176 @@ def destroy_all(cls):
         destroy_entity(i)
 
 
-def save_ontology(file_path):
-    """Save ontology in RDF/XML format.
+def clear_dataset(name, references=True):
+    """Remove all individuals of dataset in bulk, classes are kept.
+
+    Triples of the individuals are removed from all graphs (e.g. instances of
+    custom classes asserted by classification).
 
     Args:
-        file_path (str): file url should be processed with QUrl(file_path)
+        name (str): name of the dataset (key of DATASETS)
+        references (bool): remove also triples referencing the individuals
+
+    Returns:
+        set[int]: storage ids of removed individuals
+    """
+    dataset = DATASETS[name]
+    world = dataset.world
+    graph = world.graph
+    # Subjects of the graph except declaration of the ontology itself
+    subjects = "SELECT s FROM objs WHERE c=? AND s!=?"
+    params = (dataset.graph.c, dataset.storid)
+    graph.acquire_write_lock()
+    try:
+        removed = {
+            s
+            for (s,) in graph.execute(
+                "SELECT DISTINCT s FROM objs WHERE c=? AND s!=?", params
+            )
+        }
+        graph.execute(f"DELETE FROM datas WHERE s IN ({subjects})", params)
+        if references:
+            graph.execute(f"DELETE FROM objs WHERE o IN ({subjects})", params)
+        graph.execute(f"DELETE FROM objs WHERE s IN ({subjects})", params)
+        graph.db.commit()
+    finally:
+        graph.release_write_lock()
+    # Python objects of removed individuals must be loaded again
+    for storid in removed:
+        world._entities.pop(storid, None)
+    return removed
+
+
+def dataset_namespace(cls):
+    """Get namespace creating individuals of class in its dataset (or in onto)."""
+    name = DATASET_CLASSES.get(cls)
+    if name is None:
+        return onto
+    return DATASETS[name].get_namespace(onto.base_iri)
+
+
+def create_entity(cls, name, writer=None, **props):
+    """Create individual of the class either directly or using bulk writer.
+
+    Args:
+        cls (class): ontology class of the individual
+        name (str): name (id) of the individual
+        writer (BulkWriter): bulk writer, if None individual is created directly
+        **props: values of properties of the individual
+
+    Returns:
+        Thing: created individual
     """
-    onto.save(file_path, format="rdfxml")
+    if writer is None:
+        return cls(name, namespace=dataset_namespace(cls), **props)
+    return writer.create(cls, name, **props)
+
+
+class BulkWriter:
+    """Writer creating individuals directly in the quadstore in batches.
+
+    Individuals are created without owlready2 per-entity lookups and their triples
+    are inserted using one executemany call per batch. Values of functional
+    properties are cached on created objects, so the content of the ontology is
+    the same as when using constructors of the classes.
+
+    Use as a context manager, the ontology write lock is held and pending triples
+    are flushed on exit.
+    """
+
+    def __init__(self, ontology=None, batch_size=50000, replaced=()):
+        """Initialize writer.
+
+        Args:
+            ontology (Ontology): ontology storing the triples (default is dataset
+                of class of each individual, see dataset_namespace)
+            batch_size (int): number of triples written in one transaction
+            replaced (set[int]): storage ids of individuals whose triples were
+                removed, they are created again as new individuals
+        """
+        self.onto = ontology
+        self.world = onto.world if ontology is None else ontology.world
+        self.batch_size = batch_size
+        self._replaced = replaced
+        self._objs = []
+        self._datas = []
+        self._created = {}
+
+    def __enter__(self):
+        self.world.graph.acquire_write_lock()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.flush()
+        finally:
+            self.world.graph.release_write_lock()
+
+    def create(self, cls, name, **props):
+        """Create individual of the class, same arguments as class constructor."""
+        namespace = dataset_namespace(cls) if self.onto is None else self.onto
+        storid = self.world._abbreviate(f"{namespace.base_iri}{name}", False)
+        if (
+            storid is not None
+            and storid not in self._replaced
+            and (
+                storid in self._created
+                or self.world._get_by_storid(storid) is not None
+            )
+        ):
+            # Existing individuals are updated using standard owlready2 path
+            self.flush()
+            return cls(name, namespace=namespace, **props)
+
+        with LOADING:
+            entity = cls(name, namespace=namespace)
+        self._created[entity.storid] = entity
+
+        c = namespace.ontology.graph.c
+        self._objs.append((c, entity.storid, rdf_type, owl_named_individual))
+        self._objs.append((c, entity.storid, rdf_type, cls.storid))
+        for attr, value in props.items():
+            prop = self.world._props.get(attr)
+            if prop is None:
+                setattr(entity, attr, value)
+            elif prop.is_functional_for(cls):
+                entity.__dict__[attr] = value
+                if value is not None:
+                    self._add_triple(entity, prop, value)
+            elif value is not None:
+                for v in value:
+                    self._add_triple(entity, prop, v)
+
+        if len(self._objs) + len(self._datas) >= self.batch_size:
+            self.flush()
+        return entity
+
+    def add(self, entity, attr, value):
+        """Append value to non-functional property of individual."""
+        if attr in entity.__dict__:
+            # Values are already loaded, update them through owlready2
+            getattr(entity, attr).append(value)
+        else:
+            self._add_triple(entity, self.world._props[attr], value)
+
+    def _add_triple(self, entity, prop, value):
+        """Add triple (entity, prop, value) to pending triples."""
+        o, d = self.world._to_rdf(value)
+        c = entity.namespace.ontology.graph.c
+        if d is None:
+            self._objs.append((c, entity.storid, prop.storid, o))
+        else:
+            self._datas.append((c, entity.storid, prop.storid, o, d))
+
+    def flush(self):
+        """Insert all pending triples into quadstore in single transaction."""
+        graph = self.world.graph
+        graph.db.executemany("INSERT OR IGNORE INTO objs VALUES (?,?,?,?)", self._objs)
+        graph.db.executemany("INSERT INTO datas VALUES (?,?,?,?,?)", self._datas)
+        graph.db.commit()
+        self._objs.clear()
+        self._datas.clear()
+        self._created.clear()
 
 
 with onto:
@@ -98,14 +269,22 @@ with onto:
             transit_qty: int,
             allocated_qty: int,
             suspense_qty: int,
+            item=None,
+            location=None,
+            writer=None,
         ):
             expiry_date = convert_date(expiry_date, "%d.%m.%Y")
 
-            item = onto.search_one(iri=f"{BASE_IRI}#{item_id}")
-            location = onto.search_one(iri=f"{BASE_IRI}#{location_id}")
+            # Referenced entities can be provided by parser which already has them
+            if item is None:
+                item = onto.search_one(iri=f"{BASE_IRI}#{item_id}")
+            if location is None:
+                location = onto.search_one(iri=f"{BASE_IRI}#{location_id}")
 
-            return cls(
+            return create_entity(
+                cls,
                 f"{date.strftime('%Y:%m:%d')}-{location_id}-{item_id}",
+                writer,
                 has_date=date,
                 has_location=location,
                 # has_ltype=ltype,
@@ -115,12 +294,13 @@ with onto:
                 has_onhand_qty=onhand_qty,
                 has_transit_qty=transit_qty,
                 has_allocated_qty=allocated_qty,
-                suspense_qty=suspense_qty,
+                has_suspense_qty=suspense_qty,
             )
 
         @classmethod
         def destroy_all(cls):
             """Destroy all instances of Inventory class."""
+            clear_dataset("inventory")
             destroy_all(cls)
 
         @staticmethod
@@ -132,9 +312,9 @@ with onto:
                 date (datetime.datetime): date of inventory
 
             Returns:
-                List[Item]: list of items stored at locations
+                List[Inventory]: list of inventories of the item on given date
             """
-            return onto.search(type=Inventory, has_item=item)
+            return onto.search(type=Inventory, has_item=item, has_date=date)
 
     class ItemUnit(PhysicalObject):
         """Represents different packaging units of item.
@@ -161,14 +341,17 @@ with onto:
             dim_uom: str,
             weight: float,
             weight_uom: str,
+            writer=None,
         ):
             length = convert_dim(length, dim_uom)
             width = convert_dim(width, dim_uom)
             height = convert_dim(height, dim_uom)
             weight = convert_weight(weight, weight_uom)
 
-            return cls(
+            return create_entity(
+                cls,
                 _id,
+                writer,
                 has_conversion_qty=conversion_qty,
                 has_ref_qty_uom=qty_uom,
                 has_length=length,
@@ -198,9 +381,12 @@ with onto:
             zone: str,
             base_unit: ItemUnit,
             unit_levels: List[ItemUnit],
+            writer=None,
         ):
-            return cls(
+            return create_entity(
+                cls,
                 _id,
+                writer,
                 has_description=description,
                 has_gtype=gtype,
                 has_required_zone=zone,
@@ -211,6 +397,7 @@ with onto:
         @classmethod
         def destroy_all(cls):
             """Destroy all instances of Item class as well as related entities."""
+            clear_dataset("items")
             destroy_all(cls)
             destroy_all(ItemUnit)
 
@@ -287,6 +474,7 @@ with onto:
             x: float = None,
             y: float = None,
             z: float = None,
+            writer=None,
         ):
             ltype = convert_type(ltype)
             length = convert_dim(length, dim_uom)
@@ -295,8 +483,10 @@ with onto:
             if max_weight:
                 max_weight = convert_weight(max_weight, weight_uom)
 
-            return cls(
+            return create_entity(
+                cls,
                 _id,
+                writer,
                 has_ltype=ltype,
                 has_lclass=lclass,
                 has_lsubclass=lsubclass,
@@ -321,6 +511,7 @@ with onto:
         @classmethod
         def destroy_all(cls):
             """Destroy all instances of Location class."""
+            clear_dataset("locations")
             destroy_all(cls)
 
     class has_ltype(Location >> str, FunctionalProperty):
@@ -429,6 +620,9 @@ with onto:
             requested_qty: int,
             total_qty: int,
             qty_uom: str,
+            item=None,
+            country=None,
+            writer=None,
         ):
             _id = str(_id)
             # Convert to datetime
@@ -436,21 +630,27 @@ with onto:
             s_ship_date = convert_date(s_ship_date, "%d.%m.%Y")
             a_ship_date = convert_date(a_ship_date, "%d.%m.%Y")
 
-            country = onto.search_one(iri=f"{BASE_IRI}#{country_id}")
             if country is None:
-                country = Country(country_id)
-
-            item = onto.search_one(iri=f"{BASE_IRI}#{item_id}")
-            oi = OrderedItem(
+                country = onto.search_one(iri=f"{BASE_IRI}#{country_id}")
+                if country is None:
+                    country = create_entity(Country, country_id, writer)
+
+            if item is None:
+                item = onto.search_one(iri=f"{BASE_IRI}#{item_id}")
+            oi = create_entity(
+                OrderedItem,
                 f"{_id}-{item_id}",
+                writer,
                 has_item=item,
                 has_requested_qty=requested_qty,
                 has_total_qty=total_qty,
                 has_qty_uom=qty_uom,
             )
 
-            return cls(
+            return create_entity(
+                cls,
                 _id,
+                writer,
                 has_direction=direction,
                 has_country=country,
                 has_delivery_date=delivery_date,
@@ -461,24 +661,38 @@ with onto:
             )
 
         def add_item(
-            self, item_id: str, requested_qty: int, total_qty: int, qty_uom: str
+            self,
+            item_id: str,
+            requested_qty: int,
+            total_qty: int,
+            qty_uom: str,
+            item=None,
+            writer=None,
         ):
             """Create and add item instance into order."""
-            item = onto.search_one(iri=f"{BASE_IRI}#{item_id}")
-            oi = OrderedItem(
+            if item is None:
+                item = onto.search_one(iri=f"{BASE_IRI}#{item_id}")
+            oi = create_entity(
+                OrderedItem,
                 f"{self.name}-{item_id}",
+                writer,
                 has_item=item,
                 has_requested_qty=requested_qty,
                 has_total_qty=total_qty,
                 has_qty_uom=qty_uom,
             )
-            self.has_ordered_items.append(oi)
+            if writer is None:
+                self.has_ordered_items.append(oi)
+            else:
+                writer.add(self, "has_ordered_items", oi)
 
         @classmethod
         def destroy_all(cls):
             """Destroy all instances of Order class as well as related entities."""
+            clear_dataset("orders")
             destroy_all(cls)
             destroy_all(OrderedItem)
+            destroy_all(Country)
 
         @staticmethod
         def get_by_items(items):
@@ -648,8 +862,21 @@ with onto:
         """Suspense quantity of Item."""
 
 
+# Dataset (sub-ontology) storing individuals of each class
+DATASET_CLASSES = {
+    Location: "locations",
+    RackLocation: "locations",
+    Item: "items",
+    ItemUnit: "items",
+    Inventory: "inventory",
+    Order: "orders",
+    OrderedItem: "orders",
+    Country: "orders",
+}
+
+# Storage ids of schema entities, projects are opened only if they use the same ids
+SCHEMA = {e.iri: e.storid for e in list(onto.classes()) + list(onto.properties())}
+
 # sync_reasoner(infer_property_values=True)
 
-# SQLite3
-# default_world.graph.db
-# default_world.graph.execute
+# Direct SQL queries over the quadstore are in quadstore module
@@ -1,242 +1,637 @@
-"""Parser of Excel data files."""
-from datetime import datetime
+"""Parser of Excel and CSV data files."""
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from posixpath import dirname, join, normpath
+from xml.etree import ElementTree
 
-import xlsxio
 from xlrd import open_workbook
 
 from virtual_warehouse.data.data_model import (
+    BASE_IRI,
+    BulkWriter,
+    Country,
     Inventory,
     Item,
     ItemUnit,
     Location,
     Order,
     RackLocation,
+    create_entity,
+    destroy_entity,
+    onto,
+)
+from virtual_warehouse.data.records import RECORD_CLASSES, store
+from virtual_warehouse.data.readers import (
+    CSV_EXTENSIONS,
+    SHEET_SCHEMAS,
+    CsvReader,
+    compile_converter,
+    open_csv,
+    open_reader,
+)
+from virtual_warehouse.data.utils import convert_type, estimate_sheet_type
+
+# Number of rows after which parsers report progress
+PROGRESS_CHUNK = 1000
+
+XLSX_NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+# Number of rows of xlsx sheet (dimension reaching it doesn't describe data)
+XLSX_MAX_ROWS = 1048576
+XLSX_REL_ID = (
+    "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
 )
-from virtual_warehouse.data.utils import convert_date, convert_type, estimate_sheet_type
 
 
 class Document:
-    """Document class which loads xls or xlsx file and parse different data objects."""
-
-    def __init__(self, file_path):
+    """Document class which loads xls, xlsx or CSV files and parse data objects."""
+
+    def __init__(self, file_path, bulk=False, batch_size=50000, lazy=False):
+        """Open document for parsing.
+
+        Args:
+            file_path (str): path to .xls or .xlsx file, for .csv or .tsv file
+                all CSV and TSV files in its directory are sheets of the document
+            bulk (bool): use bulk ingestion, references are resolved from parsed
+                dictionaries and individuals are written in batches
+            batch_size (int): number of triples written in one batch (bulk mode)
+            lazy (bool): create lightweight records (see records module) instead
+                of ontology individuals, individuals are created on first use
+                of the ontology (see RecordStore.materialize)
+        """
         # Determines backend for loading documents (xlsx files uses openpyxl)
         self.is_xlsx = Document.check_xlsx(file_path)
+        self.file_path = file_path
+        self.bulk = bulk
+        self.batch_size = batch_size
+        self.lazy = lazy
         self.locations = {}
         self.items = {}
         self.balance = {}
         self.orders = {}
-        if self.is_xlsx:
-            self.doc = xlsxio.XlsxioReader(file_path)
-        else:
-            self.doc = open_workbook(file_path)
+        # Index of entities referenced by rows, but not parsed from this document
+        self._index = {Location: {}, Item: {}, Country: {}}
+        # Workbook is opened on first access (not required if sheets are prefetched)
+        self._reader = None
+        self._executor = None
+        self._prefetched = {}
+        self._row_counts = None
+        # Fingerprints of parsed rows (sheet type -> primary key -> hash of rows)
+        self.fingerprints = {}
+        # Rows collected for reload (sheet type -> primary key -> rows)
+        self._groups = {}
+
+    @property
+    def reader(self):
+        """Get reader of the document (see readers module)."""
+        if self._reader is None:
+            self._reader = open_reader(self.file_path)
+        return self._reader
 
     @staticmethod
     def check_xlsx(file_path):
         """Check if document is .xlsx document (required for openpyxl library)."""
         return file_path[-5:] == ".xlsx"
 
+    @staticmethod
+    def check_csv(file_path):
+        """Check if document is CSV or TSV file (sheets are files of its directory)."""
+        return file_path.lower().endswith(CSV_EXTENSIONS)
+
     @staticmethod
     def get_sheet_names(file_path):
-        """Get names of all sheets in document."""
-        if Document.check_xlsx(file_path):
-            with xlsxio.XlsxioReader(file_path) as reader:
-                names = reader.get_sheet_names()
+        """Get names of all sheets in document with estimated types."""
+        return [[s["name"], s["type"]] for s in Document.probe(file_path)]
+
+    @staticmethod
+    def probe(file_path):
+        """Read sheet names, sizes and headers without decoding sheet bodies.
+
+        For .xlsx files only workbook metadata, sheet dimensions and first rows
+        are read (sizes are None if dimension is missing or spans whole sheet).
+        The .xls sheets are loaded one by one and released right away. For CSV
+        and TSV files only headers of files in the same directory are read.
+
+        Args:
+            file_path (str): path to .xls, .xlsx, .csv or .tsv file
+
+        Returns:
+            list[dict]: list of sheets with keys "name", "type" (estimated from
+                header and name), "rows" (number of data rows without header),
+                "columns" and "header" (list of column names)
+        """
+        sheets = []
+        if Document.check_csv(file_path):
+            reader = CsvReader(file_path)
+            for name in reader.sheet_names():
+                f, rows = open_csv(reader.sheet_path(name))
+                with f:
+                    header = next(rows, [])
+                # Counting rows of CSV file requires reading the whole file
+                sheets.append((name, None, len(header), header))
+        elif Document.check_xlsx(file_path):
+            with zipfile.ZipFile(file_path) as archive:
+                paths = _xlsx_sheet_paths(archive)
+                headers = {n: _xlsx_first_row(archive, p) for n, p in paths.items()}
+                strings = _xlsx_shared_strings(
+                    archive,
+                    max(
+                        (v[i] for v, shared in headers.values() for i in shared),
+                        default=-1,
+                    ),
+                )
+                for name, path in paths.items():
+                    rows, columns = _xlsx_dimension(archive, path)
+                    cells, shared = headers[name]
+                    header = [
+                        strings[v] if i in shared else v for i, v in enumerate(cells)
+                    ]
+                    sheets.append((name, rows, columns, header))
         else:
             doc = open_workbook(file_path, on_demand=True)
-            names = doc.sheet_names()
-        return [[n, estimate_sheet_type(n)] for n in names]
+            for name in doc.sheet_names():
+                sheet = doc.sheet_by_name(name)
+                header = sheet.row_values(0) if sheet.nrows else []
+                sheets.append((name, max(sheet.nrows - 1, 0), sheet.ncols, header))
+                doc.unload_sheet(name)
+            doc.release_resources()
+
+        return [
+            {
+                "name": name,
+                "type": estimate_sheet_type(name, header),
+                "rows": rows,
+                "columns": columns,
+                "header": [str(h) if h is not None else "" for h in header],
+            }
+            for name, rows, columns, header in sheets
+        ]
+
+    @staticmethod
+    def get_row_counts(file_path):
+        """Get number of data rows (without header) of all sheets in document.
+
+        Sheet bodies are not decoded, for .xlsx files the number is read from
+        sheet dimension (None if dimension is not stored in the file). Number of
+        rows of CSV and TSV files is unknown (None).
+
+        Returns:
+            dict[str, int]: dictionary mapping sheet name to number of rows
+        """
+        if Document.check_csv(file_path):
+            return {name: None for name in CsvReader(file_path).sheet_names()}
+        if not Document.check_xlsx(file_path):
+            doc = open_workbook(file_path, on_demand=True)
+            counts = {}
+            for name in doc.sheet_names():
+                counts[name] = max(doc.sheet_by_name(name).nrows - 1, 0)
+                doc.unload_sheet(name)
+            doc.release_resources()
+            return counts
+
+        with zipfile.ZipFile(file_path) as archive:
+            return {
+                name: _xlsx_dimension(archive, path)[0]
+                for name, path in _xlsx_sheet_paths(archive).items()
+            }
+
+    def row_count(self, sheet_type, sheet_name):
+        """Get number of rows of the sheet (None if unknown).
+
+        Args:
+            sheet_type (str): type of the sheet
+            sheet_name (str): name of the sheet
+        """
+        future = self._prefetched.get((sheet_type, sheet_name))
+        if future is not None and future.done() and future.exception() is None:
+            return len(future.result())
+        if self._row_counts is None:
+            try:
+                self._row_counts = Document.get_row_counts(self.file_path)
+            except Exception:  # skipcq: PYL-W0703
+                self._row_counts = {}
+        return self._row_counts.get(sheet_name)
 
     def close(self):
         """Release resources owned by the document."""
-        if self.is_xlsx:
-            self.doc.close()
-
-    def parse_locations(self, sheet_name="LOCATIONmaster"):
-        """Parse LOCATIONmaster sheet."""
-        if self.is_xlsx:
-            types = [str, str, str, str, float, float, float, str, float, str, str]
-            with self.doc.get_sheet(sheet_name, types=types) as sheet:
-                sheet.read_header()
-                for row in sheet.iter_rows():
-                    if len(row) == 0 or not row[0]:
-                        continue
-
-                    location_id = row[0]
-                    if convert_type(row[1]) == "rack":
-                        self.locations[location_id] = RackLocation.create(*row[:11])
-                    else:
-                        self.locations[location_id] = Location.create(*row[:11])
-
+        if self._executor is not None:
+            for future in self._prefetched.values():
+                future.cancel()
+            self._executor.shutdown()
+            self._executor = None
+        self._prefetched.clear()
+        if self._reader is not None:
+            self._reader.close()
+        self._reader = None
+
+    def _cls(self, cls):
+        """Get class creating entities of ontology class (record class if lazy)."""
+        return RECORD_CLASSES[cls] if self.lazy else cls
+
+    def _destroy(self, entity):
+        """Destroy entity (individual or record)."""
+        if self.lazy:
+            store.remove(entity)
         else:
-            sheet = self.doc.sheet_by_name(sheet_name)
-
-            for row in range(1, sheet.nrows):
-                location_id = str(sheet.cell(row, 0).value)
-                if not location_id:
-                    continue
-
-                values = [sheet.cell(row, i).value for i in range(11)]
-                if convert_type(values[1]) == "rack":
-                    self.locations[location_id] = RackLocation.create(*values)
-                else:
-                    self.locations[location_id] = Location.create(*values)
+            destroy_entity(entity)
+
+    def destroy_all(self, cls):
+        """Destroy all entities of given ontology class before parsing its sheets."""
+        self._cls(cls).destroy_all()
+
+    @contextmanager
+    def _ingest(self):
+        """Get bulk writer for creating entities (None if not bulk or lazy mode)."""
+        if not self.bulk or self.lazy:
+            yield None
+            return
+        with BulkWriter(batch_size=self.batch_size) as writer:
+            yield writer
+
+    def _resolve(self, cls, _id, parsed=None):
+        """Find entity by id in parsed dictionary or id -> entity index.
+
+        Args:
+            cls (class): ontology class used as key of index
+            _id (str): id of entity
+            parsed (dict): dictionary of entities parsed by this document
+
+        Returns:
+            Thing: entity or None if it doesn't exist
+        """
+        if parsed is not None and _id in parsed:
+            return parsed[_id]
+        index = self._index[cls]
+        if _id not in index:
+            index[_id] = store.get(_id) or onto.search_one(iri=f"{BASE_IRI}#{_id}")
+        return index[_id]
+
+    def _country(self, country_id, writer):
+        """Get country entity, create new one if it doesn't exist."""
+        country = self._resolve(Country, country_id)
+        if country is None:
+            if self.lazy:
+                country = RECORD_CLASSES[Country].create(country_id)
+            else:
+                country = create_entity(Country, country_id, writer)
+            self._index[Country][country_id] = country
+        return country
+
+    def iter_rows(self, sheet_type, sheet_name):
+        """Iterate decoded rows of the sheet as plain typed tuples.
+
+        Rows decoded in worker process (see prefetch) are used if available.
+
+        Args:
+            sheet_type (str): type of the sheet ("Locations", "Coordinates",
+                "Items", "Inventory", "Orders")
+            sheet_name (str): name of the sheet
+
+        Returns:
+            Iterable[tuple]: decoded rows (empty rows are skipped)
+        """
+        future = self._prefetched.pop((sheet_type, sheet_name), None)
+        if future is not None:
+            return future.result()
+        return self._read_rows(sheet_type, sheet_name)
+
+    def prefetch(self, sheets, max_workers=None):
+        """Start decoding of sheets in worker processes.
+
+        Decoded rows are later consumed by parse methods (or iter_rows).
+
+        Args:
+            sheets (list[tuple[str, str]]): list of (sheet_type, sheet_name)
+            max_workers (int): number of worker processes (default: CPU count)
+        """
+        sheets = [s for s in sheets if s[0] in SHEET_SCHEMAS]
+        # CSV files are streamed, decoded rows would be kept in memory
+        if not sheets or Document.check_csv(self.file_path):
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=min(len(sheets), max_workers or os.cpu_count() or 1)
+            )
+        for sheet_type, sheet_name in sheets:
+            self._prefetched[(sheet_type, sheet_name)] = self._executor.submit(
+                read_sheet, self.file_path, sheet_type, sheet_name
+            )
+
+    def _iter_progress(self, sheet_type, sheet_name, progress):
+        """Iterate rows of the sheet and report number of processed rows.
+        Fingerprints of rows are recorded for later reload of changed sheets.
+
+        Args:
+            sheet_type (str): type of the sheet
+            sheet_name (str): name of the sheet
+            progress (Callable[[int, int], None]): function receiving number of
+                processed rows and total number of rows (None if unknown), called
+                after each chunk of rows (can be None)
+        """
+        rows = self.iter_rows(sheet_type, sheet_name)
+        if progress is None:
+            yield from self._fingerprint(sheet_type, rows)
+            return
+
+        if isinstance(rows, list):
+            total = len(rows)
+        else:
+            total = self.row_count(sheet_type, sheet_name)
+        rows = self._fingerprint(sheet_type, rows)
+        done = 0
+        for done, row in enumerate(rows, 1):
+            yield row
+            if done % PROGRESS_CHUNK == 0:
+                progress(done, total)
+        progress(done, done)
+
+    def _fingerprint(self, sheet_type, rows):
+        """Record fingerprints of rows grouped by primary key of created entity."""
+        key_of = ROW_KEYS[sheet_type]
+        fingerprints = self.fingerprints.setdefault(sheet_type, {})
+        for row in rows:
+            key = key_of(row)
+            fingerprints[key] = hash((fingerprints.get(key), row))
+            yield row
+
+    def _read_rows(self, sheet_type, sheet_name):
+        """Decode rows of the sheet using converter compiled for its schema."""
+        schema = SHEET_SCHEMAS[sheet_type]
+        reader = self.reader
+        convert = compile_converter(schema, reader.native, reader.epoch)
+        for batch in reader.iter_batches(sheet_name, schema):
+            # Rows without id (first column) are empty
+            yield from (row for row in map(convert, batch) if row and row[0])
+
+    def parse_locations(self, sheet_name="LOCATIONmaster", progress=None):
+        """Parse LOCATIONmaster sheet."""
+        with self._ingest() as writer:
+            for row in self._iter_progress("Locations", sheet_name, progress):
+                cls = RackLocation if convert_type(row[1]) == "rack" else Location
+                self.locations[row[0]] = self._cls(cls).create(*row, writer=writer)
 
         return self.locations
 
-    def parse_coordinates(self, sheet_name="XYZ_coordinates"):
+    def parse_coordinates(self, sheet_name="XYZ_coordinates", progress=None):
         """Parse XYZ_coordinates sheet."""
-        if self.is_xlsx:
-            types = [str, float, float, float]
-            with self.doc.get_sheet(sheet_name, types=types) as sheet:
-                sheet.read_header()
-                for row in sheet.iter_rows():
-                    if len(row) == 0 or not row[0]:
-                        continue
-                    location_id = row[0]
-                    self.locations[location_id].set_coord(*row[1:4])
-
-        else:
-            sheet = self.doc.sheet_by_name(sheet_name)
-
-            for row in range(1, sheet.nrows):
-                location_id = str(sheet.cell(row, 0).value)
-                if not location_id:
-                    continue
-
-                self.locations[location_id].set_coord(
-                    *(sheet.cell(row, i).value for i in range(1, 4))
-                )
+        for row in self._iter_progress("Coordinates", sheet_name, progress):
+            self.locations[row[0]].set_coord(*row[1:4])
 
         return self.locations
 
-    def parse_items(self, sheet_name="ITEMmaster"):
+    def parse_items(self, sheet_name="ITEMmaster", progress=None):
         """Parse ITEMmaster sheet."""
-        if self.is_xlsx:
-            types = [str, str, str, str] + 5 * [
-                int,
-                str,
-                float,
-                float,
-                float,
-                str,
-                float,
-                str,
-            ]
-            with self.doc.get_sheet(sheet_name, types=types) as sheet:
-                sheet.read_header()
-                for row in sheet.iter_rows():
-                    if len(row) == 0 or not row[0]:
-                        continue
-
-                    item_id, description, gtype, zone = row[:4]
-                    unit_levels = []
-                    for col in range(4, len(row), 8):
-                        unit_levels.append(
-                            ItemUnit.create(f"{item_id}-u{col}", *row[col : col + 8],)
-                        )
-                    self.items[item_id] = Item.create(
-                        item_id, description, gtype, zone, unit_levels[0], unit_levels
-                    )
-
-        else:
-            sheet = self.doc.sheet_by_name(sheet_name)
-
-            for row in range(1, sheet.nrows):
-                item_id, description, gtype, zone = (
-                    sheet.cell(row, i).value for i in range(4)
-                )
-                item_id = str(item_id)
-                if not item_id:
-                    continue
-
-                unit_levels = []
-                for col in range(4, sheet.ncols, 8):
-                    unit_levels.append(
-                        ItemUnit.create(
-                            f"{item_id}-u{col}",
-                            *(sheet.cell(row, col + i).value for i in range(8)),
-                        )
-                    )
-                self.items[item_id] = Item.create(
-                    item_id, description, gtype, zone, unit_levels[0], unit_levels
-                )
+        with self._ingest() as writer:
+            for row in self._iter_progress("Items", sheet_name, progress):
+                self._create_item(row, writer)
 
         return self.items
 
-    def parse_inventory_balance(self, sheet_name="Inventory Ballance"):
+    def _create_item(self, row, writer):
+        """Create item (with unit levels) from the row of ITEMmaster sheet."""
+        item_id, description, gtype, zone = row[:4]
+        unit_levels = []
+        for col in range(4, len(row), 8):
+            unit_levels.append(
+                self._cls(ItemUnit).create(
+                    f"{item_id}-u{col}", *row[col : col + 8], writer=writer
+                )
+            )
+        self.items[item_id] = self._cls(Item).create(
+            item_id,
+            description,
+            gtype,
+            zone,
+            unit_levels[0],
+            unit_levels,
+            writer=writer,
+        )
+        return self.items[item_id]
+
+    def parse_inventory_balance(self, sheet_name="Inventory Ballance", progress=None):
         """Parse Inventory Balance sheet  ('balance' in final version, most likely)."""
-        if self.is_xlsx:
-            types = [datetime, str, str, str, datetime, int, int, int, int, int]
-            with self.doc.get_sheet(sheet_name, types=types) as sheet:
-                sheet.read_header()
-                for row in sheet.iter_rows():
-                    if len(row) == 0 or not row[0]:
-                        continue
-                    date, location_id = row[:2]
-                    if date not in self.balance:
-                        self.balance[date] = {location_id: []}
-                    elif location_id not in self.balance[date]:
-                        self.balance[date][location_id] = []
-
-                    self.balance[date][location_id].append(Inventory.create(*row[:10]))
-
-        else:
-            sheet = self.doc.sheet_by_name(sheet_name)
-
-            for row in range(1, sheet.nrows):
-                date = convert_date(sheet.cell(row, 0).value, "%d.%m.%Y")
-                location_id = str(sheet.cell(row, 1).value)
-                if not date:
-                    continue
-
+        with self._ingest() as writer:
+            for row in self._iter_progress("Inventory", sheet_name, progress):
+                date, location_id = row[:2]
                 if date not in self.balance:
                     self.balance[date] = {location_id: []}
                 elif location_id not in self.balance[date]:
                     self.balance[date][location_id] = []
 
                 self.balance[date][location_id].append(
-                    Inventory.create(
-                        date, *(sheet.cell(row, i).value for i in range(1, 10))
-                    )
+                    self._create_inventory(row, writer)
                 )
 
         return self.balance
 
-    def parse_orders(self, sheet_name="Order"):
-        """Parse Order sheet."""
-        if self.is_xlsx:
-            types = [str, str, str, str, str, str, int, str, int, int, str]
-            with self.doc.get_sheet(sheet_name, types=types) as sheet:
-                sheet.read_header()
-                for row in sheet.iter_rows():
-                    if len(row) == 0 or not row[0]:
-                        continue
-
-                    order_id = row[0]
-                    if order_id in self.orders:
-                        self.orders[order_id].add_item(*row[7:11])
-                    else:
-                        self.orders[order_id] = Order.create(*row[:11])
-
-        else:
-            sheet = self.doc.sheet_by_name(sheet_name)
-
-            for row in range(1, sheet.nrows):
-                order_id = str(sheet.cell(row, 0).value)
-                if not order_id:
-                    continue
+    def _create_inventory(self, row, writer):
+        """Create inventory from the row of Inventory Balance sheet."""
+        return self._cls(Inventory).create(
+            *row,
+            item=self._resolve(Item, str(row[3]), self.items),
+            location=self._resolve(Location, row[1], self.locations),
+            writer=writer,
+        )
 
+    def parse_orders(self, sheet_name="Order", progress=None):
+        """Parse Order sheet."""
+        with self._ingest() as writer:
+            for row in self._iter_progress("Orders", sheet_name, progress):
+                order_id = row[0]
+                item = self._resolve(Item, str(row[7]), self.items)
                 if order_id in self.orders:
-                    self.orders[order_id].add_item(
-                        *(sheet.cell(row, i).value for i in range(7, 11))
-                    )
+                    self.orders[order_id].add_item(*row[7:11], item=item, writer=writer)
                 else:
-                    self.orders[order_id] = Order.create(
-                        *(sheet.cell(row, i).value for i in range(11))
+                    self.orders[order_id] = self._cls(Order).create(
+                        *row,
+                        item=item,
+                        country=self._country(row[2], writer),
+                        writer=writer,
                     )
 
         return self.orders
 
+    def collect_rows(self, sheet_type, sheet_name, progress=None):
+        """Read rows of the sheet grouped by primary key for reload (apply_changes).
+
+        Args:
+            sheet_type (str): type of the sheet
+            sheet_name (str): name of the sheet
+            progress (Callable[[int, int], None]): progress callback (can be None)
+
+        Returns:
+            dict[str, list[tuple]]: rows of all collected sheets of given type
+        """
+        key_of = ROW_KEYS[sheet_type]
+        groups = self._groups.setdefault(sheet_type, {})
+        for row in self._iter_progress(sheet_type, sheet_name, progress):
+            groups.setdefault(key_of(row), []).append(row)
+        return groups
+
+    def apply_changes(self, sheet_type, previous):
+        """Apply collected rows as inserts, updates and deletes of loaded entities.
+
+        Collected rows (collect_rows) are compared with fingerprints of rows from
+        previous load, only entities with new, changed or missing primary key are
+        modified. Dictionaries of the document (locations, items, balance, orders)
+        must contain the previously loaded entities.
+
+        Args:
+            sheet_type (str): type of the sheets
+            previous (dict[str, int]): fingerprints of rows from previous load
+
+        Returns:
+            tuple[set[str], set[str], set[str]]: inserted, updated and deleted keys
+        """
+        groups = self._groups.pop(sheet_type, {})
+        current = self.fingerprints.get(sheet_type, {})
+        inserted = current.keys() - previous.keys()
+        deleted = previous.keys() - current.keys()
+        updated = {
+            k for k in current.keys() & previous.keys() if current[k] != previous[k]
+        }
+        changed = {k: groups[k] for k in inserted | updated}
+        getattr(self, CHANGE_APPLIERS[sheet_type])(changed, deleted)
+        return inserted, updated, deleted
+
+    def _apply_locations(self, changed, deleted):
+        """Apply changes of LOCATIONmaster rows."""
+        with self._ingest() as writer:
+            for key, rows in changed.items():
+                row = rows[-1]
+                cls = RackLocation if convert_type(row[1]) == "rack" else Location
+                old = self.locations.get(key)
+                # Coordinates are stored in separate sheet, keep the current ones
+                coords = {}
+                if old is not None:
+                    coords = {"x": old.has_x, "y": old.has_y, "z": old.has_z}
+                location = self._cls(cls).create(*row, **coords, writer=writer)
+                if not self.lazy and location.is_a != [cls]:
+                    # Type of location changed (rack / other)
+                    location.is_a = [cls]
+                self.locations[key] = location
+
+        for key in deleted:
+            self._destroy(self.locations.pop(key))
+
+    def _apply_coordinates(self, changed, deleted):
+        """Apply changes of XYZ_coordinates rows."""
+        for key, rows in changed.items():
+            if key in self.locations:
+                self.locations[key].set_coord(*rows[-1][1:4])
+
+        for key in deleted:
+            if key in self.locations:
+                self.locations[key].set_coord(None, None, None)
+
+    def _apply_items(self, changed, deleted):
+        """Apply changes of ITEMmaster rows."""
+        previous_units = {}
+        with self._ingest() as writer:
+            for key, rows in changed.items():
+                if key in self.items:
+                    previous_units[key] = list(self.items[key].has_unit_levels)
+                self._create_item(rows[-1], writer)
+
+        # Unit levels which are no longer used by updated items
+        for key, units in previous_units.items():
+            for unit in set(units) - set(self.items[key].has_unit_levels):
+                self._destroy(unit)
+
+        for key in deleted:
+            item = self.items.pop(key)
+            for unit in item.has_unit_levels:
+                self._destroy(unit)
+            self._destroy(item)
+
+    def _inventory_group(self, date, location_id, copied):
+        """Get list of inventory at (date, location) for modification.
+
+        Nested dictionaries and lists are copied on first modification, so objects
+        shared with the previous balance dictionary are never modified.
+        """
+        if (date, None) not in copied:
+            self.balance[date] = dict(self.balance.get(date, {}))
+            copied.add((date, None))
+        if (date, location_id) not in copied:
+            self.balance[date][location_id] = list(
+                self.balance[date].get(location_id, [])
+            )
+            copied.add((date, location_id))
+        return self.balance[date][location_id]
+
+    def _apply_inventory(self, changed, deleted):
+        """Apply changes of Inventory Balance rows."""
+        copied = set()
+        with self._ingest() as writer:
+            for rows in changed.values():
+                row = rows[-1]
+                group = self._inventory_group(row[0], row[1], copied)
+                inventory = self._create_inventory(row, writer)
+                if inventory not in group:
+                    group.append(inventory)
+
+        if deleted:
+            # Inventory of previous load by name (keys of deleted rows)
+            previous = {
+                inventory.name: (date, location_id)
+                for date, group in self.balance.items()
+                for location_id, inventories in group.items()
+                for inventory in inventories
+            }
+        for key in deleted:
+            if key not in previous:
+                continue
+            group = self._inventory_group(*previous[key], copied)
+            inventory = next(i for i in group if i.name == key)
+            group.remove(inventory)
+            self._destroy(inventory)
+
+        # Remove emptied groups
+        for date, location_id in copied:
+            if location_id is not None and not self.balance[date][location_id]:
+                del self.balance[date][location_id]
+        for date in {date for date, _ in copied}:
+            if not self.balance[date]:
+                del self.balance[date]
+
+    def _apply_orders(self, changed, deleted):
+        """Apply changes of Order rows."""
+        previous_items = {}
+        with self._ingest() as writer:
+            for key, rows in changed.items():
+                if key in self.orders:
+                    previous_items[key] = list(self.orders[key].has_ordered_items)
+                    # Order is created again from the first row, rest is appended
+                    del self.orders[key]
+                for row in rows:
+                    item = self._resolve(Item, str(row[7]), self.items)
+                    if key in self.orders:
+                        self.orders[key].add_item(*row[7:11], item=item, writer=writer)
+                    else:
+                        self.orders[key] = self._cls(Order).create(
+                            *row,
+                            item=item,
+                            country=self._country(row[2], writer),
+                            writer=writer,
+                        )
+
+        # Ordered items which are no longer part of updated orders
+        for key, ordered_items in previous_items.items():
+            for oi in set(ordered_items) - set(self.orders[key].has_ordered_items):
+                self._destroy(oi)
+
+        for key in deleted:
+            order = self.orders.pop(key)
+            for oi in order.has_ordered_items:
+                self._destroy(oi)
+            self._destroy(order)
+
     def parse_document(self):
         """Parse the whole document."""
         locations = self.parse_locations()
@@ -246,3 +641,157 @@ class Document:
         orders = self.parse_orders()
 
         return locations, items, balance, orders
+
+
+# Functions returning primary key (id of created entity) of decoded row
+ROW_KEYS = {
+    "Locations": lambda row: row[0],
+    "Coordinates": lambda row: row[0],
+    "Items": lambda row: row[0],
+    "Inventory": lambda row: f"{row[0].strftime('%Y:%m:%d')}-{row[1]}-{row[3]}",
+    "Orders": lambda row: row[0],
+}
+
+# Mapping sheet types to Document methods applying changes of rows on reload
+CHANGE_APPLIERS = {
+    "Locations": "_apply_locations",
+    "Coordinates": "_apply_coordinates",
+    "Items": "_apply_items",
+    "Inventory": "_apply_inventory",
+    "Orders": "_apply_orders",
+}
+
+
+def read_sheet(file_path, sheet_type, sheet_name):
+    """Decode all rows of the sheet (executed in worker process).
+
+    Args:
+        file_path (str): path to .xls or .xlsx file
+        sheet_type (str): type of the sheet (key of SHEET_SCHEMAS)
+        sheet_name (str): name of the sheet
+
+    Returns:
+        list[tuple]: list of decoded rows
+    """
+    document = Document(file_path)
+    try:
+        return list(document.iter_rows(sheet_type, sheet_name))
+    finally:
+        document.close()
+
+
+def _xlsx_sheet_paths(archive):
+    """Get mapping of sheet names to paths of sheet XML files inside xlsx archive."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        r.get("Id"): r.get("Target") for r in rels.findall("rel:Relationship", XLSX_NS)
+    }
+
+    paths = {}
+    for sheet in workbook.findall("main:sheets/main:sheet", XLSX_NS):
+        target = targets[sheet.get(XLSX_REL_ID)]
+        if target.startswith("/"):
+            paths[sheet.get("name")] = target[1:]
+        else:
+            paths[sheet.get("name")] = normpath(
+                join(dirname("xl/workbook.xml"), target)
+            )
+    return paths
+
+
+def _xlsx_column(ref):
+    """Convert cell reference (e.g. "AB12") to zero-based column index."""
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def _xlsx_dimension(archive, path):
+    """Read number of data rows and columns from dimension element of sheet XML.
+
+    Returns:
+        tuple[int, int]: number of rows (without header) and columns, values are
+            None if dimension isn't stored or spans until the end of the sheet
+    """
+    with archive.open(path) as f:
+        for _, elem in ElementTree.iterparse(f, events=("start",)):
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if tag == "dimension":
+                refs = elem.get("ref", "").split(":")
+                if len(refs) != 2:
+                    return None, None
+                start, end = refs
+                rows = [int(re.sub(r"\D", "", r) or 0) for r in refs]
+                columns = _xlsx_column(end) - _xlsx_column(start) + 1
+                # Formatted empty rows extend dimension to the last row of sheet
+                if rows[1] >= XLSX_MAX_ROWS:
+                    return None, columns
+                return max(rows[1] - rows[0], 0), columns
+            if tag == "sheetData":
+                return None, None
+    return None, None
+
+
+def _xlsx_first_row(archive, path):
+    """Read values of first row of sheet XML without parsing rest of the sheet.
+
+    Returns:
+        tuple[list, set]: raw values of cells and indexes of cells containing
+            index into shared strings
+    """
+    values, shared = [], set()
+    with archive.open(path) as f:
+        cell = None
+        for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if event == "start":
+                if tag == "c":
+                    cell = elem
+                continue
+            if tag == "row":
+                break
+            if tag != "c":
+                continue
+
+            idx = _xlsx_column(cell.get("r", "")) if cell.get("r") else len(values)
+            values.extend([None] * (idx + 1 - len(values)))
+            kind = cell.get("t")
+            if kind == "inlineStr":
+                text = cell.find("main:is", XLSX_NS)
+                values[idx] = _xlsx_text(text) if text is not None else None
+            else:
+                value = cell.find("main:v", XLSX_NS)
+                if value is not None and value.text is not None:
+                    if kind == "s":
+                        values[idx] = int(value.text)
+                        shared.add(idx)
+                    else:
+                        values[idx] = value.text
+            elem.clear()
+    return values, {i for i in shared if values[i] is not None}
+
+
+def _xlsx_text(elem):
+    """Get text of string item (shared or inline string with rich text runs)."""
+    runs = elem.findall("main:t", XLSX_NS) + elem.findall("main:r/main:t", XLSX_NS)
+    return "".join(t.text or "" for t in runs)
+
+
+def _xlsx_shared_strings(archive, last):
+    """Read shared strings of xlsx archive up to (including) given index."""
+    strings = []
+    if last < 0 or "xl/sharedStrings.xml" not in archive.namelist():
+        return strings
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in ElementTree.iterparse(f, events=("end",)):
+            if elem.tag.rsplit("}", 1)[-1] != "si":
+                continue
+            strings.append(_xlsx_text(elem))
+            elem.clear()
+            if len(strings) > last:
+                break
+    return strings
@@ -0,0 +1,163 @@
+"""Export of the ontology into a file, streamed directly from the quadstore.
+
+N-Triples are written in chunks while reading triples from the quadstore, so the
+export reports progress and can be cancelled. Files ending with ``.gz`` are
+compressed by gzip. The export can be limited to the schema (main ontology with
+classes, properties and custom classes) or to the inventory of a single date.
+"""
+import gzip
+import os
+from functools import lru_cache
+
+from owlready2.base import to_literal
+
+from virtual_warehouse.data.data_model import DATASETS, default_world, onto
+
+# Parts of the ontology which can be exported
+SCOPES = ("all", "schema", "date")
+# Number of triples written between progress reports
+EXPORT_CHUNK = 20000
+
+
+def export_format(file_path):
+    """Get serialization format used for the file ("rdfxml" or "ntriples")."""
+    path = file_path[:-3] if file_path.endswith(".gz") else file_path
+    return "rdfxml" if path.endswith((".rdf", ".owl")) else "ntriples"
+
+
+def _condition(scope, date):
+    """Get SQL condition selecting exported triples and its parameters.
+
+    Args:
+        scope (str): exported part of the ontology (see SCOPES)
+        date (datetime.datetime): date of exported inventory (scope "date")
+
+    Returns:
+        tuple[str, tuple]: SQL condition and its parameters
+    """
+    if scope == "all":
+        return "1", ()
+    if scope == "schema":
+        # Individuals are stored in sub-ontologies of datasets
+        return "c=?", (onto.graph.c,)
+    if scope == "date":
+        if date is None:
+            raise ValueError("No inventory date is selected.")
+        # Inventory of other dates is left out
+        value, datatype = to_literal(date)
+        return (
+            "s NOT IN (SELECT s FROM datas WHERE c=? AND p=? AND (o!=? OR d!=?))",
+            (DATASETS["inventory"].graph.c, onto.has_date.storid, value, datatype),
+        )
+    raise ValueError(f"Unknown export scope '{scope}'.")
+
+
+# Escape sequences (ECHAR) of N-Triples literals, unescaped line breaks split triples
+_ESCAPES = str.maketrans(
+    {
+        "\\": "\\\\",
+        '"': '\\"',
+        "\n": "\\n",
+        "\r": "\\r",
+        "\t": "\\t",
+        "\b": "\\b",
+        "\f": "\\f",
+    }
+)
+
+
+def _ntriple(unabbreviate, s, p, o, d):
+    """Format triple as a line of N-Triples (same format as owlready2)."""
+    s = f"_:{-s}" if s < 0 else f"<{unabbreviate(s)}>"
+    p = f"<{unabbreviate(p)}>"
+    if d is None:
+        o = f"_:{-o}" if o < 0 else f"<{unabbreviate(o)}>"
+    else:
+        if isinstance(o, str):
+            o = o.translate(_ESCAPES)
+        if isinstance(d, str) and d.startswith("@"):
+            o = f'"{o}"{d}'
+        elif d == 0:
+            o = f'"{o}"'
+        else:
+            o = f'"{o}"^^<{unabbreviate(d)}>'
+    return f"{s} {p} {o} .\n"
+
+
+def _write_ntriples(file, scope, date, progress, cancelled):
+    """Write triples selected by scope into binary file.
+
+    Returns:
+        int: number of written triples, None if export was cancelled
+    """
+    graph = default_world.graph
+    condition, params = _condition(scope, date)
+    total = sum(
+        graph.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}", params)
+        .fetchone()[0]
+        for table in ("objs", "datas")
+    )
+    cursor = graph.db.cursor()
+    cursor.execute(
+        f"SELECT s, p, o, NULL FROM objs WHERE {condition} "
+        f"UNION ALL SELECT s, p, o, d FROM datas WHERE {condition}",
+        params + params,
+    )
+    unabbreviate = lru_cache(None)(graph._unabbreviate)
+    written = 0
+    while True:
+        if cancelled is not None and cancelled():
+            return None
+        rows = cursor.fetchmany(EXPORT_CHUNK)
+        if not rows:
+            return written
+        file.write("".join(_ntriple(unabbreviate, *row) for row in rows).encode())
+        written += len(rows)
+        if progress is not None:
+            progress(written, total)
+
+
+def export_ontology(file_path, scope="all", date=None, progress=None, cancelled=None):
+    """Export ontology into file, format is selected by extension of the file.
+
+    File is written under temporary name and renamed once the export finishes,
+    partially written file is removed if the export fails or is cancelled.
+
+    Args:
+        file_path (str): path of created file (``.nt``, ``.rdf``, optionally
+            followed by ``.gz``)
+        scope (str): "all" for the whole ontology, "schema" for main ontology
+            without datasets, "date" for all data with inventory of single date
+        date (datetime.datetime): date of exported inventory (scope "date")
+        progress (Callable[[int, int], None]): called with number of written
+            and total number of triples
+        cancelled (Callable[[], bool]): returns True if export should stop
+
+    Returns:
+        bool: True if the file was written, False if export was cancelled
+
+    Raises:
+        ValueError: if scope isn't supported by the format
+    """
+    fmt = export_format(file_path)
+    if fmt == "rdfxml" and scope == "date":
+        raise ValueError("Inventory of single date can be exported as N-Triples only.")
+    partial_path = f"{file_path}.part"
+    opener = gzip.open if file_path.endswith(".gz") else open
+    try:
+        with opener(partial_path, "wb") as file:
+            if fmt == "rdfxml":
+                # Whole RDF/XML document is created by owlready2 at once
+                (onto if scope == "schema" else default_world).save(file, format=fmt)
+                written = True
+            else:
+                written = _write_ntriples(file, scope, date, progress, cancelled)
+        if written is None:
+            os.remove(partial_path)
+            return False
+        os.replace(partial_path, file_path)
+        return True
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
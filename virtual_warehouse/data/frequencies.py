@@ -0,0 +1,157 @@
+"""Sparse relation matrices used for calculating heat-map frequencies of locations.
+
+Quantities relating orders to items and items to locations are collected once into
+sparse matrices (rows and columns are indexed by names of objects). Frequencies of
+locations are then calculated as a product of vector of selected objects with these
+matrices, instead of adding quantities to locations one by one. Individuals of an
+opened project aren't collected into matrices, quantities of locations are summed
+in quadstore (see QuadstoreRelations) and converted by quantity_vector.
+"""
+import numpy as np
+from scipy.sparse import coo_matrix
+
+
+def index_of(names):
+    """Map names (keys of dictionary of objects) to row/column indices.
+
+    Args:
+        names (Iterable[str]): names of objects
+
+    Returns:
+        dict[str, int]: name mapped to its index
+    """
+    return {name: i for i, name in enumerate(names)}
+
+
+def _matrix(entries, rows, cols):
+    """Create sparse matrix from (row name, column name, value) entries.
+
+    Entries with unknown names are left out, values of repeated entries are summed.
+    """
+    row_ids, col_ids, values = [], [], []
+    for row, col, value in entries:
+        if row in rows and col in cols:
+            row_ids.append(rows[row])
+            col_ids.append(cols[col])
+            values.append(value or 0)
+    return coo_matrix(
+        (np.array(values, dtype=float), (row_ids, col_ids)),
+        shape=(len(rows), len(cols)),
+    ).tocsr()
+
+
+def order_item_matrix(orders, order_index, item_index):
+    """Create order × item matrix of ordered (total) quantities.
+
+    Args:
+        orders (dict[str, Order]): dictionary of orders mapping id to order
+        order_index (dict[str, int]): index of rows (see index_of)
+        item_index (dict[str, int]): index of columns
+
+    Returns:
+        csr_matrix: ordered quantity of the item in the order
+    """
+    return _matrix(
+        (
+            (name, oi.has_item.name, oi.has_total_qty)
+            for name, order in orders.items()
+            for oi in order.has_ordered_items
+            if oi.has_item is not None
+        ),
+        order_index,
+        item_index,
+    )
+
+
+def item_location_matrix(inventory, item_index, location_index, quantity=True):
+    """Create item × location matrix from inventory of single date.
+
+    Args:
+        inventory (dict[str, list[Inventory]]): inventory mapping location id to
+            list of inventory
+        item_index (dict[str, int]): index of rows (see index_of)
+        location_index (dict[str, int]): index of columns
+        quantity (bool): True for on-hand quantity of the item at the location,
+            False for number of inventory records of the item at the location
+
+    Returns:
+        csr_matrix: quantity (or number of records) of the item at the location
+    """
+    return _matrix(
+        (
+            (
+                inv.has_item.name,
+                inv.has_location.name,
+                inv.has_onhand_qty if quantity else 1,
+            )
+            for invs in inventory.values()
+            for inv in invs
+            if inv.has_item is not None and inv.has_location is not None
+        ),
+        item_index,
+        location_index,
+    )
+
+
+def selection_vector(ids, index, weight=1):
+    """Create dense vector with weight at indices of given ids.
+
+    Args:
+        ids (Iterable[str]): names of selected objects
+        index (dict[str, int]): index of the objects (see index_of)
+        weight (float): value added for each selected object
+
+    Returns:
+        numpy.ndarray: vector of length of the index
+    """
+    indices = np.fromiter((index[i] for i in ids if i in index), dtype=np.int64)
+    return np.bincount(indices, minlength=len(index)) * float(weight)
+
+
+def quantity_vector(quantities, index, weight=1):
+    """Create dense vector of quantities at indices of their names.
+
+    Args:
+        quantities (dict[str, float]): name of object mapped to its quantity
+        index (dict[str, int]): index of the objects (see index_of)
+        weight (float): multiplier of the quantities
+
+    Returns:
+        numpy.ndarray: vector of length of the index
+    """
+    vector = np.zeros(len(index))
+    for name, quantity in quantities.items():
+        if name in index:
+            vector[index[name]] += quantity or 0
+    return vector * float(weight)
+
+
+class LocationHeat:
+    """Dense array of location frequencies kept in sync with has_freq of locations."""
+
+    def __init__(self, locations):
+        """Initialize zero frequencies.
+
+        Args:
+            locations (dict[str, Location]): dictionary of locations mapping id to
+                location, ids are used as index of the array
+        """
+        self.locations = locations
+        self.index = index_of(locations)
+        self.names = list(self.index)
+        self.values = np.zeros(len(self.index))
+
+    def clear(self):
+        """Set all frequencies to zero (has_freq is cleared by plugin)."""
+        self.values[:] = 0
+
+    def add(self, delta):
+        """Add frequencies to locations, only changed locations are updated.
+
+        Args:
+            delta (numpy.ndarray): dense array of added frequency of each location
+        """
+        changed = np.flatnonzero(delta)
+        self.values[changed] += delta[changed]
+        for i in changed.tolist():
+            self.locations[self.names[i]].has_freq = self.values[i].item()
@@ -1,14 +1,17 @@
 """Module managing working with ontology e.g. creating queries and classes."""
-import tempfile
-from multiprocessing import Process
+import datetime
+import re
+import time
+from functools import lru_cache
+from multiprocessing import Pipe, Process
 from subprocess import DEVNULL, check_call
 
 import owlready2
-from owlready2 import (
+from owlready2 import (  # skipcq: PYL-W0611
     ConstrainedDatatype,
     PropertyChain,
-    sync_reasoner,
-    sync_reasoner_pellet,
+    PropertyClass,
+    ThingClass,
 )
 from PySide2.QtCore import (
     Property,
@@ -20,17 +23,130 @@ from PySide2.QtCore import (
     Signal,
     Slot,
 )
+from rdflib import Literal, URIRef
 from rdflib.plugins.sparql import prepareQuery
 
+from virtual_warehouse.data.classifier import (
+    Classifier,
+    assert_instances,
+    classify,
+    clear_instances,
+    count_instances,
+)
 from virtual_warehouse.data.data_model import *  # skipcq: PYL-W0614
-
-
-def sync(tmp_file, java_path):
-    """Run reasoning on ontology."""
-    owlready2.JAVA_EXE = java_path
-    with onto:
-        sync_reasoner_pellet(debug=0, infer_property_values=False)
-    onto.save(tmp_file)
+from virtual_warehouse.data.project import EntityList
+from virtual_warehouse.data.readers import DATE_FORMAT
+from virtual_warehouse.data.reasoner import ReasonerWorker, use_private_backend
+from virtual_warehouse.data.records import store
+
+# Number of query results sent from query process at once
+QUERY_CHUNK = 500
+# Number of parsed SPARQL queries kept in cache
+QUERY_CACHE = 256
+# Binding of template variable "name=value", value can be quoted string
+BINDING = re.compile(r'\s*\??(\w+)\s*=\s*("[^"]*"|[^,"]*?)\s*(?:,|$)')
+# Formats of dates in bindings, ISO dates and dates as displayed by the app
+BINDING_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    DATE_FORMAT,
+)
+# Ontology classes whose individuals are replaced by loading sheet of given type
+SHEET_CLASSES = {
+    "Locations": {"Location", "RackLocation"},
+    "Coordinates": {"Location", "RackLocation"},
+    "Items": {"Item", "ItemUnit"},
+    "Inventory": {"Inventory"},
+    "Orders": {"Order", "OrderedItem", "Country"},
+}
+
+
+@lru_cache(maxsize=QUERY_CACHE)
+def prepare_query(query):
+    """Parse SPARQL query and translate it into algebra, cached by text of query.
+
+    Prepared query is evaluated with different bindings of its variables without
+    being parsed again.
+
+    Args:
+        query (str): full SPARQL query
+
+    Returns:
+        Query: prepared query
+    """
+    return prepareQuery(query)
+
+
+def _term(value):
+    """Convert value of binding into RDF term."""
+    if value.startswith('"'):
+        return Literal(value[1:-1])
+    if value.startswith(":"):
+        return URIRef(f"{BASE_IRI}#{value[1:]}")
+    for convert in (int, float):
+        try:
+            return Literal(convert(value))
+        except ValueError:
+            pass
+    for date_format in BINDING_DATE_FORMATS:
+        try:
+            return Literal(datetime.datetime.strptime(value, date_format))
+        except ValueError:
+            pass
+    return Literal(value)
+
+
+def parse_bindings(text):
+    """Parse bindings of variables of query template.
+
+    Bindings are separated by commas, e.g. ``zone=A, date=2020-01-01``. Values
+    starting with colon are names of individuals (``:L001``), numbers and dates (ISO
+    or ``01.01.2020``) are typed literals, other values are strings (quotes force
+    string value).
+
+    Args:
+        text (str): bindings of variables
+
+    Returns:
+        dict[str, Identifier]: name of variable mapped to its value
+
+    Raises:
+        ValueError: if bindings can't be parsed
+    """
+    bindings = {}
+    text = text.strip()
+    pos = 0
+    while pos < len(text):
+        match = BINDING.match(text, pos)
+        if match is None or match.group(2) == "":
+            raise ValueError(f"invalid binding '{text[pos:].strip()}'")
+        bindings[match.group(1)] = _term(match.group(2))
+        pos = match.end()
+    return bindings
+
+
+def run_query(connection, query, bindings, max_rows):
+    """Run SPARQL query and send storage ids of results in chunks (query process).
+
+    Lists of storage ids are followed by None once the query finishes or by error
+    message if the query fails.
+    """
+    try:
+        use_private_backend()
+        chunk = []
+        rows = default_world.sparql_query(query, initBindings=bindings)
+        for count, row in enumerate(rows, 1):
+            chunk.append(row[0].storid)
+            if count >= max_rows:
+                break
+            if len(chunk) >= QUERY_CHUNK:
+                connection.send(chunk)
+                chunk = []
+        connection.send(chunk)
+        connection.send(None)
+    except Exception as e:  # skipcq: PYL-W0703
+        connection.send(str(e))
 
 
 class OperationThread(QThread):
@@ -53,12 +169,101 @@ class OperationThread(QThread):
         self.finished.emit(data)
 
 
+class QueryThread(QThread):
+    """Thread running SPARQL query in killable process with time and row budget.
+
+    Results are emitted in chunks as soon as they are received, the query process
+    is killed when the query is cancelled or exceeds the time budget.
+    """
+
+    # Emits number of candidates (instances of base class), not derived from query
+    candidatesReady = Signal(int)
+    # Emits list of storage ids of next results
+    rowsReady = Signal(object)
+    # Emits status: "finished", "truncated", "timeout", "cancelled" or error message
+    finished = Signal(str)
+
+    def __init__(self, cls, query, bindings, timeout, max_rows):
+        """Initialize thread.
+
+        Args:
+            cls (str): name of base class of query results
+            query (Query): prepared SPARQL query
+            bindings (dict[str, Identifier]): values of query variables
+            timeout (float): time budget of the query in seconds
+            max_rows (int): maximal number of results
+        """
+        super(QueryThread, self).__init__()
+        self.cls = cls
+        self.query = query
+        self.bindings = bindings
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self._cancelled = False
+
+    def cancel(self):
+        """Stop the query, received results are kept."""
+        self._cancelled = True
+
+    def run(self):
+        """Run the query process and emit its results."""
+        # Query process works with copy of ontology including all records
+        store.materialize()
+        self.candidatesReady.emit(
+            len(Classifier(default_world).evaluate(onto[self.cls]))
+        )
+
+        connection, child = Pipe()
+        process = Process(
+            target=run_query,
+            args=(child, self.query, self.bindings, self.max_rows),
+            daemon=True,
+        )
+        process.start()
+        child.close()
+
+        deadline = time.monotonic() + self.timeout
+        count, status = 0, "finished"
+        while True:
+            if self._cancelled:
+                status = "cancelled"
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                status = "timeout"
+                break
+            if not connection.poll(min(remaining, 0.1)):
+                continue
+            try:
+                message = connection.recv()
+            except EOFError:
+                status = "Query process failed"
+                break
+            if message is None:
+                if count >= self.max_rows:
+                    status = "truncated"
+                break
+            if isinstance(message, str):
+                status = message
+                break
+            count += len(message)
+            self.rowsReady.emit(message)
+
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        connection.close()
+        self.finished.emit(status)
+
+
 class OntoManager(QObject):
     """Class controlling ontology classes and reasoning."""
 
     objectsChanged = Signal()
     javaChanged = Signal()
     progressChanged = Signal()
+    timeoutChanged = Signal()
+    queryChanged = Signal()
 
     def __init__(self):
         """Initialize OntoController."""
@@ -68,9 +273,26 @@ class OntoManager(QObject):
 
         self._classes = {}
         self._queries = {}
+        # Definitions (base class name, condition) of classes created in session
+        self._definitions = {}
+        # Cached number of instances of custom classes with version of records
+        # they were counted with (individuals can be removed by materialization)
+        self._counts = {}
+        # Classes and queries waiting for refresh (is_class, name), refreshed one
+        # by one in background
+        self._stale = []
+        self._refresh_thread = None
+        # Increased on class removal, reasoner worker forks current classes again
+        self._classes_version = 0
         self._check_java()
         self._thread = None
         self._progress_value = 1
+        self._reasoner = ReasonerWorker()
+        self._reasoner_timeout = int(self.settings.value("reasonerTimeout", 30))
+        self._query_thread = None
+        self._query_status = ""
+        self._query_timeout = int(self.settings.value("queryTimeout", 60))
+        self._query_rows = int(self.settings.value("queryRows", 100000))
 
     @Property(float, constant=False, notify=progressChanged)
     def progress_value(self):
@@ -96,6 +318,70 @@ class OntoManager(QObject):
         self._check_java()
         self.javaChanged.emit()
 
+    @Property(int, constant=False, notify=timeoutChanged)
+    def reasoner_timeout(self):
+        """Get time budget of one reasoner job in seconds."""
+        return self._reasoner_timeout
+
+    @reasoner_timeout.setter
+    def set_reasoner_timeout(self, val):
+        """Set time budget of one reasoner job in seconds."""
+        self._reasoner_timeout = val
+        self.settings.setValue("reasonerTimeout", val)
+        self.timeoutChanged.emit()
+
+    @Property(int, constant=False, notify=timeoutChanged)
+    def query_timeout(self):
+        """Get time budget of one SPARQL query in seconds."""
+        return self._query_timeout
+
+    @query_timeout.setter
+    def set_query_timeout(self, val):
+        """Set time budget of one SPARQL query in seconds."""
+        self._query_timeout = val
+        self.settings.setValue("queryTimeout", val)
+        self.timeoutChanged.emit()
+
+    @Property(int, constant=False, notify=timeoutChanged)
+    def query_rows(self):
+        """Get maximal number of results of one SPARQL query."""
+        return self._query_rows
+
+    @query_rows.setter
+    def set_query_rows(self, val):
+        """Set maximal number of results of one SPARQL query."""
+        self._query_rows = val
+        self.settings.setValue("queryRows", val)
+        self.timeoutChanged.emit()
+
+    @Property(str, constant=False, notify=queryChanged)
+    def query_status(self):
+        """Get status of running or last SPARQL query (empty if there is none)."""
+        return self._query_status
+
+    @Property(bool, constant=False, notify=queryChanged)
+    def query_running(self):
+        """Check if SPARQL query is running."""
+        return self._query_thread is not None
+
+    def _set_query_status(self, status):
+        """Set status of SPARQL query."""
+        self._query_status = status
+        self.queryChanged.emit()
+
+    @Slot()
+    def cancel_query(self):
+        """Cancel running SPARQL query, already received results are kept."""
+        if self._query_thread is not None:
+            self._query_thread.cancel()
+
+    def shutdown(self):
+        """Stop running query and reasoner worker process."""
+        if self._query_thread is not None:
+            self._query_thread.cancel()
+            self._query_thread.wait()
+        self._reasoner.stop()
+
     @Property(bool, constant=False, notify=javaChanged)
     def java_correct(self):
         """Get true java path is correct."""
@@ -119,10 +405,38 @@ class OntoManager(QObject):
         """
         if is_class and name in self._classes:
             destroy_entity(self._classes.pop(name)[0])
+            self._definitions.pop(name, None)
+            self._counts.pop(name, None)
+            self._classes_version += 1
         elif not is_class and name in self._queries:
             del self._queries[name]
         self.objectsChanged.emit()
 
+    @property
+    def classes(self):
+        """Get custom classes mapping name to (class, base class name)."""
+        return self._classes
+
+    @property
+    def queries(self):
+        """Get saved queries mapping name to (instances, class, query, bindings)."""
+        return self._queries
+
+    def set_objects(self, classes, queries):
+        """Replace custom classes and queries (e.g. with ones stored in project).
+
+        Args:
+            classes (dict[str, tuple[ThingClass, str]]): custom classes
+            queries (dict[str, tuple[list[Thing], str, str, str]]): saved queries
+        """
+        self._classes = dict(classes)
+        self._queries = dict(queries)
+        self._definitions = {}
+        self._counts = {}
+        self._stale = []
+        self._classes_version += 1
+        self.objectsChanged.emit()
+
     def get_instances(self, is_class, name):
         """Get instances of custom class or query.
 
@@ -134,6 +448,7 @@ class OntoManager(QObject):
             list[Object]: list of class (RackLocation/Item/Order) instances
         """
         if is_class:
+            store.materialize()
             return self._classes[name][0].instances()
         return self._queries[name][0]
 
@@ -146,20 +461,140 @@ class OntoManager(QObject):
                 "class": v[1],
                 "count": len(v[0]),
                 "is_class": False,
+                "updating": (False, k) in self._stale,
                 "query": v[2],
+                "bindings": v[3],
             }
             for k, v in self._queries.items()
         ] + [
             {
                 "name": k,
                 "class": v[1],
-                "count": len(v[0].instances()),
+                "count": self._count(k),
                 "is_class": True,
+                "updating": (True, k) in self._stale,
                 "query": "",
+                "bindings": "",
             }
             for k, v in self._classes.items()
         ]
 
+    def _count(self, name):
+        """Get cached number of instances of custom class."""
+        version, count = self._counts.get(name, (None, 0))
+        if version != store.version:
+            version = store.version
+            count = count_instances(self._classes[name][0], default_world)
+            self._counts[name] = (version, count)
+        return count
+
+    def _dependencies(self, cls, text):
+        """Get names of ontology classes which can affect result of class/query.
+
+        Args:
+            cls (str): name of base class
+            text (str): condition of class or SPARQL query
+
+        Returns:
+            set[str]: names of base class and classes (and domains of properties)
+                mentioned in the text
+        """
+        names = {cls}
+        for token in set(re.findall(r"\w+", text)):
+            entity = onto[token]
+            if isinstance(entity, ThingClass):
+                names.update(c.name for c in entity.ancestors())
+            elif isinstance(entity, PropertyClass):
+                for c in entity.domain + entity.range:
+                    if isinstance(c, ThingClass):
+                        names.update(a.name for a in c.ancestors())
+        return names
+
+    def refresh(self, sheet_types):
+        """Refresh classes and queries depending on reloaded data in background.
+
+        Args:
+            sheet_types (Iterable[str]): types of sheets whose data changed
+        """
+        changed = set().union(*(SHEET_CLASSES.get(t, set()) for t in sheet_types))
+        views = [
+            (True, k, v[1], repr(v[0].equivalent_to)) for k, v in self._classes.items()
+        ] + [(False, k, v[1], v[2]) for k, v in self._queries.items()]
+        for is_class, name, cls, text in views:
+            stale = (is_class, name)
+            if stale not in self._stale and self._dependencies(cls, text) & changed:
+                self._stale.append(stale)
+        self.objectsChanged.emit()
+        if self._refresh_thread is None:
+            self._refresh_next()
+
+    def _refresh_next(self):
+        """Start refresh of next stale class or query."""
+        self._refresh_thread = None
+        while self._stale:
+            is_class, name = self._stale[0]
+            if is_class and name in self._classes:
+                self._refresh_thread = self._refresh_class(name)
+                break
+            if not is_class and name in self._queries:
+                self._refresh_thread = self._refresh_query(name)
+                break
+            self._stale.pop(0)
+        if self._refresh_thread is not None:
+            self._refresh_thread.start()
+
+    def _refresh_done(self, is_class, name):
+        """Mark class or query as refreshed and continue with the next one."""
+        if (is_class, name) in self._stale:
+            self._stale.remove((is_class, name))
+        self.objectsChanged.emit()
+        self._refresh_next()
+
+    def _refresh_class(self, name):
+        """Create thread classifying custom class again."""
+        new_class, cls = self._classes[name]
+        classification = self._classification(name, new_class, cls)
+
+        def refresh():
+            """Replace instances of the class (refresh thread)."""
+            store.materialize()
+            clear_instances(new_class, default_world)
+            classification()
+            return store.version, count_instances(new_class, default_world)
+
+        def callback(count):
+            """Save number of instances (callback function)."""
+            if name in self._classes:
+                self._counts[name] = count
+            self._refresh_done(True, name)
+
+        thread = OperationThread(refresh)
+        thread.finished.connect(callback, Qt.QueuedConnection)
+        return thread
+
+    def _refresh_query(self, name):
+        """Create thread running saved query again, results replace old ones."""
+        _, cls, query, bindings = self._queries[name]
+        storids = []
+        # Saved query is already prepared (unless it was opened from project)
+        thread = QueryThread(
+            cls,
+            prepare_query(self._construct_query(cls, query)),
+            parse_bindings(bindings),
+            self._query_timeout,
+            self._query_rows,
+        )
+
+        def callback(status):
+            """Save results of the query (callback function)."""
+            if name in self._queries and status in ("finished", "truncated"):
+                self._queries[name] = (EntityList(storids), cls, query, bindings)
+            self._refresh_done(False, name)
+
+        thread.rowsReady.connect(storids.extend, Qt.QueuedConnection)
+        thread.finished.connect(callback, Qt.QueuedConnection)
+        return thread
+
     @Slot(str, str, str, result=str)
     def check_create_class(self, name, cls, conditions):  # skipcq: PYL-R0201
         """Check if constuction parameters are correct.
@@ -205,25 +640,25 @@ class OntoManager(QObject):
                 name, (eval(cls),), {"equivalent_to": eval(full_condition)}
             )
 
-        tmp_file = tempfile.NamedTemporaryFile()
-        p = Process(target=sync, args=(tmp_file.name, owlready2.JAVA_EXE))
-        p.start()
+        self._definitions[name] = (cls, full_condition)
+        classification = self._classification(name, new_class, cls)
 
         def creation():
-            """Execute wait on process finish in separate thread."""
-            # 30 seconds timeout and shutdown the process
-            p.join(30)
-            p.terminate()
-            if p.exitcode == 0:
-                onto = get_ontology(tmp_file.name).load()
-                tmp_file.close()
-            return p.exitcode == 0
-
-        def callback(is_finished):
+            """Classify the new class in separate thread."""
+            # Reasoner works with copy of ontology including all records
+            store.materialize()
+            if not classification():
+                return None
+            return store.version, count_instances(new_class, default_world)
+
+        def callback(count):
             """Save output of the thread."""
-            if is_finished:
+            if count is not None:
                 self._classes[name] = (new_class, cls)
+                self._counts[name] = count
                 self.objectsChanged.emit()
+            else:
+                self._definitions.pop(name, None)
             self.progress_value = 1
 
         self.progress_value = 0
@@ -231,6 +666,36 @@ class OntoManager(QObject):
         self._thread.finished.connect(callback, Qt.QueuedConnection)
         self._thread.start()
 
+    def _classification(self, name, new_class, cls):
+        """Get function asserting instances of custom class (run in thread).
+
+        Args:
+            name (str): name of the custom class
+            new_class (ThingClass): the custom class
+            cls (str): name of base class
+
+        Returns:
+            Callable: function returning True if class was classified
+        """
+        definitions = [(k, *v) for k, v in self._definitions.items()]
+        classes_version = self._classes_version
+
+        def classification():
+            """Classify the class, reasoner is used only if required."""
+            # Simple restrictions are classified without reasoner
+            if classify(new_class, default_world):
+                return True
+            version = (store.version, classes_version)
+            storids = self._reasoner.classify(
+                name, definitions, version, self._reasoner_timeout
+            )
+            if storids is None:
+                return False
+            assert_instances(new_class, storids, default_world)
+            return True
+
+        return classification
+
     @staticmethod
     def _construct_query(cls, query):
         """Construct SPARQL query based on RackLocation, Item or Order."""
@@ -239,50 +704,101 @@ class OntoManager(QObject):
         i3 = f"\n?obj a :{cls} . \n"
         return i1 + i2 + query + i3 + " }"
 
-    @Slot(str, str, str, result=str)
-    def check_create_query(self, name, cls, query):
+    @Slot(str, str, str, str, result=str)
+    def check_create_query(self, name, cls, query, bindings):
         """Check correct query definition.
 
         Args:
             name (str): name of new query
             cls (str): string describing class, possible values: "RackLocation", "Item", "Order"
             query (str): describing SPARQL query (later replace by more complex structure)
+            bindings (str): values of query variables (see parse_bindings)
         """
         try:
             if len(name.strip()) == 0:
                 return "Invalid name"
             if cls not in ["RackLocation", "Item", "Order"]:
                 return "Invalid class type"
-            # Test validity of query
-            prepareQuery(self._construct_query(cls, query))
-            return None
+            # Test validity of query, the prepared query is reused by create_query
+            prepared = prepare_query(self._construct_query(cls, query))
         except Exception as e:  # skipcq: PYL-W0703
             return "Invalid query: " + str(e)
+        try:
+            variables = {str(v) for v in prepared.algebra["_vars"]} - {"obj"}
+            for variable in parse_bindings(bindings):
+                if variable not in variables:
+                    raise ValueError(f"unknown variable ?{variable}")
+            return None
+        except ValueError as e:
+            return "Invalid bindings: " + str(e)
 
-    @Slot(str, str, str)
-    def create_query(self, name, cls, query):
+    @Slot(str, str, str, str)
+    def create_query(self, name, cls, query, bindings):
         """Create new query and get instances.
 
+        Query with bindings is a template, it can be run again with other values of
+        its variables without parsing the query again.
+
         Args:
             name (str): name of new query
             cls (str): string describing class, possible values: "RackLocation", "Item", "Order"
             query (str): describing SPARQL query (later replace by more complex structure)
+            bindings (str): values of query variables (see parse_bindings)
         """
         name = name.strip()
-        q = self._construct_query(cls, query)
-
-        def creation():
-            """Execute the query."""
-            return [i[0] for i in default_world.sparql_query(q)]
+        q = prepare_query(self._construct_query(cls, query))
+        storids = []
+        candidates = [None]
+        # Status messages of finished query
+        messages = {
+            "finished": "",
+            "truncated": f" (limited to {self._query_rows} results)",
+            "timeout": f" (stopped after {self._query_timeout} s)",
+            "cancelled": " (cancelled)",
+        }
+        # Only the latest query runs, previous query keeps received results
+        if self._query_thread is not None:
+            self._query_thread.cancel()
+            self._query_thread.wait()
+
+        def show_status(text):
+            """Show number of received results and candidates (filtered by query)."""
+            total = ""
+            if candidates[0] is not None:
+                total = f" ({candidates[0]} {cls} candidates)"
+            self._set_query_status(f"{name}: {len(storids)} results{total}{text}")
+
+        def on_candidates(count):
+            """Save number of instances of base class of results."""
+            candidates[0] = count
+            show_status("...")
+
+        def on_rows(rows):
+            """Display received results right away."""
+            storids.extend(rows)
+            self._queries[name] = (EntityList(storids), cls, query, bindings)
+            self.objectsChanged.emit()
+            show_status("...")
 
-        def callback(instances):
+        def callback(status):
             """Save output of the thread."""
-            self._queries[name] = (instances, cls, query)
+            if thread is self._query_thread:
+                self._query_thread = None
+            if status in messages:
+                self._queries[name] = (EntityList(storids), cls, query, bindings)
+                show_status(messages[status])
+            else:
+                # Failed query isn't saved
+                self._queries.pop(name, None)
+                self._set_query_status(f"{name}: {status}")
             self.objectsChanged.emit()
-            # self._thread = None
-            self.progress_value = 1
 
-        self.progress_value = 0
-        self._thread = OperationThread(creation)
-        self._thread.finished.connect(callback, Qt.QueuedConnection)
-        self._thread.start()
+        thread = QueryThread(
+            cls, q, parse_bindings(bindings), self._query_timeout, self._query_rows
+        )
+        thread.candidatesReady.connect(on_candidates, Qt.QueuedConnection)
+        thread.rowsReady.connect(on_rows, Qt.QueuedConnection)
+        thread.finished.connect(callback, Qt.QueuedConnection)
+        self._query_thread = thread
+        self._set_query_status(f"{name}: running...")
+        thread.start()
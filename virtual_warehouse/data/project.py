@@ -0,0 +1,351 @@
+"""Module for saving and opening projects - warehouse data stored in a single file.
+
+Project file is owlready2 SQLite quadstore extended by tables containing
+dictionaries of loaded objects (locations, items, inventory, orders), custom classes
+and saved queries. Once the project is saved or opened, the ontology world is backed
+by the project file and entities are loaded from the disk on access.
+"""
+import json
+import os
+import sqlite3
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+
+from virtual_warehouse.data.data_model import BASE_IRI, SCHEMA, default_world, onto
+
+PROJECT_EXT = ".vwp"
+PROJECT_VERSION = 1
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Dictionaries id -> object, inventory is nested: date -> location id -> [object]
+COLLECTIONS = ["locations", "items", "orders"]
+NESTED_COLLECTIONS = ["inventory"]
+
+
+class EntityDict(Mapping):
+    """Read-only dictionary of entities which are loaded from quadstore on access."""
+
+    def __init__(self, storids, world=default_world):
+        """Initialize dictionary.
+
+        Args:
+            storids (dict[str, int | list[int]]): mapping of keys to storage ids
+                of entities (or to lists of storage ids)
+            world (World): owlready2 world containing the entities
+        """
+        self.storids = storids
+        self._world = world
+
+    def __getitem__(self, key):
+        storid = self.storids[key]
+        if isinstance(storid, list):
+            return [self._world._get_by_storid(s) for s in storid]
+        return self._world._get_by_storid(storid)
+
+    def __iter__(self):
+        return iter(self.storids)
+
+    def __len__(self):
+        return len(self.storids)
+
+
+class EntityList(Sequence):
+    """Read-only list of entities which are loaded from quadstore on access."""
+
+    def __init__(self, storids, world=default_world):
+        """Initialize list.
+
+        Args:
+            storids (list[int]): storage ids of entities
+            world (World): owlready2 world containing the entities
+        """
+        self.storids = storids
+        self._world = world
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._world._get_by_storid(s) for s in self.storids[idx]]
+        return self._world._get_by_storid(self.storids[idx])
+
+    def __len__(self):
+        return len(self.storids)
+
+
+def _storid_items(mapping):
+    """Get (key, storage id) pairs of dictionary without loading lazy entities."""
+    if isinstance(mapping, EntityDict):
+        return mapping.storids.items()
+    return (
+        (k, [e.storid for e in v] if isinstance(v, list) else v.storid)
+        for k, v in mapping.items()
+    )
+
+
+def _storids(entities):
+    """Get storage ids of list of entities without loading lazy entities."""
+    if isinstance(entities, EntityList):
+        return entities.storids
+    return [e.storid for e in entities]
+
+
+def check_project(file_path):
+    """Check that file is a project which can be opened by this version of the app.
+
+    Args:
+        file_path (str): path of the project file
+
+    Raises:
+        ValueError: if file isn't a valid project or uses different ontology schema
+    """
+    try:
+        db = sqlite3.connect(f"file:{file_path}?mode=ro", uri=True)
+        try:
+            version = db.execute(
+                "SELECT value FROM vw_meta WHERE key='version'"
+            ).fetchone()
+            stored = dict(
+                db.execute(
+                    "SELECT iri, storid FROM resources WHERE iri LIKE ?",
+                    (f"{BASE_IRI}#%",),
+                )
+            )
+        finally:
+            db.close()
+    except sqlite3.DatabaseError:
+        raise ValueError(f"File '{file_path}' is not a project file.")
+
+    if version is None or int(version[0]) != PROJECT_VERSION:
+        raise ValueError(f"Unsupported version of project file '{file_path}'.")
+    # Python classes keep their storage ids, they must match ids inside the file
+    if any(stored.get(iri) != storid for iri, storid in SCHEMA.items()):
+        raise ValueError(f"Project '{file_path}' uses different ontology schema.")
+
+
+def _copy_to_file(world, file_path):
+    """Copy quadstore of the world into new file, the world keeps its backend.
+
+    Returns:
+        int: number of changes of the quadstore connection at the time of the copy
+    """
+    graph = world.graph
+    graph.acquire_write_lock()
+    try:
+        graph.execute(
+            "UPDATE store SET current_blank=?, current_resource=?",
+            (graph.current_blank, graph.current_resource),
+        )
+        graph.db.commit()
+        target = sqlite3.connect(file_path)
+        try:
+            if hasattr(graph.db, "backup"):
+                # Page-level copy is much faster than SQL dump used by owlready2 clone
+                graph.db.backup(target)
+            else:
+                target.executescript("\n".join(graph.db.iterdump()))
+        finally:
+            target.close()
+        return graph.db.total_changes
+    finally:
+        graph.release_write_lock()
+
+
+def _write_tables(db, data, classes, queries, sources):
+    """Write dictionaries of objects, custom classes and queries into project tables.
+
+    Args:
+        db (sqlite3.Connection): connection to the project file
+        data, classes, queries, sources: see save_project
+    """
+    db.execute("CREATE TABLE IF NOT EXISTS vw_meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS vw_members "
+        "(collection TEXT, grp TEXT, key TEXT, storid INTEGER)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS index_vw_members ON vw_members(collection)")
+    db.execute("DELETE FROM vw_meta")
+    db.execute("DELETE FROM vw_members")
+
+    for name in COLLECTIONS:
+        if data.get(name) is not None:
+            db.executemany(
+                "INSERT INTO vw_members VALUES (?,'',?,?)",
+                ((name, k, s) for k, s in _storid_items(data[name])),
+            )
+    for name in NESTED_COLLECTIONS:
+        if data.get(name) is not None:
+            db.executemany(
+                "INSERT INTO vw_members VALUES (?,?,?,?)",
+                (
+                    (name, date.strftime(DATE_FORMAT), k, s)
+                    for date, group in data[name].items()
+                    for k, storids in _storid_items(group)
+                    for s in storids
+                ),
+            )
+    for name, (instances, *_) in queries.items():
+        db.executemany(
+            "INSERT INTO vw_members VALUES (?,'','',?)",
+            ((f"query:{name}", s) for s in _storids(instances)),
+        )
+
+    meta = {
+        "version": PROJECT_VERSION,
+        "collections": [
+            k for k in COLLECTIONS + NESTED_COLLECTIONS if data.get(k) is not None
+        ],
+        "classes": [[k, v[1]] for k, v in classes.items()],
+        "queries": [[k, *v[1:]] for k, v in queries.items()],
+        "sources": sources or [],
+    }
+    db.executemany(
+        "INSERT INTO vw_meta VALUES (?,?)",
+        ((k, json.dumps(v)) for k, v in meta.items()),
+    )
+    db.commit()
+
+
+def save_project(file_path, data, classes, queries, sources=None):
+    """Save warehouse data into project file (can run in background thread).
+
+    If the world isn't backed by the file yet, the quadstore is copied into the
+    file and the world keeps its current backend, use_project_file switches it to
+    the file once the copy is finished.
+
+    Args:
+        file_path (str): path of the project file
+        data (dict[str, dict]): loaded dictionaries ("locations", "items",
+            "inventory", "orders"), dictionaries which weren't loaded are None
+        classes (dict[str, tuple[ThingClass, str]]): custom classes
+            mapping name to (class, name of base class)
+        queries (dict[str, tuple[list[Thing], str, str, str]]): saved queries
+            mapping name to (instances, name of base class, query, bindings)
+        sources (list[dict]): description of imported files (path and sheet types)
+
+    Returns:
+        int: number of changes of the quadstore at the time of the copy (see
+            use_project_file), None if the world is already backed by the file
+    """
+    file_path = os.path.abspath(file_path)
+    world = default_world
+    if world.filename == file_path:
+        graph = world.graph
+        graph.acquire_write_lock()
+        try:
+            _write_tables(graph.db, data, classes, queries, sources)
+        finally:
+            graph.release_write_lock()
+        return None
+
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    changes = _copy_to_file(world, file_path)
+    db = sqlite3.connect(file_path)
+    try:
+        _write_tables(db, data, classes, queries, sources)
+    finally:
+        db.close()
+    return changes
+
+
+def use_project_file(file_path, changes):
+    """Use saved project file as backend of the world (call from GUI thread).
+
+    Backend is switched only if the quadstore wasn't modified since it was copied
+    into the file, otherwise the project must be saved again.
+
+    Args:
+        file_path (str): path of the saved project file
+        changes (int): number of changes returned by save_project
+
+    Returns:
+        bool: True if the world is backed by the file
+    """
+    world = default_world
+    previous = world.graph
+    previous.acquire_write_lock()
+    try:
+        if previous.db.total_changes != changes:
+            return False
+        # Without graph set_backend opens the file, otherwise it clones the graph
+        world.graph = None
+        world.set_backend(filename=os.path.abspath(file_path))
+    finally:
+        previous.release_write_lock()
+    previous.close()
+    return True
+
+
+def _forget_entities(world):
+    """Remove individuals and custom classes of current session from entity cache."""
+    schema = set(SCHEMA.values())
+    for storid, entity in list(world._entities.items()):
+        if entity.iri.startswith(BASE_IRI) and storid not in schema:
+            del world._entities[storid]
+
+
+def open_project(file_path):
+    """Open project file, world is backed by the file and current data are dropped.
+
+    Args:
+        file_path (str): path of the project file
+
+    Returns:
+        dict: dictionary with keys "data" (dict[str, EntityDict]) containing loaded
+            dictionaries (None if not loaded), "classes" and "queries" in format
+            used by save_project and "sources" describing imported files
+
+    Raises:
+        ValueError: if file isn't a valid project or uses different ontology schema
+    """
+    file_path = os.path.abspath(file_path)
+    world = default_world
+    if world.filename != file_path:
+        check_project(file_path)
+
+    _forget_entities(world)
+    previous = world.graph
+    # set_backend clones non-empty quadstore, remove it to open the existing file
+    world.graph = None
+    previous.close()
+    world.set_backend(filename=file_path)
+
+    db = world.graph.db
+    meta = {k: json.loads(v) for k, v in db.execute("SELECT key, value FROM vw_meta")}
+
+    data = {k: None for k in COLLECTIONS + NESTED_COLLECTIONS}
+    for name in meta["collections"]:
+        rows = db.execute(
+            "SELECT grp, key, storid FROM vw_members "
+            "WHERE collection=? ORDER BY rowid",
+            (name,),
+        )
+        if name in NESTED_COLLECTIONS:
+            groups = {}
+            for grp, key, storid in rows:
+                groups.setdefault(grp, {}).setdefault(key, []).append(storid)
+            data[name] = {
+                datetime.strptime(grp, DATE_FORMAT): EntityDict(v, world)
+                for grp, v in groups.items()
+            }
+        else:
+            data[name] = EntityDict({key: storid for _, key, storid in rows}, world)
+
+    queries = {}
+    for name, cls, query, *bindings in meta["queries"]:
+        # Queries saved before templates were added have no bindings
+        bindings = bindings[0] if bindings else ""
+        storids = [
+            s
+            for (s,) in db.execute(
+                "SELECT storid FROM vw_members WHERE collection=? ORDER BY rowid",
+                (f"query:{name}",),
+            )
+        ]
+        queries[name] = (EntityList(storids, world), cls, query, bindings)
+
+    return {
+        "data": data,
+        "classes": {name: (onto[name], cls) for name, cls in meta["classes"]},
+        "queries": queries,
+        "sources": meta["sources"],
+    }
@@ -0,0 +1,229 @@
+"""Relations between locations, items and orders queried directly from quadstore.
+
+Connectors and aggregates are compiled into parameterized SQL joins over triple
+tables of owlready2 quadstore (``objs`` and ``datas``), which avoids loading
+individuals as Python objects. Names of selected objects are passed through a
+temporary table instead of being formatted into the query. SQL texts are
+constant, so the SQLite statement cache keeps them prepared between calls.
+"""
+from threading import Lock
+
+from owlready2.base import from_literal
+
+from virtual_warehouse.data.data_model import BASE_IRI, default_world, onto
+from virtual_warehouse.data.relations import snapshot_date
+
+# Joins following relation from column of previous object ({prev}) to related
+# objects and column containing them, aliases of tables get unique suffix ({n})
+_STEPS = {
+    # location -> inventory of the date -> item
+    ("locations", "items"): (
+        "JOIN objs a{n} ON a{n}.p=:has_location AND a{n}.o={prev} "
+        "JOIN datas d{n} ON d{n}.s=a{n}.s AND d{n}.p=:has_date AND d{n}.o=:date "
+        "JOIN objs b{n} ON b{n}.s=a{n}.s AND b{n}.p=:has_item",
+        "b{n}.o",
+    ),
+    # item -> inventory of the date -> location
+    ("items", "locations"): (
+        "JOIN objs a{n} ON a{n}.p=:has_item AND a{n}.o={prev} "
+        "JOIN datas d{n} ON d{n}.s=a{n}.s AND d{n}.p=:has_date AND d{n}.o=:date "
+        "JOIN objs b{n} ON b{n}.s=a{n}.s AND b{n}.p=:has_location",
+        "b{n}.o",
+    ),
+    # order -> ordered item -> item
+    ("orders", "items"): (
+        "JOIN objs a{n} ON a{n}.s={prev} AND a{n}.p=:has_ordered_items "
+        "JOIN objs b{n} ON b{n}.s=a{n}.o AND b{n}.p=:has_item",
+        "b{n}.o",
+    ),
+    # item -> ordered item -> order
+    ("items", "orders"): (
+        "JOIN objs a{n} ON a{n}.p=:has_item AND a{n}.o={prev} "
+        "JOIN objs b{n} ON b{n}.p=:has_ordered_items AND b{n}.o=a{n}.s",
+        "b{n}.s",
+    ),
+}
+
+
+def _compile(*path):
+    """Compile path of relations into SQL selecting names of related objects.
+
+    Args:
+        *path (str): types of objects ("locations", "items", "orders"), the first
+            one is type of selected objects
+
+    Returns:
+        str: SQL query with named parameters
+    """
+    joins, column = [], "sel.storid"
+    for n, step in enumerate(zip(path, path[1:])):
+        join, result = _STEPS[step]
+        joins.append(join.format(n=n, prev=column))
+        column = result.format(n=n)
+    return (
+        "SELECT DISTINCT substr(r.iri, :prefix) FROM vw_selection sel "
+        + " ".join(joins)
+        + f" JOIN resources r ON r.storid={column}"
+    )
+
+
+class QuadstoreRelations:
+    """Connectors over individuals stored in quadstore (e.g. of opened project).
+
+    Provides the same connectors as RelationIndex, so it can be used instead of
+    it when data aren't loaded as records.
+    """
+
+    def __init__(self, world=default_world):
+        """Initialize query layer.
+
+        Args:
+            world (World): owlready2 world containing the individuals
+        """
+        self.world = world
+        self._params = {
+            "prefix": len(BASE_IRI) + 2,
+            "has_location": onto.has_location.storid,
+            "has_item": onto.has_item.storid,
+            "has_date": onto.has_date.storid,
+            "has_ordered_items": onto.has_ordered_items.storid,
+            "has_onhand_qty": onto.has_onhand_qty.storid,
+            "has_total_qty": onto.has_total_qty.storid,
+        }
+        self._queries = {}
+        self._dates = None
+        # Temporary table is shared by all queries of the connection
+        self._lock = Lock()
+
+    @property
+    def dates(self):
+        """Get literals of inventory dates mapped to the dates."""
+        if self._dates is None:
+            self._dates = {
+                from_literal(o, d): o
+                for o, d in self.world.graph.execute(
+                    "SELECT DISTINCT o, d FROM datas WHERE p=?",
+                    (self._params["has_date"],),
+                )
+            }
+        return self._dates
+
+    def _date(self, date):
+        """Get literal of inventory date valid as of given date."""
+        return self.dates.get(snapshot_date(self.dates, date))
+
+    def _select(self, sql, names, **params):
+        """Run query over selected names.
+
+        Args:
+            sql (str): query reading storage ids of selection from vw_selection
+            names (Iterable[str]): names of selected objects
+            **params: values of query parameters
+
+        Returns:
+            list[tuple]: rows of the result
+        """
+        graph = self.world.graph
+        with self._lock:
+            graph.acquire_write_lock()
+            try:
+                db = graph.db
+                db.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS vw_selection "
+                    "(storid INTEGER PRIMARY KEY)"
+                )
+                db.execute("DELETE FROM vw_selection")
+                db.executemany(
+                    "INSERT OR IGNORE INTO vw_selection "
+                    "SELECT storid FROM resources WHERE iri=?",
+                    ((f"{BASE_IRI}#{name}",) for name in names),
+                )
+                rows = db.execute(sql, {**self._params, **params}).fetchall()
+                db.execute("DELETE FROM vw_selection")
+                db.commit()
+            finally:
+                graph.release_write_lock()
+        return rows
+
+    def _related(self, names, *path, date=None):
+        """Get names of objects related to given names through path of relations."""
+        if path not in self._queries:
+            self._queries[path] = _compile(*path)
+        return {
+            name
+            for (name,) in self._select(
+                self._queries[path], names, date=self._date(date)
+            )
+        }
+
+    def items_by_locations(self, locations, date=None):
+        """Get names of items stored at given locations as of given date."""
+        return self._related(locations, "locations", "items", date=date)
+
+    def items_by_orders(self, orders):
+        """Get names of items included in given orders."""
+        return self._related(orders, "orders", "items")
+
+    def orders_by_items(self, items):
+        """Get names of orders containing at least one of given items."""
+        return self._related(items, "items", "orders")
+
+    def orders_by_locations(self, locations, date=None):
+        """Get names of orders containing items stored at given locations."""
+        return self._related(locations, "locations", "items", "orders", date=date)
+
+    def locations_by_items(self, items, date=None):
+        """Get names of locations storing given items as of given date."""
+        return self._related(items, "items", "locations", date=date)
+
+    def locations_by_orders(self, orders, date=None):
+        """Get names of locations storing items of given orders as of given date."""
+        return self._related(orders, "orders", "items", "locations", date=date)
+
+    def propagate(self, locations=(), items=(), orders=(), date=None):
+        """Get selection related to given names across all tabs (see RelationIndex)."""
+        items = set(items) | self.items_by_locations(locations, date)
+        orders = set(orders) | self.orders_by_items(items)
+        items |= self.items_by_orders(orders)
+        locations = set(locations) | self.locations_by_items(items, date)
+        return locations, items, orders
+
+    def item_quantities(self, items, date=None):
+        """Get on-hand quantity of given items at each location as of given date.
+
+        Returns:
+            dict[str, int]: location name mapped to summed on-hand quantity
+        """
+        rows = self._select(
+            "SELECT substr(r.iri, :prefix), SUM(q.o) FROM vw_selection sel "
+            "JOIN objs a ON a.p=:has_item AND a.o=sel.storid "
+            "JOIN datas d ON d.s=a.s AND d.p=:has_date AND d.o=:date "
+            "JOIN datas q ON q.s=a.s AND q.p=:has_onhand_qty "
+            "JOIN objs l ON l.s=a.s AND l.p=:has_location "
+            "JOIN resources r ON r.storid=l.o GROUP BY l.o",
+            items,
+            date=self._date(date),
+        )
+        return dict(rows)
+
+    def order_quantities(self, orders, date=None):
+        """Get ordered quantity of items stored at each location as of given date.
+
+        Quantity of ordered item is added to every location storing the item.
+
+        Returns:
+            dict[str, int]: location name mapped to summed ordered quantity
+        """
+        rows = self._select(
+            "SELECT substr(r.iri, :prefix), SUM(q.o) FROM vw_selection sel "
+            "JOIN objs a ON a.s=sel.storid AND a.p=:has_ordered_items "
+            "JOIN datas q ON q.s=a.o AND q.p=:has_total_qty "
+            "JOIN objs b ON b.s=a.o AND b.p=:has_item "
+            "JOIN objs i ON i.p=:has_item AND i.o=b.o "
+            "JOIN datas d ON d.s=i.s AND d.p=:has_date AND d.o=:date "
+            "JOIN objs l ON l.s=i.s AND l.p=:has_location "
+            "JOIN resources r ON r.storid=l.o GROUP BY l.o",
+            orders,
+            date=self._date(date),
+        )
+        return dict(rows)
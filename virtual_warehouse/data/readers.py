@@ -0,0 +1,348 @@
+"""Readers providing rows of sheets independently of the file format.
+
+Each reader iterates rows of a sheet in batches, values are projected to columns
+of the sheet schema. Conversion of values (types, units, dates) is compiled once
+per sheet schema and reader (see compile_converter) and applied to whole rows.
+Values of categorical columns (zones, types, units, ids repeated across rows) are
+interned, so each distinct value is stored only once.
+"""
+import csv
+import os
+import sys
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+
+import xlsxio
+from xlrd import open_workbook
+
+from virtual_warehouse.data.utils import dim_factors, weight_factors
+
+# Number of rows read from sheet at once
+BATCH_SIZE = 1000
+DATE_FORMAT = "%d.%m.%Y"
+# Extensions of delimited text files, each file is a single sheet
+CSV_EXTENSIONS = (".csv", ".tsv")
+# Number of lines used for detection of CSV delimiter
+CSV_SAMPLE_LINES = 20
+# Day zero of Excel serial dates (1900 and 1904 date systems)
+EXCEL_EPOCH = datetime(1899, 12, 30)
+EXCEL_EPOCH_1904 = datetime(1904, 1, 1)
+
+
+class SheetSchema:
+    """Columns of sheet type, their types and blocks of columns sharing units."""
+
+    def __init__(self, types, dims=(), weights=(), categories=()):
+        """Initialize schema.
+
+        Args:
+            types (list[type]): types of columns (str, int, float or datetime)
+            dims (list[tuple[tuple[int], int]]): blocks of dimension columns
+                converted to meters, each as (indexes of columns, index of unit)
+            weights (list[tuple[tuple[int], int]]): blocks of weight columns
+                converted to kilograms, each as (indexes of columns, index of unit)
+            categories (list[int]): indexes of string columns with repeated values
+        """
+        self.types = types
+        self.width = len(types)
+        self.categories = categories
+        self.units = [(cols, uom, dim_factors) for cols, uom in dims] + [
+            (cols, uom, weight_factors) for cols, uom in weights
+        ]
+
+
+def _item_units(offset):
+    """Get unit blocks of ITEMmaster unit levels (8 columns per level)."""
+    return range(offset, offset + 5 * 8, 8)
+
+
+# Schemas of sheet types, values of unit columns are removed once converted
+SHEET_SCHEMAS = {
+    "Locations": SheetSchema(
+        [str, str, str, str, float, float, float, str, float, str, str],
+        dims=[((4, 5, 6), 7)],
+        weights=[((8,), 9)],
+        categories=[1, 2, 3, 10],
+    ),
+    "Coordinates": SheetSchema([str, float, float, float]),
+    "Items": SheetSchema(
+        [str, str, str, str] + 5 * [int, str, float, float, float, str, float, str],
+        dims=[((c + 2, c + 3, c + 4), c + 5) for c in _item_units(4)],
+        weights=[((c + 6,), c + 7) for c in _item_units(4)],
+        categories=[2, 3] + [c + 1 for c in _item_units(4)],
+    ),
+    "Inventory": SheetSchema(
+        [datetime, str, str, str, datetime, int, int, int, int, int],
+        categories=[1, 2, 3],
+    ),
+    "Orders": SheetSchema(
+        [str, str, str, datetime, datetime, datetime, int, str, int, int, str],
+        categories=[0, 1, 2, 7, 10],
+    ),
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Parse date from text (dd.mm.yyyy or Excel serial number), memoized."""
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        return EXCEL_EPOCH + timedelta(days=float(value))
+
+
+def _to_str(value):
+    """Convert value to string, integral numbers are written without decimals."""
+    if value is None:
+        return ""
+    if type(value) is float and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _to_int(value):
+    """Convert value to integer (None if empty)."""
+    if value is None or value == "":
+        return None
+    return int(float(value))
+
+
+def _to_float(value):
+    """Convert value to float (None if empty)."""
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _date_converter(epoch):
+    """Create converter of dates using given epoch for serial numbers."""
+
+    @lru_cache(maxsize=4096)
+    def from_serial(value):
+        return epoch + timedelta(days=value)
+
+    def to_date(value):
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, (int, float)):
+            return from_serial(value)
+        return parse_date(value)
+
+    return to_date
+
+
+def compile_converter(schema, native=(), epoch=EXCEL_EPOCH):
+    """Compile function converting raw rows of sheet into typed tuples.
+
+    Only columns with types not provided by the reader are converted. Unit of each
+    block of columns is resolved once per row and its column is set to None.
+    Strings of categorical columns are interned and dates are cached, so equal
+    values of different rows are the same object.
+
+    Args:
+        schema (SheetSchema): schema of the sheet
+        native (tuple[type]): types which the reader already returns
+        epoch (datetime.datetime): day zero of serial dates of the file
+
+    Returns:
+        Callable[[list], tuple]: function converting single row
+    """
+    converters = {
+        str: _to_str,
+        int: _to_int,
+        float: _to_float,
+        datetime: _date_converter(epoch),
+    }
+    columns = [
+        (i, converters[t]) for i, t in enumerate(schema.types) if t not in native
+    ]
+    units = schema.units
+    categories = schema.categories
+    width = schema.width
+    intern = sys.intern
+
+    def convert(row):
+        row = list(row[:width])
+        size = len(row)
+        for i, to_type in columns:
+            if i < size:
+                row[i] = to_type(row[i])
+        for cols, uom, factors in units:
+            if uom < size and row[uom]:
+                factor = factors[row[uom].lower()]
+                for i in cols:
+                    if row[i] is not None:
+                        row[i] *= factor
+                row[uom] = None
+        for i in categories:
+            if i < size and type(row[i]) is str:
+                row[i] = intern(row[i])
+        return tuple(row)
+
+    return convert
+
+
+class XlsxReader:
+    """Reader of .xlsx files, values are typed by xlsxio library."""
+
+    native = (str, int, float)
+    epoch = EXCEL_EPOCH
+
+    def __init__(self, file_path):
+        """Open .xlsx file."""
+        self._doc = xlsxio.XlsxioReader(file_path)
+
+    def sheet_names(self):
+        """Get names of all sheets."""
+        return self._doc.get_sheet_names()
+
+    def iter_batches(self, sheet_name, schema, batch_size=BATCH_SIZE):
+        """Iterate rows of the sheet (without header) in lists of rows.
+
+        Args:
+            sheet_name (str): name of the sheet
+            schema (SheetSchema): schema of the sheet
+            batch_size (int): number of rows in single batch
+
+        Returns:
+            Iterable[list[list]]: batches of rows with raw values
+        """
+        # Dates are stored either as text or serial numbers, both parsed from text
+        types = [str if t is datetime else t for t in schema.types]
+        with self._doc.get_sheet(sheet_name, types=types) as sheet:
+            sheet.read_header()
+            batch = []
+            for row in sheet.iter_rows():
+                batch.append(row)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    def close(self):
+        """Close the file."""
+        self._doc.close()
+
+
+class XlsReader:
+    """Reader of .xls files, rows are assembled from slices of columns."""
+
+    native = ()
+
+    def __init__(self, file_path):
+        """Open .xls file, sheets are loaded on first access."""
+        self._doc = open_workbook(file_path, on_demand=True)
+        self.epoch = EXCEL_EPOCH_1904 if self._doc.datemode else EXCEL_EPOCH
+
+    def sheet_names(self):
+        """Get names of all sheets."""
+        return self._doc.sheet_names()
+
+    def iter_batches(self, sheet_name, schema, batch_size=BATCH_SIZE):
+        """Iterate rows of the sheet (without header) in lists of rows.
+
+        Args:
+            sheet_name (str): name of the sheet
+            schema (SheetSchema): schema of the sheet
+            batch_size (int): number of rows in single batch
+
+        Returns:
+            Iterable[list[tuple]]: batches of rows with raw values
+        """
+        sheet = self._doc.sheet_by_name(sheet_name)
+        columns = range(min(schema.width, sheet.ncols))
+        for start in range(1, sheet.nrows, batch_size):
+            end = min(start + batch_size, sheet.nrows)
+            yield list(zip(*(sheet.col_values(c, start, end) for c in columns)))
+
+    def close(self):
+        """Release loaded sheets."""
+        self._doc.release_resources()
+
+
+def open_csv(file_path):
+    """Open CSV or TSV file for streaming its rows, delimiter of CSV is detected.
+
+    Args:
+        file_path (str): path to .csv or .tsv file
+
+    Returns:
+        tuple[file, Iterable[list[str]]]: opened file (must be closed) and rows
+    """
+    f = open(file_path, newline="", encoding="utf-8-sig", errors="replace")
+    delimiter = "\t"
+    if not file_path.lower().endswith(".tsv"):
+        sample = "".join(f.readline() for _ in range(CSV_SAMPLE_LINES))
+        f.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+        except csv.Error:
+            delimiter = ","
+    return f, csv.reader(f, delimiter=delimiter)
+
+
+class CsvReader:
+    """Reader of CSV and TSV files, files of one directory are sheets of workbook.
+
+    Files are streamed, so memory usage doesn't depend on size of the files.
+    """
+
+    native = ()
+    epoch = EXCEL_EPOCH
+
+    def __init__(self, file_path):
+        """Open directory containing the file."""
+        self.directory = os.path.dirname(os.path.abspath(file_path))
+
+    def sheet_names(self):
+        """Get names of all CSV and TSV files in the directory."""
+        return sorted(
+            n for n in os.listdir(self.directory) if n.lower().endswith(CSV_EXTENSIONS)
+        )
+
+    def sheet_path(self, sheet_name):
+        """Get path of file containing the sheet."""
+        return os.path.join(self.directory, sheet_name)
+
+    def iter_batches(self, sheet_name, schema, batch_size=BATCH_SIZE):
+        """Iterate rows of the sheet (without header) in lists of rows.
+
+        Args:
+            sheet_name (str): name of the sheet (file name)
+            schema (SheetSchema): schema of the sheet
+            batch_size (int): number of rows in single batch
+
+        Returns:
+            Iterable[list[list[str]]]: batches of rows with raw values
+        """
+        f, rows = open_csv(self.sheet_path(sheet_name))
+        with f:
+            next(rows, None)
+            batch = list(islice(rows, batch_size))
+            while batch:
+                yield batch
+                batch = list(islice(rows, batch_size))
+
+    def close(self):
+        """Nothing to release, files are closed after reading."""
+
+
+# Readers of supported file formats by file extension
+READERS = {
+    ".xlsx": XlsxReader,
+    ".xls": XlsReader,
+    ".csv": CsvReader,
+    ".tsv": CsvReader,
+}
+
+
+def open_reader(file_path):
+    """Open reader of the file based on its extension (.xls reader is default)."""
+    for ext, reader in READERS.items():
+        if file_path.lower().endswith(ext):
+            return reader(file_path)
+    return XlsReader(file_path)
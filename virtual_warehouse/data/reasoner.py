@@ -0,0 +1,162 @@
+"""Long-lived worker process running the reasoner (Pellet) over a copy of ontology.
+
+The worker is forked with the current ontology and keeps it loaded between jobs.
+Jobs contain only definitions of custom classes, the worker replies with storage
+ids of individuals inferred to be instances of the class (storage ids are shared
+with the parent process). The worker is restarted when individuals in the
+ontology change or after a job exceeds its time budget.
+"""
+import os
+import signal
+import sys
+import traceback
+from multiprocessing import Pipe, Process
+from threading import Lock
+
+import owlready2
+from owlready2 import (  # skipcq: PYL-W0611
+    ConstrainedDatatype,
+    PropertyChain,
+    destroy_entity,
+    sync_reasoner_pellet,
+)
+from owlready2.base import rdf_type
+
+from virtual_warehouse.data.data_model import *  # skipcq: PYL-W0614
+
+
+def use_private_backend():
+    """Move ontology of forked process to its own in-memory quadstore.
+
+    Forked worker must not write into (or read through connection of) the project
+    file shared with the app.
+    """
+    if default_world.filename != ":memory:":
+        default_world.set_backend(filename=":memory:")
+
+
+def _define(definitions, defined):
+    """Create custom classes in worker, changed definitions are replaced.
+
+    Args:
+        definitions (list[tuple[str, str, str]]): name, base class name and
+            condition of each custom class, in order of creation
+        defined (dict[str, tuple[str, str]]): definitions already created
+    """
+    for name, cls, condition in definitions:
+        if defined.get(name) == (cls, condition):
+            continue
+        if name not in defined and onto[name] is not None:
+            # Class created before the worker was forked
+            defined[name] = (cls, condition)
+            continue
+        if name in defined:
+            destroy_entity(onto[name])
+        with onto:
+            type(name, (eval(cls),), {"equivalent_to": eval(condition)})
+        defined[name] = (cls, condition)
+
+
+def _serve(connection, java_path):
+    """Run jobs received through connection until None is received."""
+    if hasattr(os, "setpgrp"):
+        # Reasoner (Java) process is stopped together with the worker
+        os.setpgrp()
+    owlready2.JAVA_EXE = java_path
+    use_private_backend()
+    defined = {}
+
+    while True:
+        job = connection.recv()
+        if job is None:
+            return
+        name, definitions = job
+        try:
+            _define(definitions, defined)
+            with onto:
+                sync_reasoner_pellet(debug=0, infer_property_values=False)
+            rows = default_world.graph.execute(
+                "SELECT s FROM objs WHERE p=? AND o=?", (rdf_type, onto[name].storid)
+            )
+            storids = [s for (s,) in rows]
+            connection.send((True, storids))
+        except Exception:  # skipcq: PYL-W0703
+            connection.send((False, traceback.format_exc()))
+
+
+class ReasonerWorker:
+    """Parent side of the reasoner worker process."""
+
+    def __init__(self):
+        self._process = None
+        self._connection = None
+        # Version of records and java path the worker was started with
+        self._state = None
+        self._lock = Lock()
+
+    @property
+    def running(self):
+        """Check if worker process is running."""
+        return self._process is not None and self._process.is_alive()
+
+    def _start(self, state):
+        """Fork worker process with the current ontology."""
+        self._connection, child = Pipe()
+        self._process = Process(
+            target=_serve, args=(child, owlready2.JAVA_EXE), daemon=True
+        )
+        self._process.start()
+        child.close()
+        self._state = state
+
+    def classify(self, name, definitions, version, timeout):
+        """Infer instances of custom class in the worker.
+
+        Args:
+            name (str): name of the classified custom class
+            definitions (list[tuple[str, str, str]]): name, base class name and
+                condition of all custom classes in order of creation
+            version (tuple[int, int]): version of records materialized in the
+                ontology and of removed custom classes
+            timeout (float): time budget of the job in seconds
+
+        Returns:
+            list[int]: storage ids of the instances, None if reasoning failed
+        """
+        with self._lock:
+            state = (version, owlready2.JAVA_EXE)
+            if not self.running or self._state != state:
+                self.stop()
+                self._start(state)
+
+            self._connection.send((name, definitions))
+            if not self._connection.poll(timeout):
+                # Budget exceeded, warm state is lost
+                self.stop()
+                return None
+            try:
+                success, result = self._connection.recv()
+            except EOFError:
+                self.stop()
+                return None
+            if not success:
+                sys.stderr.write(result)
+                return None
+            return result
+
+    def stop(self):
+        """Stop the worker process including running reasoner."""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            if hasattr(os, "killpg"):
+                try:
+                    os.killpg(self._process.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            else:
+                self._process.terminate()
+        self._process.join()
+        self._connection.close()
+        self._process = None
+        self._connection = None
@@ -0,0 +1,646 @@
+"""Lightweight in-memory data model with lazy creation of ontology individuals.
+
+Records are plain objects with slots, their attributes have the same names as
+properties of ontology classes (see data_model), so that they can be used instead
+of ontology individuals by parsers, tab models, map and plugins. Records are kept
+in RecordStore which mirrors behaviour of the ontology: creating a record with
+an existing name updates the record in place.
+
+Ontology individuals are created from records only when the ontology is used
+(reasoning, SPARQL queries, export), see RecordStore.materialize.
+"""
+from threading import RLock
+
+from owlready2.base import rdf_type
+
+from virtual_warehouse.data.data_model import (
+    BASE_IRI,
+    DATASET_CLASSES,
+    DATASETS,
+    BulkWriter,
+    Country,
+    Inventory,
+    Item,
+    ItemUnit,
+    Location,
+    Order,
+    OrderedItem,
+    RackLocation,
+    clear_dataset,
+    default_world,
+    onto,
+)
+from virtual_warehouse.data.utils import (
+    convert_date,
+    convert_dim,
+    convert_type,
+    convert_weight,
+)
+
+
+class RecordStore:
+    """Collection of all records mapping name of record to the record."""
+
+    def __init__(self, world=default_world):
+        """Initialize empty store.
+
+        Args:
+            world (World): owlready2 world where records are materialized
+        """
+        self.world = world
+        self._records = {}
+        # Record classes whose all individuals are removed on next materialization
+        self._destroyed = set()
+        # Names of removed records whose individuals must be removed as well
+        self._removed = set()
+        # Names of added or modified records whose individuals must be rewritten
+        self._changed = set()
+        self._dirty = False
+        self._lock = RLock()
+        # Increased whenever individuals in the ontology are replaced
+        self.version = 0
+
+    def get(self, name):
+        """Get record by name (None if it doesn't exist)."""
+        return self._records.get(name)
+
+    def add(self, record):
+        """Add new record into the store."""
+        with self._lock:
+            self._records[record.name] = record
+            self._changed.add(record.name)
+            self._dirty = True
+
+    def remove(self, record):
+        """Remove record from the store (equivalent of destroy_entity)."""
+        with self._lock:
+            if self._records.get(record.name) is record:
+                del self._records[record.name]
+            self._changed.discard(record.name)
+            self._removed.add(record.name)
+            self._dirty = True
+
+    def changed(self, record):
+        """Mark that record was modified and its individual must be updated."""
+        with self._lock:
+            self._changed.add(record.name)
+            self._dirty = True
+
+    def destroy_all(self, cls):
+        """Remove all records of given record class (and all its individuals)."""
+        with self._lock:
+            self._records = {
+                k: v for k, v in self._records.items() if type(v) is not cls
+            }
+            self._destroyed.add(cls)
+            self._dirty = True
+
+    def reset(self):
+        """Remove all records without modifying ontology (e.g. on project open)."""
+        with self._lock:
+            self._records = {}
+            self._destroyed = set()
+            self._removed = set()
+            self._changed = set()
+            self._dirty = False
+            self.version += 1
+
+    @property
+    def dirty(self):
+        """Check if ontology doesn't contain current records."""
+        return self._dirty
+
+    def materialize(self, batch_size=50000):
+        """Create ontology individuals of records which changed since last call.
+
+        Individuals of added, modified and removed records are replaced by
+        individuals created from current records, other individuals are kept as
+        they are. Storage ids of individuals are kept, so that references from
+        other individuals stay valid. Instances of custom classes asserted in the
+        main ontology are kept as well (see OntoManager.refresh). Safe to call from
+        any thread, the store can't be modified during materialization.
+
+        Args:
+            batch_size (int): number of triples written in one batch
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            removed = self._clear()
+
+            entities = {}
+            records = sorted(
+                (self._records[n] for n in self._changed if n in self._records),
+                key=lambda r: MATERIALIZE_ORDER.index(type(r)),
+            )
+            with BulkWriter(batch_size=batch_size, replaced=removed) as writer:
+                for record in records:
+                    entities[record.name] = writer.create(
+                        record.onto_class,
+                        record.name,
+                        **record.properties(entities),
+                    )
+            created = {e.storid for e in entities.values()}
+            self._remove_references(removed - created)
+            # Replaced individuals are loaded again with their custom classes
+            for storid in removed & created:
+                self.world._entities.pop(storid, None)
+
+            self._destroyed = set()
+            self._removed = set()
+            self._changed = set()
+            self._dirty = False
+            self.version += 1
+
+    def _clear(self):
+        """Remove triples of individuals replaced by changed or removed records.
+
+        Only triples stored in graphs of datasets are removed, instances of custom
+        classes (asserted in the main ontology) stay valid for rewritten records.
+
+        Returns:
+            set[int]: storage ids of removed individuals
+        """
+        # Ontology class -> whether all its individuals are removed
+        classes = {
+            c: r in self._destroyed for r in MATERIALIZE_ORDER for c in r.onto_classes
+        }
+        # Datasets whose all records were destroyed are removed in bulk
+        cleared = set()
+        for dataset in DATASETS:
+            if all(d for c, d in classes.items() if DATASET_CLASSES[c] == dataset):
+                cleared |= clear_dataset(dataset, references=False)
+
+        removed = set()
+        graph = self.world.graph
+        graph.acquire_write_lock()
+        try:
+            db = graph.db
+            for cls, destroyed in classes.items():
+                if destroyed:
+                    removed.update(
+                        s
+                        for (s,) in db.execute(
+                            "SELECT s FROM objs WHERE p=? AND o=?",
+                            (rdf_type, cls.storid),
+                        )
+                    )
+            # Individuals of changed records are found through temporary table
+            db.execute("CREATE TEMP TABLE IF NOT EXISTS vw_names (iri TEXT)")
+            db.execute("DELETE FROM vw_names")
+            db.executemany(
+                "INSERT INTO vw_names VALUES (?)",
+                ((f"{BASE_IRI}#{name}",) for name in self._changed | self._removed),
+            )
+            removed.update(
+                s
+                for (s,) in db.execute(
+                    "SELECT DISTINCT objs.s FROM vw_names "
+                    "JOIN resources ON resources.iri = vw_names.iri "
+                    "JOIN objs ON objs.s = resources.storid AND objs.p=? "
+                    f"AND objs.o IN ({','.join('?' * len(classes))})",
+                    (rdf_type, *(c.storid for c in classes)),
+                )
+            )
+            db.execute("DELETE FROM vw_names")
+            subjects = [(s, onto.graph.c) for s in removed]
+            db.executemany("DELETE FROM objs WHERE s=? AND c!=?", subjects)
+            db.executemany("DELETE FROM datas WHERE s=? AND c!=?", subjects)
+            db.commit()
+        finally:
+            graph.release_write_lock()
+        # Python objects of removed individuals must be loaded again
+        for storid in removed:
+            self.world._entities.pop(storid, None)
+        return removed | cleared
+
+    def _remove_references(self, storids):
+        """Remove remaining triples of individuals which weren't created again.
+
+        Removes references to the individuals and their instances of custom classes.
+        """
+        if not storids:
+            return
+        graph = self.world.graph
+        graph.acquire_write_lock()
+        try:
+            subjects = [(s,) for s in storids]
+            graph.db.executemany("DELETE FROM objs WHERE o=?", subjects)
+            graph.db.executemany("DELETE FROM objs WHERE s=?", subjects)
+            graph.db.executemany("DELETE FROM datas WHERE s=?", subjects)
+            graph.db.commit()
+        finally:
+            graph.release_write_lock()
+
+
+store = RecordStore()
+
+
+class Record:
+    """Base class of records, each record has unique name as ontology individual.
+
+    Attributes (has_*) which aren't defined by the record are None, the same
+    way as functional properties of ontology individuals.
+    """
+
+    __slots__ = ("name",)
+    # Ontology classes of individuals represented by the record class
+    onto_classes = ()
+    # Attributes stored as ontology properties
+    properties_names = ()
+
+    def __getattr__(self, attr):
+        if attr.startswith("has_"):
+            return None
+        raise AttributeError(f"'{type(self).__name__}' has no attribute '{attr}'")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+    @classmethod
+    def _get_or_create(cls, name):
+        """Get record of the class by name, create new one if it doesn't exist."""
+        record = store.get(name)
+        if type(record) is not cls:
+            record = cls()
+            record.name = name
+            store.add(record)
+        else:
+            store.changed(record)
+        return record
+
+    @property
+    def iri(self):
+        """Get IRI of ontology individual representing the record."""
+        return f"{BASE_IRI}#{self.name}"
+
+    @property
+    def storid(self):
+        """Get storage id of ontology individual (None if it was never created)."""
+        return store.world._abbreviate(self.iri, False)
+
+    @property
+    def onto_class(self):
+        """Get ontology class of individual representing the record."""
+        return self.onto_classes[0]
+
+    def properties(self, entities):
+        """Get values of ontology properties, records are replaced by individuals.
+
+        Args:
+            entities (dict[str, Thing]): individuals of already materialized records
+        """
+        return {
+            attr: _to_entity(getattr(self, attr), entities)
+            for attr in self.properties_names
+        }
+
+
+def _to_entity(value, entities):
+    """Replace record (or records in list) by ontology individual."""
+    if isinstance(value, list):
+        return [_to_entity(v, entities) for v in value]
+    if isinstance(value, Record):
+        return entities.get(value.name) or store.world[value.iri]
+    return value
+
+
+class CountryRecord(Record):
+    """Record of country (see Country)."""
+
+    __slots__ = ()
+    onto_classes = (Country,)
+
+    @classmethod
+    def create(cls, name, writer=None):  # skipcq: PYL-W0613
+        """Create country record."""
+        return cls._get_or_create(name)
+
+
+class ItemUnitRecord(Record):
+    """Record of packaging unit of item (see ItemUnit)."""
+
+    __slots__ = (
+        "has_conversion_qty",
+        "has_ref_qty_uom",
+        "has_length",
+        "has_width",
+        "has_height",
+        "has_weight",
+    )
+    onto_classes = (ItemUnit,)
+    properties_names = __slots__
+
+    @classmethod
+    def create(
+        cls,
+        _id,
+        conversion_qty,
+        qty_uom,
+        length,
+        width,
+        height,
+        dim_uom,
+        weight,
+        weight_uom,
+        writer=None,  # skipcq: PYL-W0613
+    ):
+        """Create record, same arguments as ItemUnit.create."""
+        record = cls._get_or_create(_id)
+        record.has_conversion_qty = conversion_qty
+        record.has_ref_qty_uom = qty_uom
+        record.has_length = convert_dim(length, dim_uom)
+        record.has_width = convert_dim(width, dim_uom)
+        record.has_height = convert_dim(height, dim_uom)
+        record.has_weight = convert_weight(weight, weight_uom)
+        return record
+
+
+class ItemRecord(Record):
+    """Record of item (see Item)."""
+
+    __slots__ = (
+        "has_description",
+        "has_gtype",
+        "has_required_zone",
+        "has_base_unit",
+        "has_unit_levels",
+    )
+    onto_classes = (Item,)
+    properties_names = __slots__
+
+    @classmethod
+    def create(
+        cls,
+        _id,
+        description,
+        gtype,
+        zone,
+        base_unit,
+        unit_levels,
+        writer=None,  # skipcq: PYL-W0613
+    ):
+        """Create record, same arguments as Item.create."""
+        record = cls._get_or_create(_id)
+        record.has_description = description
+        record.has_gtype = gtype
+        record.has_required_zone = zone
+        record.has_base_unit = base_unit
+        record.has_unit_levels = unit_levels
+        return record
+
+    @staticmethod
+    def destroy_all():
+        """Remove all item records as well as related unit records."""
+        store.destroy_all(ItemRecord)
+        store.destroy_all(ItemUnitRecord)
+
+
+class LocationRecord(Record):
+    """Record of location (see Location and RackLocation)."""
+
+    __slots__ = (
+        "has_ltype",
+        "has_lclass",
+        "has_lsubclass",
+        "has_length",
+        "has_width",
+        "has_height",
+        "has_max_weight",
+        "has_zone",
+        "has_x",
+        "has_y",
+        "has_z",
+        "has_freq",
+    )
+    onto_classes = (Location, RackLocation)
+    # Frequency is used only for displaying heat map
+    properties_names = __slots__[:-1]
+
+    @classmethod
+    def create(
+        cls,
+        _id,
+        ltype,
+        lclass,
+        lsubclass,
+        length,
+        width,
+        height,
+        dim_uom=None,
+        max_weight=None,
+        weight_uom=None,
+        zone=None,
+        x=None,
+        y=None,
+        z=None,
+        writer=None,  # skipcq: PYL-W0613
+    ):
+        """Create record, same arguments as Location.create."""
+        record = cls._get_or_create(_id)
+        record.has_ltype = convert_type(ltype)
+        record.has_lclass = lclass
+        record.has_lsubclass = lsubclass
+        record.has_length = convert_dim(length, dim_uom)
+        record.has_width = convert_dim(width, dim_uom)
+        record.has_height = convert_dim(height, dim_uom)
+        record.has_max_weight = (
+            convert_weight(max_weight, weight_uom) if max_weight else max_weight
+        )
+        record.has_zone = zone
+        record.has_x, record.has_y, record.has_z = x, y, z
+        if record.has_freq is None:
+            record.has_freq = 0
+        return record
+
+    @property
+    def onto_class(self):
+        """Get ontology class, rack locations are RackLocation individuals."""
+        return RackLocation if self.has_ltype == "rack" else Location
+
+    def set_coord(self, x, y, z):
+        """Additionally set coordinates of the location."""
+        self.has_x, self.has_y, self.has_z = x, y, z
+        store.changed(self)
+
+    def get_2d(self):
+        """Get planar coordinates of location (used for top-down view)."""
+        return (self.has_x, self.has_y)
+
+    @staticmethod
+    def destroy_all():
+        """Remove all location records."""
+        store.destroy_all(LocationRecord)
+
+
+class InventoryRecord(Record):
+    """Record of inventory balance for (date, location, item) (see Inventory)."""
+
+    __slots__ = (
+        "has_date",
+        "has_location",
+        "has_item",
+        "has_expiry_date",
+        "has_available_qty",
+        "has_onhand_qty",
+        "has_transit_qty",
+        "has_allocated_qty",
+        "has_suspense_qty",
+    )
+    onto_classes = (Inventory,)
+    properties_names = __slots__
+
+    @classmethod
+    def create(
+        cls,
+        date,
+        location_id,
+        ltype,  # skipcq: PYL-W0613
+        item_id,
+        expiry_date,
+        available_qty,
+        onhand_qty,
+        transit_qty,
+        allocated_qty,
+        suspense_qty,
+        item=None,
+        location=None,
+        writer=None,  # skipcq: PYL-W0613
+    ):
+        """Create record, same arguments as Inventory.create."""
+        record = cls._get_or_create(
+            f"{date.strftime('%Y:%m:%d')}-{location_id}-{item_id}"
+        )
+        record.has_date = date
+        record.has_location = store.get(location_id) if location is None else location
+        record.has_item = store.get(item_id) if item is None else item
+        record.has_expiry_date = convert_date(expiry_date, "%d.%m.%Y")
+        record.has_available_qty = available_qty
+        record.has_onhand_qty = onhand_qty
+        record.has_transit_qty = transit_qty
+        record.has_allocated_qty = allocated_qty
+        record.has_suspense_qty = suspense_qty
+        return record
+
+    @staticmethod
+    def destroy_all():
+        """Remove all inventory records."""
+        store.destroy_all(InventoryRecord)
+
+
+class OrderedItemRecord(Record):
+    """Record of item instance in order (see OrderedItem)."""
+
+    __slots__ = ("has_item", "has_requested_qty", "has_total_qty", "has_qty_uom")
+    onto_classes = (OrderedItem,)
+    properties_names = __slots__
+
+    @classmethod
+    def create(cls, _id, item, requested_qty, total_qty, qty_uom):
+        """Create record of ordered item."""
+        record = cls._get_or_create(_id)
+        record.has_item = item
+        record.has_requested_qty = requested_qty
+        record.has_total_qty = total_qty
+        record.has_qty_uom = qty_uom
+        return record
+
+
+class OrderRecord(Record):
+    """Record of single order (see Order)."""
+
+    __slots__ = (
+        "has_direction",
+        "has_country",
+        "has_delivery_date",
+        "has_s_ship_date",
+        "has_a_ship_date",
+        "has_line_num",
+        "has_ordered_items",
+    )
+    onto_classes = (Order,)
+    properties_names = __slots__
+
+    @classmethod
+    def create(
+        cls,
+        _id,
+        direction,
+        country_id,
+        delivery_date,
+        s_ship_date,
+        a_ship_date,
+        line_num,
+        item_id,
+        requested_qty,
+        total_qty,
+        qty_uom,
+        item=None,
+        country=None,
+        writer=None,  # skipcq: PYL-W0613
+    ):
+        """Create record, same arguments as Order.create."""
+        _id = str(_id)
+        record = cls._get_or_create(_id)
+        record.has_direction = direction
+        if country is None:
+            country = store.get(country_id) or CountryRecord.create(country_id)
+        record.has_country = country
+        record.has_delivery_date = convert_date(delivery_date, "%d.%m.%Y")
+        record.has_s_ship_date = convert_date(s_ship_date, "%d.%m.%Y")
+        record.has_a_ship_date = convert_date(a_ship_date, "%d.%m.%Y")
+        record.has_line_num = line_num
+        record.has_ordered_items = []
+        record.add_item(item_id, requested_qty, total_qty, qty_uom, item=item)
+        return record
+
+    def add_item(
+        self,
+        item_id,
+        requested_qty,
+        total_qty,
+        qty_uom,
+        item=None,
+        writer=None,  # skipcq: PYL-W0613
+    ):
+        """Create and add item instance into order."""
+        oi = OrderedItemRecord.create(
+            f"{self.name}-{item_id}",
+            store.get(item_id) if item is None else item,
+            requested_qty,
+            total_qty,
+            qty_uom,
+        )
+        if oi not in self.has_ordered_items:
+            self.has_ordered_items.append(oi)
+
+    @staticmethod
+    def destroy_all():
+        """Remove all order records as well as related ordered items and countries."""
+        store.destroy_all(OrderRecord)
+        store.destroy_all(OrderedItemRecord)
+        store.destroy_all(CountryRecord)
+
+
+# Records are materialized after records which they reference
+MATERIALIZE_ORDER = [
+    CountryRecord,
+    ItemUnitRecord,
+    ItemRecord,
+    LocationRecord,
+    InventoryRecord,
+    OrderedItemRecord,
+    OrderRecord,
+]
+
+# Record classes used instead of ontology classes
+RECORD_CLASSES = {
+    Country: CountryRecord,
+    ItemUnit: ItemUnitRecord,
+    Item: ItemRecord,
+    Location: LocationRecord,
+    RackLocation: LocationRecord,
+    Inventory: InventoryRecord,
+    OrderedItem: OrderedItemRecord,
+    Order: OrderRecord,
+}
@@ -0,0 +1,181 @@
+"""Adjacency indexes of relations between locations, items and orders.
+
+Relations are collected once from loaded inventory and orders, so connecting
+selections (e.g. items stored at selected locations) doesn't query the ontology.
+Relations through inventory are indexed by date of the inventory.
+"""
+from collections import OrderedDict
+from threading import Lock
+
+
+def snapshot_date(dates, date=None):
+    """Get date of inventory valid as of given date.
+
+    Args:
+        dates (Iterable[datetime.datetime]): dates of inventory
+        date (datetime.datetime): as-of date, None for the latest inventory
+
+    Returns:
+        datetime.datetime: latest date of inventory not after the as-of date
+            (None if there is no such inventory)
+    """
+    return max((d for d in dates if date is None or d <= date), default=None)
+
+
+class RelationIndex:
+    """Indexes mapping names of locations, items and orders to related names.
+
+    Locations are related to items through inventory of given date (item is
+    stored at the location), items are related to orders through ordered items.
+    """
+
+    def __init__(self, inventory=None, orders=None):
+        """Build indexes from loaded data.
+
+        Args:
+            inventory (dict[datetime.datetime, dict[str, list[Inventory]]]):
+                inventory mapping date to location id and list of inventory,
+                relations through inventory are indexed separately for each date
+            orders (dict[str, Order]): dictionary of orders mapping id to order
+        """
+        # Relations through inventory: date -> name -> set of related names
+        self.location_items = {}
+        self.item_locations = {}
+        # Relations through ordered items: name -> set of related names
+        self.item_orders = {}
+        self.order_items = {}
+
+        for date, group in (inventory or {}).items():
+            location_items = self.location_items[date] = {}
+            item_locations = self.item_locations[date] = {}
+            for inventories in group.values():
+                for inv in inventories:
+                    if inv.has_location is not None and inv.has_item is not None:
+                        self._link(
+                            location_items,
+                            item_locations,
+                            inv.has_location.name,
+                            inv.has_item.name,
+                        )
+
+        for order in (orders or {}).values():
+            for oi in order.has_ordered_items:
+                if oi.has_item is not None:
+                    self._link(
+                        self.order_items, self.item_orders, order.name, oi.has_item.name
+                    )
+
+    @staticmethod
+    def _link(forward, backward, a, b):
+        """Add relation a -> b into forward index and b -> a into backward index."""
+        forward.setdefault(a, set()).add(b)
+        backward.setdefault(b, set()).add(a)
+
+    @staticmethod
+    def _follow(index, names):
+        """Get union of names related to given names."""
+        result = set()
+        for name in names:
+            result.update(index.get(name, ()))
+        return result
+
+    @staticmethod
+    def _at(index, date):
+        """Get index of inventory valid as of given date (None for latest)."""
+        return index.get(snapshot_date(index, date), {})
+
+    def items_by_locations(self, locations, date=None):
+        """Get names of items stored at given locations as of given date."""
+        return self._follow(self._at(self.location_items, date), locations)
+
+    def items_by_orders(self, orders):
+        """Get names of items included in given orders."""
+        return self._follow(self.order_items, orders)
+
+    def orders_by_items(self, items):
+        """Get names of orders containing at least one of given items."""
+        return self._follow(self.item_orders, items)
+
+    def orders_by_locations(self, locations, date=None):
+        """Get names of orders containing items stored at given locations."""
+        return self.orders_by_items(self.items_by_locations(locations, date))
+
+    def locations_by_items(self, items, date=None):
+        """Get names of locations storing given items as of given date."""
+        return self._follow(self._at(self.item_locations, date), items)
+
+    def locations_by_orders(self, orders, date=None):
+        """Get names of locations storing items of given orders as of given date."""
+        return self.locations_by_items(self.items_by_orders(orders), date)
+
+    def propagate(self, locations=(), items=(), orders=(), date=None):
+        """Get selection related to given names across all tabs in one pass.
+
+        Relations are followed location -> item -> order -> item -> location,
+        e.g. checked locations are extended by all locations touched by orders
+        of items stored at them.
+
+        Args:
+            locations (Iterable[str]): names of checked locations
+            items (Iterable[str]): names of checked items
+            orders (Iterable[str]): names of checked orders
+            date (datetime.datetime): as-of date, None for the latest inventory
+
+        Returns:
+            tuple[set[str], set[str], set[str]]: names of related locations, items
+                and orders (including the given names)
+        """
+        items = set(items) | self.items_by_locations(locations, date)
+        orders = set(orders) | self.orders_by_items(items)
+        items |= self.items_by_orders(orders)
+        locations = set(locations) | self.locations_by_items(items, date)
+        return locations, items, orders
+
+
+class ResultCache:
+    """Least recently used cache of connector results with hit/miss counters."""
+
+    def __init__(self, maxsize=64):
+        """Initialize empty cache.
+
+        Args:
+            maxsize (int): maximal number of stored results
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        """Get number of stored results."""
+        return len(self._results)
+
+    def get(self, key, compute):
+        """Get stored result, compute and store it if missing.
+
+        Args:
+            key (Hashable): key of the result
+            compute (Callable): function without arguments computing the result
+
+        Returns:
+            object: stored or computed result
+        """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+
+        result = compute()
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Remove all stored results, counters are kept."""
+        with self._lock:
+            self._results.clear()
@@ -1,5 +1,7 @@
 """Utils for parsing the Excel data."""
+import time
 from datetime import datetime
+from functools import lru_cache
 
 dim_factors = {
     "m": 1,
@@ -27,8 +29,87 @@ types = {
 }
 
 
-def estimate_sheet_type(sheet):
-    """Estimate sheet type based on sheet name."""
+# Column signatures of sheet types, keywords expected in header of each column
+SHEET_COLUMNS = {
+    "Coordinates": [["loc"], ["x"], ["y"], ["z"]],
+    "Locations": [
+        ["loc"],
+        ["type"],
+        ["class"],
+        ["subclass"],
+        ["length"],
+        ["width"],
+        ["height"],
+        ["dim", "um", "uom"],
+    ],
+    "Items": [
+        ["item"],
+        ["desc"],
+        ["good", "type"],
+        ["zone"],
+        ["conv"],
+        ["qty", "um", "uom"],
+        ["length"],
+        ["width"],
+        ["height"],
+    ],
+    "Inventory": [
+        ["as at", "date"],
+        ["loc"],
+        ["type"],
+        ["item"],
+        ["expir"],
+        ["avail"],
+        ["onhand", "on hand"],
+        ["transit"],
+        ["alloc"],
+        ["suspen"],
+    ],
+    "Orders": [
+        ["order", "shipment", "id"],
+        ["direction"],
+        ["country"],
+        ["deliver"],
+        ["ship"],
+        ["ship"],
+        ["line"],
+        ["item"],
+        ["req"],
+        ["total"],
+        ["um", "uom", "unit"],
+    ],
+}
+
+# Minimal ratio of matching columns for estimating sheet type from header
+SIGNATURE_THRESHOLD = 0.6
+
+
+def _match_column(column, keywords):
+    """Check if column name matches one of keywords (single letters match exactly)."""
+    column = " ".join(str(column).lower().replace("_", " ").split())
+    return any(k == column if len(k) == 1 else k in column for k in keywords)
+
+
+def estimate_sheet_type(sheet, header=None):
+    """Estimate sheet type based on column signature of header and sheet name.
+
+    Args:
+        sheet (str): name of the sheet
+        header (list): values of header row (names of columns), if provided,
+            type with best matching column signature is preferred
+
+    Returns:
+        str: name of the type ("None" if type isn't recognized)
+    """
+    if header:
+        scores = {}
+        for t, signature in SHEET_COLUMNS.items():
+            matches = sum(_match_column(c, k) for c, k in zip(header, signature))
+            scores[t] = matches / len(signature)
+        best = max(scores, key=scores.get)
+        if scores[best] >= SIGNATURE_THRESHOLD:
+            return best
+
     sheet = sheet.lower()
     if "coord" in sheet:
         return "Coordinates"
@@ -43,6 +124,7 @@ def estimate_sheet_type(sheet):
     return "None"
 
 
+@lru_cache(maxsize=256)
 def convert_type(type_str):
     """Unify location type names."""
     return types.get(" ".join(type_str.lower().split()), "custom")
@@ -69,3 +151,99 @@ def convert_date(date, fmt="%d.%m.%Y"):
     if date:
         return datetime.strptime(date, fmt)
     return None
+
+
+class LoadProgress:
+    """Progress of loading split into stages (sheets) of different sizes.
+
+    Progress of each stage is weighted by its number of rows and by measured
+    throughput (time per row) of the stage, so that slow stages (e.g. inventory)
+    take appropriate part of the progress bar. Stages with unknown number of rows
+    use average number of rows of other stages until the number is known.
+    """
+
+    def __init__(self, callback, interval=0.1):
+        """Initialize progress.
+
+        Args:
+            callback (Callable[[float, str], None]): function receiving progress
+                value (0 - 1) and text describing current stage
+            interval (float): minimal time (seconds) between two callback calls
+        """
+        self._callback = callback
+        self._interval = interval
+        self._last_report = 0
+        self._value = 0
+        # Stage name -> [total rows, done rows, start time, elapsed time, finished]
+        self._stages = {}
+
+    def add_stage(self, name, total=None):
+        """Add stage with expected number of rows (None if unknown)."""
+        self._stages[name] = [total, 0, None, 0, False]
+
+    def start(self, name, total=None):
+        """Mark start of the stage processing."""
+        stage = self._stages[name]
+        stage[2] = time.time()
+        if total is not None:
+            stage[0] = total
+        self._report(name, force=True)
+
+    def update(self, name, done, total=None):
+        """Update number of processed rows of the stage (and total if known)."""
+        stage = self._stages[name]
+        stage[1] = done
+        if total is not None:
+            stage[0] = total
+        stage[3] = time.time() - stage[2]
+        self._report(name)
+
+    def finish(self, name):
+        """Mark stage as finished."""
+        stage = self._stages[name]
+        stage[0] = stage[1] = max(stage[1], stage[0] or 0)
+        stage[3] = time.time() - stage[2] if stage[2] else 0
+        stage[4] = True
+        self._report(name, force=True)
+
+    def _seconds_per_row(self):
+        """Get measured average time per row (used for stages not started yet)."""
+        done = sum(s[1] for s in self._stages.values() if s[2] is not None)
+        elapsed = sum(s[3] for s in self._stages.values() if s[2] is not None)
+        return elapsed / done if done and elapsed else 1
+
+    @property
+    def value(self):
+        """Get current progress value from interval [0, 1]."""
+        known = [s[0] for s in self._stages.values() if s[0] is not None]
+        default_total = sum(known) / len(known) if known else 1
+        default_cost = self._seconds_per_row()
+
+        done, total = 0, 0
+        for s_total, s_done, start, elapsed, finished in self._stages.values():
+            s_total = default_total if s_total is None else max(s_total, s_done)
+            cost = elapsed / s_done if s_done and elapsed else default_cost
+            done += s_done * cost
+            total += s_total * cost
+
+        if all(s[4] for s in self._stages.values()):
+            return 1
+        # Progress must not go back even if estimates change
+        self._value = min(max(self._value, done / total if total else 0), 0.99)
+        return self._value
+
+    def _report(self, name, force=False):
+        """Call callback with current progress (limited by interval)."""
+        now = time.time()
+        if not force and now - self._last_report < self._interval:
+            return
+        self._last_report = now
+
+        s_total, s_done, start, elapsed, finished = self._stages[name]
+        text = f"{name}: {s_done:,}"
+        if s_total is not None:
+            text += f" / {s_total:,}"
+        text += " rows"
+        if s_done and elapsed:
+            text += f" ({s_done / elapsed:,.0f} rows/s)"
+        self._callback(self.value, text)
@@ -9,6 +9,12 @@ from PySide2.QtCore import (
 )
 
 from virtual_warehouse.environment import LOCATION_TYPE_MAP
+from virtual_warehouse.tab_controller import WrappedObjects
+
+
+def _as_list(locations):
+    """Get list of locations represented by location or list of locations."""
+    return locations if isinstance(locations, list) else [locations]
 
 
 class SingleLocation(QObject):
@@ -96,24 +102,27 @@ class UniversalLocationListModel(QAbstractListModel):
     maxChanged = Signal()
     levelChanged = Signal()
 
-    def __init__(self, on_change, objects=None, parent=None):
+    def __init__(self, object_class, on_change, objects=None, parent=None):
         super(UniversalLocationListModel, self).__init__(parent)
+        self._object_class = object_class
         self._on_change = on_change
         self.set_data({} if objects is None else objects)
         self._level = -1
         self._max_level = 1
 
     def set_data(self, objects):
-        """Set new objects which should already by wrapped by location class."""
-        self._objects = objects
+        """Set new objects (locations or lists of locations merged together).
+        Objects are wrapped by location class on access, not while the data are set.
+        """
+        self._objects = WrappedObjects(self._object_class, objects)
         self._keys = list(objects.keys())
         self.name_to_idx = {}
         for i, k in enumerate(self._keys):
-            for n in self._objects[k].names:
-                self.name_to_idx[n] = i
+            for l in _as_list(objects[k]):
+                self.name_to_idx[l.name] = i
 
         if objects:
-            self._max_level = max(l._i.has_z for l in self._objects.values())
+            self._max_level = max(_as_list(l)[0].has_z for l in objects.values())
             self.maxChanged.emit()
 
     def get_idx(self, idx):
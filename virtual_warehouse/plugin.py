@@ -1,6 +1,7 @@
 import importlib
 import pkgutil
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 from PySide2.QtCore import Property, QObject, Qt, Signal
 
@@ -15,6 +16,8 @@ class BasePlugin(ABC):
         on_locations_update(...)
         on_items_update(...)
         on_orders_update(...)
+    Plugins using inventory should implement set_date(...) to use inventory valid
+    as of selected date.
 
 
     Attributes:
@@ -24,7 +27,7 @@ class BasePlugin(ABC):
 
     display_name: str
 
-    def __init__(self, locations, items, orders, inventory):
+    def __init__(self, locations, items, orders, inventory, quadstore=None):
         """Initialize plugin, all plugins must implement constructor with same arguments.
 
         Args:
@@ -32,9 +35,20 @@ class BasePlugin(ABC):
             items (dict): dictionary of items mapping id to items
             orders (dict): dictionary of orders mapping id to order
             inventory (dict): dictionary of specifying inventory
+            quadstore (QuadstoreRelations): queries over individuals of opened
+                project, None if data are loaded as records
         """
         self.locations = locations
 
+    def set_date(self, date):
+        """Set as-of date of inventory used in calculation (called before update).
+        By default the date is only stored in date attribute.
+
+        Args:
+            date (datetime.datetime): as-of date, None for the latest inventory
+        """
+        self.date = date
+
     def calculate_frequencies(self, *args):
         """Run initial frequency calculation."""
         self._clear_frequencies()
@@ -107,6 +121,10 @@ class PluginManager(QObject):
         self.plugin_modules = PluginManager.load_plugins()
         self.plugins = {}
         self.active_plugin = None
+        self._data = None
+        self._quadstore = None
+        # As-of date of inventory used by plugins (None for the latest inventory)
+        self._date = None
         self._is_active = False
 
         self._location_model = location_model
@@ -121,19 +139,65 @@ class PluginManager(QObject):
         self._item_model.checkChanged.connect(self._items_update, Qt.DirectConnection)
         self._order_model.checkChanged.connect(self._orders_update, Qt.DirectConnection)
 
-    def set_data(self, locations, items, orders, inventory):
-        """Set new warehouse data for all plugins."""
+    def set_data(self, locations, items, orders, inventory, quadstore=None):
+        """Set new warehouse data for all plugins.
+
+        Args:
+            locations, items, orders, inventory (dict): loaded dictionaries
+            quadstore (QuadstoreRelations): queries over individuals of opened
+                project, plugins aggregate quantities in quadstore if given
+        """
         if (
             locations is not None
             and items is not None
             and orders is not None
             and inventory is not None
         ):
-            for name, module in self.plugin_modules.items():
-                self.plugins[name] = module.Plugin(locations, items, orders, inventory)
+            # Plugins are initialized on first activation
+            self._data = (locations, items, orders, inventory)
+            self._quadstore = quadstore
+            self.plugins = {}
             self._is_active = True
             self._update()
 
+    def set_date(self, date):
+        """Set as-of date of inventory and recalculate frequencies.
+
+        Args:
+            date (datetime.datetime): as-of date, None for the latest inventory
+        """
+        self._date = date
+        for plugin in self.plugins.values():
+            plugin.set_date(date)
+        self._update()
+
+    @contextmanager
+    def batch(self):
+        """Suspend updates on check changes, frequencies are recalculated once."""
+        is_active, self._is_active = self._is_active, False
+        try:
+            yield
+        finally:
+            self._is_active = is_active
+            self._update()
+
+    def reset(self):
+        """Deactivate plugins until new warehouse data are set (during loading)."""
+        self.plugins = {}
+        self._data = None
+        self._quadstore = None
+        self._is_active = False
+
+    def _plugin(self):
+        """Get active plugin, initialize it if it wasn't used with current data."""
+        if self.active_plugin not in self.plugins:
+            module = self.plugin_modules[self.active_plugin]
+            self.plugins[self.active_plugin] = module.Plugin(
+                *self._data, quadstore=self._quadstore
+            )
+            self.plugins[self.active_plugin].set_date(self._date)
+        return self.plugins[self.active_plugin]
+
     @Property(str, constant=False, notify=pluginChanged)
     def active(self):
         """Get name of active plugin."""
@@ -153,26 +217,32 @@ class PluginManager(QObject):
 
     def _locations_update(self, args):
         """Update active plugin on locations update."""
+        if not self._is_active:
+            return
         if self.active_plugin and (args[0] or len(args[2]) != 0):
-            self.plugins[self.active_plugin].on_locations_update(*args)
+            self._plugin().on_locations_update(*args)
             self.update_signal.emit()
 
     def _items_update(self, args):
         """Update active plugin on items update."""
+        if not self._is_active:
+            return
         if self.active_plugin and (args[0] or len(args[2]) != 0):
-            self.plugins[self.active_plugin].on_items_update(*args)
+            self._plugin().on_items_update(*args)
             self.update_signal.emit()
 
     def _orders_update(self, args):
         """Update active plugin on orders update."""
+        if not self._is_active:
+            return
         if self.active_plugin and (args[0] or len(args[2]) != 0):
-            self.plugins[self.active_plugin].on_orders_update(*args)
+            self._plugin().on_orders_update(*args)
             self.update_signal.emit()
 
     def _update(self):
         """Recalculate frequencies using active plugin."""
         if self.active_plugin and self._is_active:
-            self.plugins[self.active_plugin].calculate_frequencies(
+            self._plugin().calculate_frequencies(
                 self._location_model.checked,
                 self._item_model.checked,
                 self._order_model.checked,
@@ -1,6 +1,13 @@
 """Module with plug-in for calculating selected items frequencies."""
 
-from virtual_warehouse.data.data_model import Inventory
+from virtual_warehouse.data.frequencies import (
+    LocationHeat,
+    index_of,
+    item_location_matrix,
+    quantity_vector,
+    selection_vector,
+)
+from virtual_warehouse.data.relations import snapshot_date
 from virtual_warehouse.plugin import BasePlugin
 
 
@@ -11,7 +18,7 @@ class Plugin(BasePlugin):
 
     display_name = "&Item Histogram"
 
-    def __init__(self, locations, items, orders, inventory):
+    def __init__(self, locations, items, orders, inventory, quadstore=None):
         """Initialize plugin and save required parameters.
 
         Args:
@@ -19,11 +26,29 @@ class Plugin(BasePlugin):
             items (dict): dictionary of items mapping id to items
             orders (dict): dictionary of orders mapping id to order
             inventory (dict): dictionary of specifying inventory
+            quadstore (QuadstoreRelations): queries over individuals of opened
+                project, quantities are summed in quadstore if given
         """
-        super().__init__(locations, items, orders, inventory)
+        super().__init__(locations, items, orders, inventory, quadstore)
         self.inventory = inventory
-        self.items = items
-        self.date = list(self.inventory.keys())[-1]
+        self.quadstore = quadstore
+        self.item_index = index_of(items)
+        self.heat = LocationHeat(locations)
+        # Item x location on-hand quantity matrices of each inventory date
+        self.matrices = {}
+        self.set_date(None)
+
+    def set_date(self, date):
+        """Use inventory valid as of given date.
+
+        Args:
+            date (datetime.datetime): as-of date, None for the latest inventory
+        """
+        self.date = snapshot_date(self.inventory, date)
+        if self.quadstore is None and self.date not in self.matrices:
+            self.matrices[self.date] = item_location_matrix(
+                self.inventory.get(self.date, {}), self.item_index, self.heat.index
+            )
 
     def on_items_update(self, clear, add, ids):
         """Update frequency calculation on items check/uncheck.
@@ -36,11 +61,19 @@ class Plugin(BasePlugin):
         if clear:
             self._clear_frequencies()
 
-        for item_id in ids:
-            invs = Inventory.get_by_item(self.items[item_id], self.date)
-            for inv in invs:
-                inv.has_location.has_freq += (1 if add else -1) * inv.has_onhand_qty
+        weight = 1 if add else -1
+        if self.quadstore is not None:
+            quantities = self.quadstore.item_quantities(ids, self.date)
+            self.heat.add(quantity_vector(quantities, self.heat.index, weight))
+            return
+        selected = selection_vector(ids, self.item_index, weight)
+        self.heat.add(selected @ self.matrices[self.date])
 
     def _calculate_freq(self, locations, items, orders):
         """Calculate frequency for individual locations based on selected orders."""
         self.on_items_update(False, True, items)
+
+    def _clear_frequencies(self):
+        """Clear all frequencies."""
+        super()._clear_frequencies()
+        self.heat.clear()
@@ -1,5 +1,14 @@
 """Module with plug-in for calculating selected items frequencies."""
 
+from virtual_warehouse.data.frequencies import (
+    LocationHeat,
+    index_of,
+    item_location_matrix,
+    order_item_matrix,
+    quantity_vector,
+    selection_vector,
+)
+from virtual_warehouse.data.relations import snapshot_date
 from virtual_warehouse.plugin import BasePlugin
 
 
@@ -10,7 +19,7 @@ class Plugin(BasePlugin):
 
     display_name = "&Order Histogram"
 
-    def __init__(self, locations, items, orders, inventory):
+    def __init__(self, locations, items, orders, inventory, quadstore=None):
         """Initialize plugin and save required parameters.
 
         Args:
@@ -18,25 +27,38 @@ class Plugin(BasePlugin):
             items (dict): dictionary of items mapping id to items
             orders (dict): dictionary of orders mapping id to order
             inventory (dict): dictionary of specifying inventory
+            quadstore (QuadstoreRelations): queries over individuals of opened
+                project, quantities are summed in quadstore if given
         """
-        super().__init__(locations, items, orders, inventory)
-        self.orders = orders
-        self.item_locs = Plugin.item_locations(inventory)
-        self.date = list(self.item_locs.keys())[-1]
-
-    @staticmethod
-    def item_locations(inventory):
-        """Create dictionary mapping (date, item) to list of locations."""
-        item_to_loc = {}
-        for date, status in inventory.items():
-            item_to_loc[date] = {}
-            for loc_inventories in status.values():
-                for inv in loc_inventories:
-                    if inv.has_item.name not in item_to_loc[date]:
-                        item_to_loc[date][inv.has_item.name] = []
-                    item_to_loc[date][inv.has_item.name].append(inv.has_location)
-
-        return item_to_loc
+        super().__init__(locations, items, orders, inventory, quadstore)
+        self.inventory = inventory
+        self.quadstore = quadstore
+        self.heat = LocationHeat(locations)
+        # Item x location matrices of each inventory date, ordered quantity is
+        # added to location once for each inventory record of the item
+        self.matrices = {}
+        if quadstore is None:
+            self.order_index = index_of(orders)
+            self.item_index = index_of(items)
+            self.order_items = order_item_matrix(
+                orders, self.order_index, self.item_index
+            )
+        self.set_date(None)
+
+    def set_date(self, date):
+        """Use inventory valid as of given date.
+
+        Args:
+            date (datetime.datetime): as-of date, None for the latest inventory
+        """
+        self.date = snapshot_date(self.inventory, date)
+        if self.quadstore is None and self.date not in self.matrices:
+            self.matrices[self.date] = item_location_matrix(
+                self.inventory.get(self.date, {}),
+                self.item_index,
+                self.heat.index,
+                quantity=False,
+            )
 
     def on_orders_update(self, clear, add, ids):
         """Update frequency calculation on orders check/uncheck.
@@ -49,11 +71,19 @@ class Plugin(BasePlugin):
         if clear:
             self._clear_frequencies()
 
-        for order_id in ids:
-            for ord_item in self.orders[order_id].has_ordered_items:
-                for loc in self.item_locs[self.date][ord_item.has_item.name]:
-                    loc.has_freq += (1 if add else -1) * ord_item.has_total_qty
+        weight = 1 if add else -1
+        if self.quadstore is not None:
+            quantities = self.quadstore.order_quantities(ids, self.date)
+            self.heat.add(quantity_vector(quantities, self.heat.index, weight))
+            return
+        selected = selection_vector(ids, self.order_index, weight)
+        self.heat.add(selected @ self.order_items @ self.matrices[self.date])
 
     def _calculate_freq(self, locations, items, orders):
         """Calculate frequency for individual locations based on selected orders."""
         self.on_orders_update(False, True, orders)
+
+    def _clear_frequencies(self):
+        """Clear all frequencies."""
+        super()._clear_frequencies()
+        self.heat.clear()
@@ -51,9 +51,36 @@ Item {
     }
 
     Text {
-        id: cErrorText
+        id: queryStatusText
+        anchors.top: classToolBar.bottom
+        anchors.left: parent.left
+        anchors.right: cancelQueryButton.left
+        anchors.margins: 8
+        visible: ViewController.onto_manager.query_status !== ""
+        height: visible ? cancelQueryButton.height : 0
+        verticalAlignment: Text.AlignVCenter
+        font.pixelSize: 11
+        elide: Text.ElideRight
+        text: ViewController.onto_manager.query_status
+    }
+
+    Button {
+        id: cancelQueryButton
         anchors.top: classToolBar.bottom
         anchors.right: parent.right
+        anchors.rightMargin: 8
+        visible: ViewController.onto_manager.query_running
+        width: visible ? implicitWidth : 0
+        flat: true
+        text: qsTr("Cancel")
+
+        onClicked: ViewController.onto_manager.cancel_query()
+    }
+
+    Text {
+        id: cErrorText
+        anchors.top: queryStatusText.bottom
+        anchors.right: parent.right
         anchors.left: parent.left
         anchors.margins: 8
         visible: !ViewController.onto_manager.java_correct
@@ -142,7 +169,7 @@ Item {
                             visible: !model.modelData["is_class"]
                             enabled: visible
                             height: visible ? implicitHeight : 0
-                            onClicked: dialogs.openCreateQueryDialog(model.modelData["name"], model.modelData["class"], model.modelData["query"])
+                            onClicked: dialogs.openCreateQueryDialog(model.modelData["name"], model.modelData["class"], model.modelData["query"], model.modelData["bindings"])
                         }
                         MenuItem {
                             text: "Delete"
@@ -192,6 +219,7 @@ Item {
                     id: instanceCount
                     color: Material.accent
                     text: model.modelData["count"]
+                          + (model.modelData["updating"] ? qsTr(" (updating)") : "")
                     anchors.left: instanceCountText.right
                     anchors.top: name.bottom
                     horizontalAlignment: Text.AlignLeft
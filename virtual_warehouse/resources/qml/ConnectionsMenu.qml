@@ -13,6 +13,8 @@ ToolBar {
     Material.elevation: 0
 
     property bool isLocation: false
+    // Name of the tab used for propagating selection ("locations", "items", "orders")
+    property string source
     property string dst1
     property int    idx1
     property var    fun1
@@ -58,6 +60,19 @@ ToolBar {
         }
     }
 
+    ToolButton {
+        id: toolButtonAll
+        text: qsTr("All")
+        anchors.left: toolButton2.right
+
+        onClicked: {
+            ViewController.propagate_selection(source)
+            toolBarModel.filter = 1
+            mdl1.filter = 1
+            mdl2.filter = 1
+        }
+    }
+
     CheckDelegate {
         id: mainCheckButton
         anchors.right: parent.right
@@ -15,6 +15,10 @@ Item {
         settingsDialog.open()
     }
 
+    function openDebugDialog() {
+        debugDialog.open()
+    }
+
     function openImportFileDialog() {
         importFileDialog.open()
     }
@@ -23,8 +27,21 @@ Item {
         importAgentsDialog.open()
     }
 
-    function openSaveFileDialog() {
-        saveFileDialog.open()
+    function openExportDialog() {
+        exportDialog.open()
+    }
+
+    function openProjectDialog() {
+        openProjectFileDialog.open()
+    }
+
+    function saveProject(saveAs=false) {
+        if (saveAs || ViewController.project_path === "") {
+            saveProjectFileDialog.open()
+        } else {
+            // Empty url saves current project
+            ViewController.save_project("")
+        }
     }
 
     function openCreateClassDialog() {
@@ -34,9 +51,10 @@ Item {
         createClassDialog.open()
     }
 
-    function openCreateQueryDialog(name="", cls="", query="") {
+    function openCreateQueryDialog(name="", cls="", query="", bindings="") {
         queryNameField.text = name
         queryDialogTextArea.text = query
+        queryBindingsField.text = bindings
         let idx = queryComboBox.find(cls)
         queryComboBox.currentIndex = (idx === -1) ? queryComboBox.currentIndex : idx
         qErrorText.text = ""
@@ -116,7 +134,7 @@ Item {
 
         contentItem: Rectangle {
             implicitWidth: 600
-            implicitHeight: 200
+            implicitHeight: 260
             color: "#eee"
 
             Text {
@@ -173,6 +191,72 @@ Item {
                 }
             }
 
+            Text {
+                id: sTimeoutText
+                anchors.top: sText.bottom
+                anchors.left: parent.left
+                anchors.margins: 8
+                anchors.topMargin: 24
+                text: "Reasoner time limit (s):"
+            }
+
+            SpinBox {
+                id: reasonerTimeout
+                anchors.left: sTimeoutText.right
+                anchors.verticalCenter: sTimeoutText.verticalCenter
+                anchors.margins: 8
+                from: 1
+                to: 3600
+                editable: true
+                value: ViewController.onto_manager.reasoner_timeout
+
+                onValueModified: ViewController.onto_manager.reasoner_timeout = value
+            }
+
+            Text {
+                id: sQueryTimeoutText
+                anchors.top: sTimeoutText.bottom
+                anchors.left: parent.left
+                anchors.margins: 8
+                anchors.topMargin: 24
+                text: "Query time limit (s):"
+            }
+
+            SpinBox {
+                id: queryTimeout
+                anchors.left: sQueryTimeoutText.right
+                anchors.verticalCenter: sQueryTimeoutText.verticalCenter
+                anchors.margins: 8
+                from: 1
+                to: 3600
+                editable: true
+                value: ViewController.onto_manager.query_timeout
+
+                onValueModified: ViewController.onto_manager.query_timeout = value
+            }
+
+            Text {
+                id: sQueryRowsText
+                anchors.left: queryTimeout.right
+                anchors.verticalCenter: sQueryTimeoutText.verticalCenter
+                anchors.margins: 8
+                text: "Query results limit:"
+            }
+
+            SpinBox {
+                id: queryRows
+                anchors.left: sQueryRowsText.right
+                anchors.verticalCenter: sQueryTimeoutText.verticalCenter
+                anchors.margins: 8
+                from: 1
+                to: 10000000
+                stepSize: 1000
+                editable: true
+                value: ViewController.onto_manager.query_rows
+
+                onValueModified: ViewController.onto_manager.query_rows = value
+            }
+
             DialogButtonBox {
                 position: DialogButtonBox.Footer
 
@@ -185,13 +269,188 @@ Item {
         }
     }
 
+    Dialog {
+        id: debugDialog
+        title: "Debug"
+        standardButtons: StandardButton.Close
+
+        contentItem: Rectangle {
+            implicitWidth: 400
+            implicitHeight: 120
+            color: "#eee"
+
+            Text {
+                id: dTitle
+                anchors.top: parent.top
+                anchors.left: parent.left
+                anchors.margins: 8
+                font.capitalization: Font.AllUppercase
+                font.pointSize: 10
+                color: "#333"
+                text: "Connector Cache"
+            }
+
+            Text {
+                id: dText
+                anchors.top: dTitle.bottom
+                anchors.left: parent.left
+                anchors.margins: 8
+                text: "Hits: " + ViewController.cache_stats.hits
+                      + "    Misses: " + ViewController.cache_stats.misses
+                      + "    Cached results: " + ViewController.cache_stats.size
+            }
+
+            DialogButtonBox {
+                position: DialogButtonBox.Footer
+
+                anchors.bottom: parent.bottom
+                width: parent.width
+                standardButtons: DialogButtonBox.Close
+
+                onRejected: debugDialog.close()
+            }
+        }
+    }
+
+    Dialog {
+        id: exportDialog
+        title: "Export Ontology"
+        standardButtons: StandardButton.Cancel
+
+        contentItem: Rectangle {
+            implicitWidth: 400
+            implicitHeight: 160
+            color: "#eee"
+
+            Text {
+                id: eTitle
+                anchors.top: parent.top
+                anchors.left: parent.left
+                anchors.margins: 8
+                font.capitalization: Font.AllUppercase
+                font.pointSize: 10
+                color: "#333"
+                text: "Export Ontology"
+            }
+
+            Text {
+                id: eScopeText
+                anchors.top: eTitle.bottom
+                anchors.left: parent.left
+                anchors.margins: 8
+                anchors.topMargin: 20
+                text: "Content:"
+            }
+
+            ComboBox {
+                id: exportScope
+                anchors.left: eScopeText.right
+                anchors.right: parent.right
+                anchors.verticalCenter: eScopeText.verticalCenter
+                anchors.margins: 8
+                textRole: "text"
+                valueRole: "value"
+                model: [
+                    { text: "Everything", value: "all" },
+                    { text: "Classes and custom classes", value: "schema" },
+                    { text: "Inventory of selected date only", value: "date" }
+                ]
+            }
+
+            Text {
+                id: eFormatText
+                anchors.top: eScopeText.bottom
+                anchors.left: parent.left
+                anchors.margins: 8
+                anchors.topMargin: 28
+                text: "Format:"
+            }
+
+            ComboBox {
+                id: exportFormat
+                anchors.left: eScopeText.right
+                anchors.right: parent.right
+                anchors.verticalCenter: eFormatText.verticalCenter
+                anchors.margins: 8
+                textRole: "text"
+                valueRole: "value"
+                model: [
+                    { text: "N-Triples (*.nt)", value: ".nt" },
+                    { text: "Compressed N-Triples (*.nt.gz)", value: ".nt.gz" },
+                    { text: "RDF/XML format (*.rdf)", value: ".rdf" },
+                    { text: "Compressed RDF/XML (*.rdf.gz)", value: ".rdf.gz" }
+                ]
+            }
+
+            DialogButtonBox {
+                position: DialogButtonBox.Footer
+
+                anchors.bottom: parent.bottom
+                width: parent.width
+                standardButtons: DialogButtonBox.Save | DialogButtonBox.Cancel
+
+                onAccepted: {
+                    exportDialog.close()
+                    saveFileDialog.open()
+                }
+                onRejected: exportDialog.close()
+            }
+        }
+    }
+
     FileDialog {
         id: saveFileDialog
         modality: Qt.WindowModal
         folder: StandardPaths.writableLocation(StandardPaths.DocumentsLocation)
         selectExisting: false
-        nameFilters: ["RDF/XML format (*.rdf)"]
-        onAccepted: ViewController.save_ontology(saveFileDialog.fileUrl)
+        nameFilters: [exportFormat.currentText]
+        onAccepted: ViewController.export_ontology(
+            saveFileDialog.fileUrl, exportFormat.currentValue, exportScope.currentValue
+        )
+    }
+
+    MessageDialog {
+        id: exportErrorDialog
+        title: "Unable to export ontology"
+        icon: StandardIcon.Warning
+    }
+
+    Connections {
+        target: ViewController
+        function onExportFailed(error) {
+            exportErrorDialog.text = error
+            exportErrorDialog.open()
+        }
+    }
+
+    FileDialog {
+        id: openProjectFileDialog
+        modality: Qt.WindowModal
+        title: "Please select a project file"
+        nameFilters: ["Virtual Warehouse project (*.vwp)"]
+        folder: StandardPaths.writableLocation(StandardPaths.DocumentsLocation)
+        onAccepted: {
+            var error = ViewController.open_project(openProjectFileDialog.fileUrl)
+            if (error) {
+                projectErrorDialog.text = error
+                projectErrorDialog.open()
+            }
+        }
+    }
+
+    FileDialog {
+        id: saveProjectFileDialog
+        modality: Qt.WindowModal
+        folder: StandardPaths.writableLocation(StandardPaths.DocumentsLocation)
+        selectExisting: false
+        nameFilters: ["Virtual Warehouse project (*.vwp)"]
+        onAccepted: ViewController.save_project(saveProjectFileDialog.fileUrl)
+    }
+
+    MessageDialog {
+        id: projectErrorDialog
+        title: "Unable to open project"
+        icon: StandardIcon.Warning
     }
 
     FileDialog {
@@ -209,21 +468,15 @@ Item {
         id: importFileDialog
         modality: Qt.WindowModal
         title: "Please select a warehouse file"
-        // nameFilters: ["Excel file (*.xls *.xlsx)", "CSV file (*.csv)"]
-        nameFilters: ["Excel file (*.xls *.xlsx)"]
+        nameFilters: ["Excel file (*.xls *.xlsx)", "CSV file (*.csv *.tsv)"]
         folder: StandardPaths.writableLocation(StandardPaths.DocumentsLocation)
         onAccepted: {
             fileImportSettings.open()
             fileImportSettings.fileUrl = importFileDialog.fileUrl
             fileImportSheetsModel.clear()
-            var sheets = ViewController.get_sheets(fileUrl)
-            for (var i = 0; i < sheets.length; ++i) {
-                fileImportSheetsModel.append({
-                                                 "index": i,
-                                                 "name": sheets[i][0],
-                                                 "type": sheets[i][1]
-                                             })
-            }
+            fileImportSettings.probing = true
+            // Sheets are read in background and received by onSheetsProbed
+            ViewController.probe_sheets(fileUrl)
         }
     }
 
@@ -233,9 +486,32 @@ Item {
         standardButtons: StandardButton.Open | StandardButton.Cancel
 
         property var fileUrl: ""
+        property bool probing: false
         height: 200
         width: 300
 
+        Connections {
+            target: ViewController
+            function onSheetsProbed(url, sheets) {
+                // Ignore results of previously selected files
+                if (url.toString() !== fileImportSettings.fileUrl.toString())
+                    return
+                fileImportSheetsModel.clear()
+                for (var i = 0; i < sheets.length; ++i) {
+                    var sheet = sheets[i]
+                    // Unknown sizes are stored as -1 (roles must keep same type)
+                    fileImportSheetsModel.append({
+                                                     "index": i,
+                                                     "name": sheet.name,
+                                                     "type": sheet.type,
+                                                     "rows": sheet.rows === null ? -1 : sheet.rows,
+                                                     "columns": sheet.columns === null ? -1 : sheet.columns
+                                                 })
+                }
+                fileImportSettings.probing = false
+            }
+        }
+
         onAccepted: {
             var types = []
             for (var i = 0; i < sheetsTypesList.model.count; ++i) {
@@ -296,7 +572,8 @@ Item {
 
                 Text {
                     id: dialogHeader
-                    text: "Select types of sheets:"
+                    text: fileImportSettings.probing ? "Reading sheets..."
+                                                     : "Select types of sheets:"
                     anchors.left: parent.left
                     anchors.top: fileUrlText.bottom
                     anchors.margins: 8
@@ -327,11 +604,21 @@ Item {
                         width: sheetsTypesList.width
 
                         Text {
+                            id: sheetName
                             anchors.left: parent.left
-                            anchors.verticalCenter: comboBox.verticalCenter
+                            anchors.bottom: comboBox.verticalCenter
                             text: model.name
                         }
 
+                        Text {
+                            anchors.left: parent.left
+                            anchors.top: sheetName.bottom
+                            font.pixelSize: 10
+                            color: "#666"
+                            text: (model.rows < 0 ? "?" : model.rows) + " rows, " +
+                                  (model.columns < 0 ? "?" : model.columns) + " columns"
+                        }
+
                         function updateType(typeIndex) {
                             fileImportSheetsModel.setProperty(model.index, "type",
                                                               typeIndex)
@@ -555,6 +842,25 @@ Item {
                 }
             }
 
+            Text {
+                id: bindingsQueryText
+                anchors.left: queryComboBox.right
+                anchors.verticalCenter: queryComboBox.verticalCenter
+                anchors.margins: 8
+                text: "Bindings:"
+            }
+
+            TextField {
+                id: queryBindingsField
+                selectByMouse: true
+                anchors.left: bindingsQueryText.right
+                anchors.right: parent.right
+                anchors.verticalCenter: queryComboBox.verticalCenter
+                anchors.margins: 8
+                placeholderText: "e.g. zone=A, date=2020-01-01"
+                text: ""
+            }
+
             TextArea {
                 id: queryDialogStartTextArea
                 anchors.top: queryComboBox.bottom
@@ -646,12 +952,14 @@ Item {
                     qErrorText.text = ViewController.onto_manager.check_create_query(
                                 queryNameField.text,
                                 queryComboBox.currentText,
-                                queryDialogTextArea.text)
+                                queryDialogTextArea.text,
+                                queryBindingsField.text)
                     if (qErrorText.text === "") {
                         ViewController.onto_manager.create_query(
                                     queryNameField.text,
                                     queryComboBox.currentText,
-                                    queryDialogTextArea.text)
+                                    queryDialogTextArea.text,
+                                    queryBindingsField.text)
                         createQueryDialog.close()
                     }
                 }
@@ -5,6 +5,13 @@ import QtQuick.Controls.Material 2.14
 Item {
 
     property var progressValue
+    // When false, overlay only shows progress and lets user browse loaded data
+    property bool blocking: true
+    property string text: ""
+    // Shows cancel button, which emits cancelled signal
+    property bool cancellable: false
+
+    signal cancelled()
 
     id: loadingOverlay
     anchors.fill: parent
@@ -16,9 +23,11 @@ Item {
         anchors.fill: parent
         color: "#29323c"
         border.width: 0
+        visible: blocking
 
         MouseArea {
             anchors.fill: parent
+            enabled: blocking
             propagateComposedEvents: false
             hoverEnabled: true
             preventStealing: true
@@ -26,23 +35,46 @@ Item {
     }
 
     Rectangle {
-        height: 20
-        width: 220
+        height: (progressText.text ? 40 : 20) + (cancellable ? 32 : 0)
+        width: Math.max(220, progressText.implicitWidth + 20)
         color: "white"
         border.width: 0
         radius: 2
         anchors.horizontalCenter: parent.horizontalCenter
-        anchors.verticalCenter: parent.verticalCenter
+        anchors.verticalCenter: blocking ? parent.verticalCenter : undefined
+        anchors.bottom: blocking ? undefined : parent.bottom
+        anchors.bottomMargin: 20
 
         ProgressBar {
             id: progressBar
             anchors.horizontalCenter: parent.horizontalCenter
-            anchors.verticalCenter: parent.verticalCenter
+            anchors.top: parent.top
+            anchors.topMargin: 6
             value: progressValue
             indeterminate: (value == 0)
             Behavior on value {
                 NumberAnimation {}
             }
         }
+
+        Text {
+            id: progressText
+            anchors.horizontalCenter: parent.horizontalCenter
+            anchors.top: progressBar.bottom
+            anchors.topMargin: 2
+            text: loadingOverlay.text
+            font.pixelSize: 11
+            color: "#29323c"
+        }
+
+        Button {
+            anchors.horizontalCenter: parent.horizontalCenter
+            anchors.bottom: parent.bottom
+            height: 32
+            flat: true
+            visible: cancellable
+            text: qsTr("Cancel")
+            onClicked: loadingOverlay.cancelled()
+        }
     }
 }
@@ -13,6 +13,7 @@ Item {
     ConnectionsMenu {
         id: connectionsBar
         toolBarModel: toolBar.model
+        source: "locations"
 
         isLocation: true
 
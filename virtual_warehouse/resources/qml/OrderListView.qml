@@ -13,6 +13,7 @@ Item {
     ConnectionsMenu {
         id: connectionsBar
         toolBarModel: toolBar.model
+        source: "orders"
 
         dst1: "Locations"
         idx1: 0
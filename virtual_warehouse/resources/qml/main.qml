@@ -28,13 +28,36 @@ ApplicationWindow {
                 text: qsTr("&Open")
                 onTriggered: dialogs.openImportFileDialog()
             }
+            MenuItem {
+                text: qsTr("&Reload")
+                onTriggered: ViewController.reload()
+            }
+            MenuItem {
+                text: qsTr("A&uto Reload")
+                checkable: true
+                checked: ViewController.auto_reload
+                onTriggered: ViewController.auto_reload = checked
+            }
+            MenuItem {
+                text: qsTr("Open &Project")
+                onTriggered: dialogs.openProjectDialog()
+            }
+            MenuItem {
+                text: qsTr("&Save Project")
+                onTriggered: dialogs.saveProject()
+            }
+            MenuItem {
+                text: qsTr("Save Project &As")
+                onTriggered: dialogs.saveProject(true)
+            }
             MenuItem {
                 text: qsTr("&Import Agents")
                 onTriggered: dialogs.openImportAgentsDialog()
             }
             MenuItem {
                 text: qsTr("&Export Ontology")
-                onTriggered: dialogs.openSaveFileDialog()
+                enabled: !ViewController.exporting
+                onTriggered: dialogs.openExportDialog()
             }
             MenuItem {
                 text: qsTr("&Quit")
@@ -71,6 +94,10 @@ ApplicationWindow {
                 text: qsTr("S&ettings")
                 onTriggered: dialogs.openSettingsDialog()
             }
+            MenuItem {
+                text: qsTr("&Debug")
+                onTriggered: dialogs.openDebugDialog()
+            }
             MenuItem {
                 text: qsTr("&Help")
                 onTriggered: dialogs.openHelpDialog()
@@ -80,6 +107,10 @@ ApplicationWindow {
 
     LoadingOverlay {
         progressValue: ViewController.progress_value
+        blocking: ViewController.progress_blocking
+        text: ViewController.progress_text
+        cancellable: ViewController.exporting
+        onCancelled: ViewController.cancel_export()
         width: parent.width
         anchors.top: menuBar.bottom
         anchors.bottom: parent.bottom
@@ -237,6 +268,32 @@ ApplicationWindow {
                     }
                 }
 
+                ComboBox {
+                    id: inventoryDatePicker
+                    anchors.right: parent.right
+                    anchors.top: parent.top
+                    anchors.rightMargin: 20
+                    anchors.topMargin: 20
+                    implicitWidth: 150
+                    model: ViewController.inventory_dates
+                    // Inventory used by connectors and heat-maps (as-of date)
+                    visible: count > 0
+                    z: 1
+
+                    ToolTip.visible: hovered
+                    ToolTip.text: qsTr("Inventory as of date")
+
+                    onActivated: ViewController.inventory_date = textAt(index)
+
+                    Connections {
+                        target: ViewController
+                        function onInventoryDateChanged() {
+                            inventoryDatePicker.currentIndex = inventoryDatePicker.find(
+                                        ViewController.inventory_date)
+                        }
+                    }
+                }
+
                 MapView2D {
                     id: mapView2D
                 }
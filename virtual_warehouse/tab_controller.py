@@ -177,6 +177,167 @@ class TabOrder(QObject):
         self.checkedChanged.emit()
 
 
+class WrappedObjects(dict):
+    """Dictionary wrapping objects into wrapper class (TabItem,...) on first access.
+    Objects of large lists (possibly loaded from project on access) aren't touched
+    until they are displayed or checked.
+    """
+
+    def __init__(self, object_class, objects):
+        super(WrappedObjects, self).__init__()
+        self._object_class = object_class
+        self._source = objects
+
+    def __missing__(self, key):
+        value = self[key] = self._object_class(self._source[key])
+        return value
+
+    def __contains__(self, key):
+        return key in self._source
+
+
+class IdSpace:
+    """Stable integer ids of object names, ids are assigned in order of first use.
+    Ids are never reused, so selections stay valid when objects are reloaded.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, name):
+        """Get id of the name, unknown name is assigned new id."""
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+
+class Selection:
+    """Set of object names stored as boolean array (bytearray) indexed by ids.
+    Union, intersection, difference and counts between selections of the same
+    id space are evaluated over whole arrays at once.
+    """
+
+    def __init__(self, space, names=()):
+        """Initialize selection.
+
+        Args:
+            space (IdSpace): id space of selected names
+            names (Iterable[str]): initially selected names
+        """
+        self.space = space
+        self._mask = bytearray()
+        self.update(names)
+
+    def _fit(self):
+        """Extend boolean array to cover all ids of the id space."""
+        missing = len(self.space) - len(self._mask)
+        if missing > 0:
+            self._mask.extend(bytes(missing))
+
+    def _other(self, other):
+        """Get boolean array of other selection or iterable of names."""
+        if not isinstance(other, Selection) or other.space is not self.space:
+            other = Selection(self.space, other)
+        return other._mask
+
+    def _combine(self, other, operation):
+        """Combine arrays of selections by bitwise operation on integers."""
+        mask = self._other(other)
+        size = max(len(self._mask), len(mask))
+        value = operation(
+            int.from_bytes(self._mask, "little"), int.from_bytes(mask, "little")
+        )
+        return bytearray(value.to_bytes(size, "little"))
+
+    def _new(self, mask):
+        """Create selection of the same id space from boolean array."""
+        selection = Selection(self.space)
+        selection._mask = mask
+        return selection
+
+    def key(self):
+        """Get hashable key identifying selected ids."""
+        return bytes(self._mask.rstrip(b"\0"))
+
+    def __contains__(self, name):
+        i = self.space.ids.get(name)
+        return i is not None and i < len(self._mask) and self._mask[i] == 1
+
+    def __iter__(self):
+        names, mask = self.space.names, self._mask
+        i = mask.find(1)
+        while i != -1:
+            yield names[i]
+            i = mask.find(1, i + 1)
+
+    def __len__(self):
+        return self._mask.count(1)
+
+    def __bool__(self):
+        return 1 in self._mask
+
+    def __eq__(self, other):
+        if isinstance(other, Selection):
+            return self.space is other.space and self.key() == other.key()
+        return NotImplemented
+
+    __hash__ = None
+
+    def __or__(self, other):
+        return self._new(self._combine(other, int.__or__))
+
+    def __and__(self, other):
+        return self._new(self._combine(other, int.__and__))
+
+    def __sub__(self, other):
+        return self._new(self._combine(other, lambda a, b: a & ~b))
+
+    def __ior__(self, other):
+        self._mask = self._combine(other, int.__or__)
+        return self
+
+    def __iand__(self, other):
+        self._mask = self._combine(other, int.__and__)
+        return self
+
+    def __isub__(self, other):
+        self._mask = self._combine(other, lambda a, b: a & ~b)
+        return self
+
+    def copy(self):
+        """Get copy of the selection."""
+        return self._new(bytearray(self._mask))
+
+    def add(self, name):
+        """Add name into the selection."""
+        i = self.space.id(name)
+        self._fit()
+        self._mask[i] = 1
+
+    def remove(self, name):
+        """Remove name from the selection, raise KeyError if it isn't selected."""
+        if name not in self:
+            raise KeyError(name)
+        self._mask[self.space.ids[name]] = 0
+
+    def update(self, names):
+        """Add names into the selection."""
+        ids = [self.space.id(n) for n in names]
+        self._fit()
+        for i in ids:
+            self._mask[i] = 1
+
+    def clear(self):
+        """Remove all names from the selection."""
+        self._mask = bytearray()
+
+
 class UniversalListModel(QAbstractListModel):
     """Universal class for holding lists in sidebar tabs (locations, items, orders).
 
@@ -204,7 +365,10 @@ class UniversalListModel(QAbstractListModel):
         self._object_class = object_class
         self._selected = [] if selected_objects is None else selected_objects
         self._all_selected = self._selected
-        self.checked = set()
+        # Checked and visible objects as selections over ids of the object names
+        self._space = IdSpace()
+        self.checked = Selection(self._space)
+        self._visible = (None, None)
         self._search_text = ""
         self._filter = 0
 
@@ -218,8 +382,40 @@ class UniversalListModel(QAbstractListModel):
     filterChanged = Signal()
 
     def set_data(self, objects):
-        """Set new objects and wrap then in wrapper class."""
-        self._objects = {k: self._object_class(v) for k, v in objects.items()}
+        """Set new objects, they are wrapped in wrapper class on access."""
+        self._objects = WrappedObjects(self._object_class, objects)
+
+    def update_data(self, objects, inserted, updated, deleted):
+        """Update changed objects, checked state of remaining objects is kept.
+
+        Args:
+            objects (dict[str, object]): dictionary of all objects
+            inserted (set[str]): ids of new objects (added to the end of the list)
+            updated (set[str]): ids of modified objects
+            deleted (set[str]): ids of removed objects
+        """
+        objs = WrappedObjects(self._object_class, objects)
+        for k, v in self._objects.items():
+            if k not in updated and k not in deleted:
+                objs[k] = v
+        self._objects = objs
+
+        self.checked -= deleted
+        for n in self.checked & updated:
+            self._objects[n].set_checked(True)
+
+        self._all_selected = [
+            k for k in self._all_selected if k not in deleted
+        ] + sorted(inserted)
+        self._update_filter()
+        self.checkChanged.emit([False, False, []])  # Required for check_state update
+
+    def clear(self):
+        """Remove all objects from the list."""
+        self.clear_checked()
+        self._objects = {}
+        self.set_selected([])
+        self.checkChanged.emit([True, True, []])
 
     def set_selected(self, selected, check=False):
         """Set new list of selected objects."""
@@ -274,8 +470,9 @@ class UniversalListModel(QAbstractListModel):
         """Return state of main checkbox of all visible check boxes.
         States: unchecked (0)/ partially checked (1) / checked (2)
         """
-        selected_set = set(self._selected)
-        match_count = sum(map(lambda x: x in selected_set, self.checked))
+        if self._visible[0] is not self._selected:
+            self._visible = (self._selected, Selection(self._space, self._selected))
+        match_count = len(self.checked & self._visible[1])
         if match_count:
             return 2 if match_count == len(self._selected) else 1
         return 0
@@ -1,17 +1,42 @@
 """Module providing ViewController class - connector class between QML and Python."""
-from PySide2.QtCore import Property, QObject, Qt, QThread, QUrl, Signal, Slot
+import os
+import traceback
+from datetime import datetime
+from functools import partial
+from threading import Condition, Event
+
+from PySide2.QtCore import (
+    Property,
+    QFileSystemWatcher,
+    QObject,
+    Qt,
+    QThread,
+    QTimer,
+    QUrl,
+    Signal,
+    Slot,
+)
 
 from virtual_warehouse.data.agent_parser import AgentManager
-from virtual_warehouse.data.data_model import (
-    Inventory,
-    Item,
-    Location,
-    Order,
-    RackLocation,
-    save_ontology,
-)
+from virtual_warehouse.data.data_model import Inventory, Item, Location, Order
 from virtual_warehouse.data.excel_parser import Document
+from virtual_warehouse.data.export import export_format, export_ontology
 from virtual_warehouse.data.onto_manager import OntoManager
+from virtual_warehouse.data.project import (
+    PROJECT_EXT,
+    open_project,
+    save_project,
+    use_project_file,
+)
+from virtual_warehouse.data.quadstore import QuadstoreRelations
+from virtual_warehouse.data.readers import DATE_FORMAT
+from virtual_warehouse.data.records import store
+from virtual_warehouse.data.relations import (
+    RelationIndex,
+    ResultCache,
+    snapshot_date,
+)
+from virtual_warehouse.data.utils import LoadProgress
 from virtual_warehouse.location_models import (
     MultiLocation,
     SingleLocation,
@@ -21,6 +46,7 @@ from virtual_warehouse.location_utils import cluster_locations
 from virtual_warehouse.map import Map
 from virtual_warehouse.plugin import PluginManager
 from virtual_warehouse.tab_controller import (
+    Selection,
     SideviewListModel,
     TabItem,
     TabLocation,
@@ -29,6 +55,57 @@ from virtual_warehouse.tab_controller import (
 )
 
 
+def _source_files(source):
+    """Get files of imported source, sheets of CSV source are separate files.
+
+    Args:
+        source (dict): imported file, dictionary with keys "file" and "types"
+
+    Returns:
+        list[str]: paths of the files
+    """
+    if not Document.check_csv(source["file"]):
+        return [source["file"]]
+    directory = os.path.dirname(source["file"])
+    return [
+        os.path.join(directory, t["name"])
+        for t in source["types"]
+        if t["type"] != "None"
+    ]
+
+
+def _loaded_types(types):
+    """Get types of sheets whose data are loaded from file (see DataLoaderThread).
+
+    Args:
+        types (list[dict[str, str]]): types of sheets of the file
+
+    Returns:
+        set[str]: loaded sheet types, locations are loaded only with coordinates
+    """
+    loaded = {t["type"] for t in types} - {"None"}
+    if not {"Locations", "Coordinates"} <= loaded:
+        loaded -= {"Locations", "Coordinates"}
+    return loaded
+
+
+def _with_ontology(function):
+    """Wrap function using ontology, individuals of records are created first.
+
+    Args:
+        function (Callable): function querying or exporting the ontology
+
+    Returns:
+        Callable: function materializing records before calling the function
+    """
+
+    def wrapper(*args, **kwargs):
+        store.materialize()
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
 class DataLoaderThread(QThread):
     """Thread which loads warehouse data from file."""
 
@@ -37,6 +114,8 @@ class DataLoaderThread(QThread):
     inventoryReady = Signal(object)
     ordersReady = Signal(object)
     frequenciesReady = Signal()
+    # Emits progress value (0 - 1) and description of current stage
+    progressChanged = Signal(float, str)
 
     def __init__(
         self,
@@ -46,6 +125,8 @@ class DataLoaderThread(QThread):
         items=None,
         inventory=None,
         orders=None,
+        parallel=True,
+        fingerprints=None,
     ):
         """Initialize thread params for loading file in separate thread.
 
@@ -59,16 +140,30 @@ class DataLoaderThread(QThread):
             items (dict[str, Item]): previously loaded items
             inventory (dict[str, Inventory]): previously loaded inventory
             orders (dict[str, Inventory]): previously loaded orders
+            parallel (bool): decode sheets in parallel using worker processes,
+                decoded rows are merged into ontology in dependency order
+            fingerprints (dict[str, dict[str, int]]): fingerprints of rows from
+                previous load of the file, if provided, sheets of types with
+                fingerprints are reloaded by applying only changed rows
         """
         super(DataLoaderThread, self).__init__()
         self.file_path = file_path
         self.sheets = sheet_types
+        self.parallel = parallel
 
         self.locations = locations
         self.items = items
         self.inventory = inventory
         self.orders = orders
 
+        self.previous = {} if fingerprints is None else fingerprints
+        # Fingerprints of loaded rows and changes applied on reload
+        # (sheet type -> (inserted, updated, deleted) keys)
+        self.fingerprints = dict(self.previous)
+        self.changes = {}
+        # Relations of all loaded data, built once the data are parsed
+        self.relations = None
+
     def run(self):
         """Load data from file path and emit data through signal."""
 
@@ -76,45 +171,78 @@ class DataLoaderThread(QThread):
             """Filter array items by type."""
             return [x["name"] for x in arr if x["type"] == y]
 
-        document = Document(self.file_path)
+        # Data are parsed into records, ontology is created once it is used
+        document = Document(self.file_path, bulk=True, lazy=True)
+        if self.previous:
+            # Changes are applied to copies of dictionaries shared with GUI
+            document.locations = dict(self.locations or {})
+            document.items = dict(self.items or {})
+            document.balance = dict(self.inventory or {})
+            document.orders = dict(self.orders or {})
 
-        if (
+        load_locations = (
             len(where(self.sheets, "Locations")) > 0
             and len(where(self.sheets, "Coordinates")) > 0
-        ):
-            Location.destroy_all()
-            for sheet in where(self.sheets, "Locations"):
-                self.locations = document.parse_locations(sheet)
-
-            for sheet in where(self.sheets, "Coordinates"):
-                self.locations = document.parse_coordinates(sheet)
-
+        )
+        sheets = [
+            (x["type"], x["name"])
+            for x in self.sheets
+            if x["type"] in ["Items", "Inventory", "Orders"]
+            or (load_locations and x["type"] in ["Locations", "Coordinates"])
+        ]
+        if self.parallel:
+            document.prefetch(sheets)
+
+        progress = LoadProgress(self.progressChanged.emit)
+        for sheet_type, sheet in sheets:
+            progress.add_stage(sheet, document.row_count(sheet_type, sheet))
+
+        def parse(parse_function, sheet):
+            """Parse sheet and report progress of parsing."""
+            progress.start(sheet)
+            data = parse_function(
+                sheet, progress=lambda done, total: progress.update(sheet, done, total)
+            )
+            progress.finish(sheet)
+            return data
+
+        def load(sheet_type, parse_function, cls):
+            """Parse all sheets of given type or apply their changes (reload)."""
+            if sheet_type in self.previous:
+                for sheet in where(self.sheets, sheet_type):
+                    parse(partial(document.collect_rows, sheet_type), sheet)
+                self.changes[sheet_type] = document.apply_changes(
+                    sheet_type, self.previous[sheet_type]
+                )
+            else:
+                if cls is not None:
+                    document.destroy_all(cls)
+                for sheet in where(self.sheets, sheet_type):
+                    parse(parse_function, sheet)
+            self.fingerprints[sheet_type] = document.fingerprints.get(sheet_type, {})
+
+        if load_locations:
+            load("Locations", document.parse_locations, Location)
+            load("Coordinates", document.parse_coordinates, None)
+            self.locations = document.locations
             self.locationsReady.emit(self.locations)
 
         if len(where(self.sheets, "Items")) > 0:
-            Item.destroy_all()
-            for sheet in where(self.sheets, "Items"):
-                self.items = document.parse_items(sheet)
-
+            load("Items", document.parse_items, Item)
+            self.items = document.items
             self.itemsReady.emit(self.items)
 
         if len(where(self.sheets, "Inventory")) > 0:
-            Inventory.destroy_all()
-            for sheet in where(self.sheets, "Inventory"):
-                self.inventory = document.parse_inventory_balance(sheet)
-
+            load("Inventory", document.parse_inventory_balance, Inventory)
+            self.inventory = document.balance
             self.inventoryReady.emit(self.inventory)
 
         if len(where(self.sheets, "Orders")) > 0:
-            Order.destroy_all()
-            for sheet in where(self.sheets, "Orders"):
-                self.orders = document.parse_orders(sheet)
-
+            load("Orders", document.parse_orders, Order)
+            self.orders = document.orders
             self.ordersReady.emit(self.orders)
 
-        # First query is always slower than rest (probably some initialization going on)
-        Item.get_by_locations([self.locations[next(iter(self.locations))]])
-
+        self.relations = RelationIndex(self.inventory, self.orders)
         self.frequenciesReady.emit()
         document.close()
 
@@ -141,6 +269,135 @@ class QueryThread(QThread):
         self.dataReady.emit(data)
 
 
+class ExportThread(QThread):
+    """Thread exporting ontology into file, the export can be cancelled."""
+
+    # Emits progress value (0 - 1) and description of the export
+    progressChanged = Signal(float, str)
+    # Emits error message, empty string if export finished or was cancelled
+    finished = Signal(str)
+
+    def __init__(self, file_path, scope, date):
+        """Initialize thread params for exporting ontology.
+
+        Args:
+            file_path (str): path of exported file
+            scope (str): exported part of ontology (see export_ontology)
+            date (datetime.datetime): date of exported inventory
+        """
+        super(ExportThread, self).__init__()
+        self.file_path = file_path
+        self.scope = scope
+        self.date = date
+        self._cancelled = Event()
+
+    def cancel(self):
+        """Stop the export, partially written file is removed."""
+        self._cancelled.set()
+
+    def _progress(self, written, total):
+        """Report number of written triples."""
+        self.progressChanged.emit(
+            written / max(total, 1), f"Exporting: {written:,} / {total:,} triples"
+        )
+
+    def run(self):
+        """Materialize records and export ontology into the file."""
+        try:
+            store.materialize()
+            export_ontology(
+                self.file_path,
+                self.scope,
+                self.date,
+                progress=self._progress,
+                cancelled=self._cancelled.is_set,
+            )
+            self.finished.emit("")
+        except Exception as e:  # skipcq: PYL-W0703
+            traceback.print_exc()
+            self.finished.emit(str(e))
+
+
+class QueryScheduler(QThread):
+    """Long-lived worker thread running queries, only the latest query is applied.
+
+    Query submitted while previous one is waiting replaces it (requests are
+    merged), results of queries superseded by newer query or cancelled are
+    dropped before they reach the callback.
+    """
+
+    # Emits generation of the query and its result
+    dataReady = Signal(int, object)
+
+    def __init__(self, parent=None):
+        """Initialize scheduler, the worker thread is started on first query."""
+        super(QueryScheduler, self).__init__(parent)
+        self._condition = Condition()
+        # Generation of the latest query, increased by every submit or cancel
+        self._generation = 0
+        self._pending = None
+        self._callback = None
+        self._stopped = False
+        self.dataReady.connect(self._deliver, Qt.QueuedConnection)
+
+    def submit(self, callback, function, *args):
+        """Schedule query replacing all previous queries.
+
+        Args:
+            callback (Callable): function receiving result of the query
+            function (Callable): function which runs the query
+            *args: arguments which will be passed to the function
+        """
+        with self._condition:
+            self._generation += 1
+            self._pending = (self._generation, function, args)
+            self._callback = callback
+            self._condition.notify()
+        if not self.isRunning():
+            self.start()
+
+    def cancel(self):
+        """Drop waiting query and result of running query."""
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+            self._callback = None
+
+    def stop(self):
+        """Cancel queries and stop the worker thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.cancel()
+        self.wait()
+
+    def run(self):
+        """Run the latest submitted query until the scheduler is stopped."""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, function, args = self._pending
+                self._pending = None
+
+            try:
+                data = function(*args)
+            except Exception:  # skipcq: PYL-W0703
+                traceback.print_exc()
+                continue
+            # Skip results which were superseded while the query was running
+            if generation == self._generation:
+                self.dataReady.emit(generation, data)
+
+    def _deliver(self, generation, data):
+        """Pass result to the callback if no newer query was submitted."""
+        if generation == self._generation and self._callback is not None:
+            callback, self._callback = self._callback, None
+            callback(data)
+
+
 class ViewController(QObject):
     """Main controller which communicates with QML GUI and controls all components."""
 
@@ -151,8 +408,12 @@ class ViewController(QObject):
         self._is2D = True
         self._is_heatmap = False
 
-        self._model3D = UniversalLocationListModel(on_change=self.modelChanged.emit)
-        self._model2D = UniversalLocationListModel(on_change=self.modelChanged.emit)
+        self._model3D = UniversalLocationListModel(
+            SingleLocation, on_change=self.modelChanged.emit
+        )
+        self._model2D = UniversalLocationListModel(
+            MultiLocation, on_change=self.modelChanged.emit
+        )
         self._map = Map()
 
         self._sideview_model = SideviewListModel(TabLocation)
@@ -179,16 +440,60 @@ class ViewController(QObject):
         self.items = None
         self.inventory = None
         self.orders = None
-
-        self._query_thread = None
+        # Relations between locations, items and orders (built on first use if None)
+        self._relations = None
+        # Version of relations, part of cached connector results keys
+        self._relations_version = 0
+        # Relations indexed by query thread for version of relations (used only
+        # by the query thread, relations are installed on GUI thread)
+        self._built_relations = (None, None)
+        self._connector_cache = ResultCache()
+        # As-of date of inventory used by connectors and plugins (None for latest)
+        self._date = None
+
+        self._query_scheduler = QueryScheduler(self)
+        self.relationsReady.connect(self._install_relations, Qt.QueuedConnection)
+        self._project_thread = None
+        self._export_thread = None
+        self._probe_threads = set()
         self._loader = None
+        # Imported files (dict with "file" and "types") and path of current project
+        self._sources = []
+        self._project_path = ""
+
+        # Fingerprints of loaded rows (see Document.fingerprints) used for reload
+        self._fingerprints = {}
+        self._loading = False
+        self._reload_queue = []
+        self._auto_reload = False
+        self._changed_files = set()
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._file_changed)
+        # Wait until the file is completely written before reloading
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(1000)
+        self._reload_timer.timeout.connect(self._reload_changed_files)
         self._progress_value = 1
+        self._progress_text = ""
+        self._progress_blocking = True
 
     modelChanged = Signal()
     sideviewChanged = Signal()
     drawModeChanged = Signal()
     itemSelected = Signal()
     progressChanged = Signal()
+    projectChanged = Signal()
+    autoReloadChanged = Signal()
+    inventoryDateChanged = Signal()
+    cacheStatsChanged = Signal()
+    # Emits version of relations and relations indexed by query thread
+    relationsReady = Signal(int, object)
+    exportChanged = Signal()
+    # Emits error message of failed export
+    exportFailed = Signal(str)
+    # Emits file url and list of sheets (see Document.probe)
+    sheetsProbed = Signal(QUrl, "QVariantList")
 
     @Property(QObject, constant=False, notify=modelChanged)
     def map(self):
@@ -246,6 +551,66 @@ class ViewController(QObject):
         self._progress_value = val
         self.progressChanged.emit()
 
+    @Property(str, constant=False, notify=progressChanged)
+    def progress_text(self):
+        """Description of currently loaded stage (sheet, rows and throughput)."""
+        return self._progress_text
+
+    @Property(bool, constant=False, notify=progressChanged)
+    def progress_blocking(self):
+        """Whether progress overlay blocks the app (false once first data is ready)."""
+        return self._progress_blocking
+
+    def _update_progress(self, value, text):
+        """Update progress of loading (callback function)."""
+        self._progress_text = text
+        # Value 1 is set after all data are processed (hides progress bar)
+        self.progress_value = min(value, 0.99)
+
+    def _release_progress(self):
+        """Make loaded data available while rest of the data is still loading."""
+        self._progress_blocking = False
+        self.progressChanged.emit()
+
+    @Property(str, constant=False, notify=projectChanged)
+    def project_path(self):
+        """Path of currently opened project file (empty if data aren't saved)."""
+        return self._project_path
+
+    @Property(bool, constant=False, notify=autoReloadChanged)
+    def auto_reload(self):
+        """Reload imported files automatically when they change on the disk."""
+        return self._auto_reload
+
+    @auto_reload.setter
+    def set_auto_reload(self, val):
+        """Enable/disable watching of imported files."""
+        self._auto_reload = val
+        self._update_watcher()
+        self.autoReloadChanged.emit()
+
+    @Property("QVariantList", constant=False, notify=inventoryDateChanged)
+    def inventory_dates(self):
+        """Dates of loaded inventory (dd.mm.yyyy) in ascending order."""
+        return [d.strftime(DATE_FORMAT) for d in sorted(self.inventory or {})]
+
+    @Property(str, constant=False, notify=inventoryDateChanged)
+    def inventory_date(self):
+        """Date of inventory valid as of selected date (empty if there is none)."""
+        date = snapshot_date(self.inventory or {}, self._date)
+        return date.strftime(DATE_FORMAT) if date is not None else ""
+
+    @inventory_date.setter
+    def set_inventory_date(self, val):
+        """Select as-of date of inventory used by connectors and plugins.
+
+        Args:
+            val (str): date in dd.mm.yyyy format, empty string for the latest date
+        """
+        self._date = datetime.strptime(val, DATE_FORMAT) if val else None
+        self._plugin_manager.set_date(self._date)
+        self.inventoryDateChanged.emit()
+
     @Property(QObject, constant=False, notify=drawModeChanged)
     def plugin_manager(self):
         """Get plugin manager for controlling and activating stats plugins."""
@@ -261,6 +626,15 @@ class ViewController(QObject):
         """Get picking agent manager for displaying positions and animation."""
         return self._agent_manager
 
+    @Slot()
+    def shutdown(self):
+        """Stop background workers before the application quits."""
+        self._query_scheduler.stop()
+        self._onto_manager.shutdown()
+        if self._export_thread is not None:
+            self._export_thread.cancel()
+            self._export_thread.wait()
+
     @Slot(result=bool)
     def is2D(self):
         """Select between 2D and 3D view."""
@@ -359,62 +733,214 @@ class ViewController(QObject):
             self._order_model.set_checked(names, not clear)
 
     # Connecting sidebar tabs
-    def _connect_tabs(self, src_tab_model, dst_tab_model, connector, locations=False):
-        """Run query and update tab model with resulting data."""
-
-        def callback(data):
-            """Process data from query (callback function)."""
-            names = [i[0].name for i in data]
-            dst_tab_model.set_checked(names)
-            self._query_thread = None
+    def _set_relations(self, relations=None):
+        """Replace relations, cached and running queries of old data are dropped.
+
+        Args:
+            relations (RelationIndex | QuadstoreRelations): new relations, None to
+                build them (RelationIndex) on use
+        """
+        self._relations = relations
+        self._relations_version += 1
+        self._connector_cache.clear()
+        self._query_scheduler.cancel()
+        self.cacheStatsChanged.emit()
+
+    def _relations_snapshot(self):
+        """Get current relations and data they are indexed from (on GUI thread).
+
+        Returns:
+            tuple: version of relations, relations (None if not indexed yet),
+                inventory and orders
+        """
+        return self._relations_version, self._relations, self.inventory, self.orders
+
+    def _install_relations(self, version, relations):
+        """Use relations indexed by query thread unless data changed meanwhile."""
+        if version == self._relations_version and self._relations is None:
+            self._relations = relations
+
+    def _query_relations(self, snapshot, connector, *args):
+        """Get names related to checked objects, relations are indexed on first use.
+
+        Runs on query thread, missing relations are indexed from the snapshot of
+        data and passed to GUI thread (relationsReady). Results are cached by the
+        connector and its arguments (ids of checked objects, as-of date), cached
+        results must not be modified.
+
+        Args:
+            snapshot (tuple): relations and data at the time of the request (see
+                _relations_snapshot)
+            connector (str): name of RelationIndex (or QuadstoreRelations) method
+                returning related names
+            *args: arguments of the connector, checked objects as Selection
+
+        Returns:
+            set[str]: names of related objects (tuple of sets for propagate)
+        """
+
+        version, relations, inventory, orders = snapshot
+
+        def compute():
+            """Run the connector over relations (cache miss)."""
+            index = relations
+            if index is None:
+                built_version, index = self._built_relations
+                if built_version != version:
+                    index = RelationIndex(inventory, orders)
+                    self._built_relations = (version, index)
+                    self.relationsReady.emit(version, index)
+            return getattr(index, connector)(*args)
+
+        key = (version, connector)
+        key += tuple(a.key() if isinstance(a, Selection) else a for a in args)
+        return self._connector_cache.get(key, compute)
+
+    @Property("QVariantMap", constant=False, notify=cacheStatsChanged)
+    def cache_stats(self):
+        """Get hit/miss counters and size of connector results cache."""
+        return {
+            "hits": self._connector_cache.hits,
+            "misses": self._connector_cache.misses,
+            "size": len(self._connector_cache),
+        }
+
+    def _connect_tabs(
+        self, src_tab_model, dst_tab_model, connector, *args, locations=False
+    ):
+        """Find related objects and check them in destination tab model.
+
+        Args:
+            src_tab_model (UniversalListModel): tab model with checked objects
+            dst_tab_model (UniversalListModel): model where related objects are checked
+            connector (str): name of RelationIndex method returning related names
+            *args: additional arguments of the connector (e.g. as-of date)
+            locations (bool): select related objects as locations on the map
+        """
+
+        def callback(related):
+            """Process names of related objects (callback function)."""
+            self.cacheStatsChanged.emit()
+            if src_tab_model.checked != checked:
+                # Selection changed while the query was running
+                return
+            related = [n for n in related if n in dst_tab_model._objects]
+            dst_tab_model.set_checked(related)
             if locations:
-                self._select_locations(names, checked=True, clear=True)
+                self._select_locations(related, checked=True, clear=True)
 
         if src_tab_model.checked:
-            objs = [src_tab_model._objects[k]._i for k in src_tab_model.checked]
-            if self._query_thread is None:
-                self._query_thread = QueryThread(connector, objs)
-                self._query_thread.dataReady.connect(callback, Qt.QueuedConnection)
-                self._query_thread.start()
+            checked = src_tab_model.checked.copy()
+            self._query_scheduler.submit(
+                callback,
+                self._query_relations,
+                self._relations_snapshot(),
+                connector,
+                checked,
+                *args,
+            )
         else:
+            self._query_scheduler.cancel()
             dst_tab_model.set_checked([])
 
+    @Slot(str)
+    def propagate_selection(self, source):
+        """Check objects related to checked objects of source tab in all tabs.
+
+        Relations are followed through all tabs in one pass (see
+        RelationIndex.propagate), tabs and map selection are updated together.
+
+        Args:
+            source (str): tab with checked objects ("locations", "items", "orders")
+        """
+        models = {
+            "locations": self._location_model,
+            "items": self._item_model,
+            "orders": self._order_model,
+        }
+        # Only checked objects of the source tab are propagated
+        checked = {
+            k: m.checked.copy() if k == source else Selection(m.checked.space)
+            for k, m in models.items()
+        }
+
+        def callback(related):
+            """Check related objects in all tabs (callback function)."""
+            self.cacheStatsChanged.emit()
+            if models[source].checked != checked[source]:
+                # Selection changed while the query was running
+                return
+            with self._plugin_manager.batch():
+                for model, names in zip(models.values(), related):
+                    model.set_checked([n for n in names if n in model._objects])
+            self._select_locations(
+                self._location_model.checked, checked=True, clear=True
+            )
+
+        if checked[source]:
+            self._query_scheduler.submit(
+                callback,
+                self._query_relations,
+                self._relations_snapshot(),
+                "propagate",
+                *checked.values(),
+                self._date,
+            )
+
     @Slot()
     def checked_locations_to_items(self):
         """Connect locations -> items tabs."""
         self._connect_tabs(
-            self._location_model, self._item_model, Item.get_by_locations
+            self._location_model,
+            self._item_model,
+            "items_by_locations",
+            self._date,
         )
 
     @Slot()
     def checked_orders_to_items(self):
         """Connect orders -> items tabs."""
-        self._connect_tabs(self._order_model, self._item_model, Item.get_by_orders)
+        self._connect_tabs(
+            self._order_model, self._item_model, "items_by_orders"
+        )
 
     @Slot()
     def checked_items_to_orders(self):
         """Connect items -> orders tabs."""
-        self._connect_tabs(self._item_model, self._order_model, Order.get_by_items)
+        self._connect_tabs(
+            self._item_model, self._order_model, "orders_by_items"
+        )
 
     @Slot()
     def checked_locations_to_orders(self):
         """Connect locations -> orders tabs."""
         self._connect_tabs(
-            self._location_model, self._order_model, Order.get_by_locations
+            self._location_model,
+            self._order_model,
+            "orders_by_locations",
+            self._date,
         )
 
     @Slot()
     def checked_orders_to_locations(self):
         """Connect orders -> locations tabs."""
         self._connect_tabs(
-            self._order_model, self._location_model, RackLocation.get_by_orders, True
+            self._order_model,
+            self._location_model,
+            "locations_by_orders",
+            self._date,
+            locations=True,
         )
 
     @Slot()
     def checked_items_to_locations(self):
         """Connect items -> locations tabs."""
         self._connect_tabs(
-            self._item_model, self._location_model, RackLocation.get_by_items, True
+            self._item_model,
+            self._location_model,
+            "locations_by_items",
+            self._date,
+            locations=True,
         )
 
     @Slot(int)
@@ -434,29 +960,172 @@ class ViewController(QObject):
         """Get list of indexes of selected locations inside the map."""
         return list(self.selected_idxs.keys())
 
-    @Slot(QUrl, result="QVariantList")
-    def get_sheets(self, file_path):  # skipcq: PYL-R0201
-        """Get names of sheets inside the file and expected type.
+    @Slot(QUrl)
+    def probe_sheets(self, file_path):
+        """Read sheets of the file in background, result is emitted by sheetsProbed.
+
+        Only sheet metadata and headers are read, see Document.probe.
 
         Args:
             file_path (QUrl): file url
+        """
 
-        Returns:
-            list[tuple[str, str]]: list containing lists [[name, type_name], ...]
+        def probe(path):
+            """Probe the file, return empty list if the file can't be read."""
+            try:
+                return Document.probe(path)
+            except Exception:  # skipcq: PYL-W0703
+                return []
+
+        def callback(sheets):
+            """Emit probed sheets (callback function)."""
+            self._probe_threads.discard(thread)
+            self.sheetsProbed.emit(file_path, sheets)
+
+        thread = QueryThread(probe, file_path.toLocalFile())
+        thread.dataReady.connect(callback, Qt.QueuedConnection)
+        # Keep reference to the thread until it finishes
+        self._probe_threads.add(thread)
+        thread.start()
+
+    @Property(bool, constant=False, notify=exportChanged)
+    def exporting(self):
+        """Check if ontology is being exported."""
+        return self._export_thread is not None
+
+    @Slot(QUrl, str, str)
+    def export_ontology(self, file_path, extension, scope):
+        """Export ontology into file in background.
+
+        Args:
+            file_path (QUrl): file url object
+            extension (str): extension added if file has no known extension
+                (".nt", ".nt.gz", ".rdf" or ".rdf.gz")
+            scope (str): "all", "schema" (classes and properties including custom
+                classes) or "date" (inventory of selected date only)
         """
-        return Document.get_sheet_names(file_path.toLocalFile())
+        file_path = file_path.toLocalFile()
+        if not file_path.endswith((".nt", ".rdf", ".owl", ".gz")):
+            file_path += extension
+        if self._export_thread is not None:
+            self._export_thread.cancel()
+            self._export_thread.wait()
+        thread = ExportThread(
+            file_path, scope, snapshot_date(self.inventory or {}, self._date)
+        )
+
+        def callback(error):
+            """Hide progress of finished export (callback function)."""
+            if self._export_thread is not thread:
+                return
+            self._export_thread = None
+            self.exportChanged.emit()
+            self._progress_text = ""
+            self.progress_value = 1
+            if error:
+                self.exportFailed.emit(error)
+
+        self._export_thread = thread
+        # Indeterminate progress while records are materialized, RDF/XML is
+        # written at once
+        self._progress_text = f"Exporting {export_format(file_path)}"
+        self._progress_blocking = False
+        self.progress_value = 0
+        thread.progressChanged.connect(self._update_progress, Qt.QueuedConnection)
+        thread.finished.connect(callback, Qt.QueuedConnection)
+        thread.start()
+        self.exportChanged.emit()
+
+    @Slot()
+    def cancel_export(self):
+        """Cancel running export of ontology."""
+        if self._export_thread is not None:
+            self._export_thread.cancel()
 
     @Slot(QUrl)
-    def save_ontology(self, file_path):  # skipcq: PYL-R0201
-        """Save ontology in RDF/XML format.
+    def save_project(self, file_path):
+        """Save warehouse data, custom classes and queries into project file.
+
+        Args:
+            file_path (QUrl): file url object, empty url saves current project
+        """
+        file_path = file_path.toLocalFile() or self._project_path
+        if not file_path.endswith(PROJECT_EXT):
+            file_path += PROJECT_EXT
+
+        def callback(changes):
+            """Update project path once the project is saved (callback function)."""
+            # Backend is switched on GUI thread, the copy must be repeated if the
+            # quadstore was modified in the meantime
+            if changes is not None and not use_project_file(file_path, changes):
+                self.save_project(QUrl.fromLocalFile(file_path))
+                return
+            self._project_path = file_path
+            self._project_thread = None
+            self.projectChanged.emit()
+            self.progress_value = 1
+
+        self.progress_value = 0
+        self._project_thread = QueryThread(
+            _with_ontology(save_project),
+            file_path,
+            {
+                "locations": self.locations,
+                "items": self.items,
+                "inventory": self.inventory,
+                "orders": self.orders,
+            },
+            self._onto_manager.classes,
+            self._onto_manager.queries,
+            self._sources,
+        )
+        self._project_thread.dataReady.connect(callback, Qt.QueuedConnection)
+        self._project_thread.start()
+
+    @Slot(QUrl, result=str)
+    def open_project(self, file_path):
+        """Open project file, objects are loaded from the file on access.
 
         Args:
             file_path (QUrl): file url object
+
+        Returns:
+            str: error message, empty string if project was opened
         """
         file_path = file_path.toLocalFile()
-        if file_path[-4:] != ".rdf":
-            file_path += ".rdf"
-        save_ontology(file_path)
+        try:
+            project = open_project(file_path)
+        except ValueError as e:
+            return str(e)
+
+        self._loader = None
+        # Records of current data are replaced by individuals of the project
+        store.reset()
+        self._plugin_manager.reset()
+        self._item_model.clear()
+        self._order_model.clear()
+        data = project["data"]
+        self.inventory = data["inventory"]
+        self._set_relations()
+        self.inventoryDateChanged.emit()
+        if data["locations"] is not None:
+            self._load_locations(data["locations"])
+        if data["items"] is not None:
+            self._load_items(data["items"])
+        if data["orders"] is not None:
+            self._load_orders(data["orders"])
+        self._onto_manager.set_objects(project["classes"], project["queries"])
+        # Individuals of the project are loaded on access, connectors query them
+        # directly in the quadstore
+        self._set_relations(QuadstoreRelations())
+
+        self._sources = project["sources"]
+        self._fingerprints = {}
+        self._update_watcher()
+        self._project_path = file_path
+        self.projectChanged.emit()
+        self._load_frequencies()
+        return ""
 
     @Slot(QUrl, "QVariantList")
     def load(self, file_path, types):
@@ -469,14 +1138,55 @@ class ViewController(QObject):
                 There are 6 types ("None", "Locations", "Coordinates", "Items",
                 "Inventory", "Orders")
         """
+        path = file_path.toLocalFile()
+        # Data of sheet types loaded from the file replace data from older files,
+        # so the older files are no longer reloaded into them
+        loaded = _loaded_types(types)
+        sources = []
+        for source in self._sources:
+            kept = [t for t in source["types"] if t["type"] not in loaded]
+            if source["file"] != path and _loaded_types(kept):
+                sources.append({"file": source["file"], "types": kept})
+        self._sources = sources
+        self._sources.append({"file": path, "types": types})
+        self._update_watcher()
+        self._start_loader(path, types)
+
+    @Slot()
+    def reload(self):
+        """Reload all imported files, only changed rows are applied."""
+        self._queue_reload([f for s in self._sources for f in _source_files(s)])
+
+    def _start_loader(self, path, types, reload=False):
+        """Start loading thread.
+
+        Args:
+            path (str): path of the file
+            types (list[dict[str, str]]): types of sheets (see load)
+            reload (bool): apply only changes against currently loaded data
+        """
+        self._loading = True
+        if not reload:
+            reloaded = {t["type"] for t in types}
+            self._plugin_manager.reset()
+            # Clear tabs which are reloaded, data are available once they are parsed
+            if "Items" in reloaded:
+                self._item_model.clear()
+            if "Orders" in reloaded:
+                self._order_model.clear()
+
+        self._progress_text = ""
+        # Reload keeps current data available
+        self._progress_blocking = not reload
         self.progress_value = 0
         self._loader = DataLoaderThread(
-            file_path.toLocalFile(),
+            path,
             types,
             self.locations,
             self.items,
             self.inventory,
             self.orders,
+            fingerprints=self._fingerprints if reload else None,
         )
         self._loader.locationsReady.connect(self._load_locations, Qt.QueuedConnection)
         self._loader.itemsReady.connect(self._load_items, Qt.QueuedConnection)
@@ -485,10 +1195,76 @@ class ViewController(QObject):
         self._loader.frequenciesReady.connect(
             self._load_frequencies, Qt.QueuedConnection
         )
+        self._loader.progressChanged.connect(self._update_progress, Qt.QueuedConnection)
         self._loader.start()
 
+    def _queue_reload(self, files):
+        """Reload sources of given files one by one."""
+        files = set(files)
+        for source in self._sources:
+            watched = not files.isdisjoint(_source_files(source))
+            if watched and source not in self._reload_queue:
+                self._reload_queue.append(source)
+        self._reload_next()
+
+    def _reload_next(self):
+        """Start reload of next queued source if no data are being loaded."""
+        while not self._loading and self._reload_queue:
+            source = self._reload_queue.pop(0)
+            if os.path.exists(source["file"]):
+                self._start_loader(source["file"], source["types"], reload=True)
+
+    def _update_watcher(self):
+        """Watch imported files if auto reload is enabled."""
+        if self._watcher.files():
+            self._watcher.removePaths(self._watcher.files())
+        if self._auto_reload:
+            files = [
+                f for s in self._sources for f in _source_files(s) if os.path.exists(f)
+            ]
+            if files:
+                self._watcher.addPaths(files)
+
+    def _file_changed(self, path):
+        """Schedule reload of changed file (callback function)."""
+        # File replaced by new one (e.g. on save) is removed from watched files
+        if path not in self._watcher.files() and os.path.exists(path):
+            self._watcher.addPath(path)
+        self._changed_files.add(path)
+        self._reload_timer.start()
+
+    def _reload_changed_files(self):
+        """Reload files changed since last reload (callback function)."""
+        files, self._changed_files = self._changed_files, set()
+        self._queue_reload(files)
+
+    def _loader_changes(self, *sheet_types):
+        """Get changes applied by reload of sheets with given types.
+
+        Returns:
+            tuple[set[str], set[str], set[str]]: inserted, updated and deleted keys,
+                None if the sheets were loaded from scratch
+        """
+        if self._loader is None:
+            return None
+        loaded = self._loader.changes
+        changes = [loaded[t] for t in sheet_types if t in loaded]
+        if not changes:
+            return None
+        return tuple(set().union(*c) for c in zip(*changes))
+
     def _load_locations(self, locations):
         """Process loaded locations (callback function)."""
+        changes = self._loader_changes("Locations", "Coordinates")
+        if changes is not None and not any(changes):
+            self.locations = locations
+            self._release_progress()
+            return
+        # Checked locations which still exist are selected again after reload
+        checked = []
+        if changes is not None:
+            checked = sorted(n for n in self._location_model.checked if n in locations)
+
         self.selected_idxs.clear()
         self.locations = locations
 
@@ -502,45 +1278,79 @@ class ViewController(QObject):
 
         self._sideview_model.set_data(locations)
 
-        self._model3D.set_data(
-            {k: SingleLocation(v) for k, v in self.locations.items()}
-        )
+        # Locations are wrapped by SingleLocation/MultiLocation once a view needs them
+        self._model3D.set_data(self.locations)
 
         clusters = cluster_locations(self.locations)
         multi_loc = {}
         for k, v in clusters.items():
-            multi_loc[k] = MultiLocation([self.locations[l] for l in v])
+            multi_loc[k] = [self.locations[l] for l in v]
         self._model2D.set_data(multi_loc)
 
         self.modelChanged.emit()
-        self.progress_value = 0.3
+        if checked:
+            self._location_model.set_checked(checked)
+            self._select_locations(checked, checked=True, clear=True)
+        self._release_progress()
 
     def _load_items(self, items):
         """Process loaded items (callback function)."""
         self.items = items
-        self._item_model.clear_checked()
-        self._item_model.set_data(items)
-        self._item_model.set_selected(list(items.keys()))
-        self.progress_value = 0.5
+        changes = self._loader_changes("Items")
+        if changes is None:
+            self._item_model.clear_checked()
+            self._item_model.set_data(items)
+            self._item_model.set_selected(list(items.keys()))
+        else:
+            self._item_model.update_data(items, *changes)
+        self._release_progress()
 
     def _load_inventory(self, inventory):
         """Process loaded inventory (callback function)."""
         self.inventory = inventory
-        self.progress_value = 0.7
+        self._set_relations()
+        self.inventoryDateChanged.emit()
 
     def _load_orders(self, orders):
         """Process loaded orders (callback function)."""
         self.orders = orders
-        self._order_model.clear_checked()
-        self._order_model.set_data(orders)
-        self._order_model.set_selected(list(orders.keys()))
-        self.progress_value = 0.9
+        self._set_relations()
+        changes = self._loader_changes("Orders")
+        if changes is None:
+            self._order_model.clear_checked()
+            self._order_model.set_data(orders)
+            self._order_model.set_selected(list(orders.keys()))
+        else:
+            self._order_model.update_data(orders, *changes)
+        self._release_progress()
 
     def _load_frequencies(self):
         """Update frequencies (callback function)."""
+        if self._loader is not None:
+            self._fingerprints.update(self._loader.fingerprints)
+            self._set_relations(self._loader.relations)
+            # Custom classes and queries depending on changed data are refreshed
+            changes = self._loader.changes
+            self._onto_manager.refresh(
+                {
+                    s["type"]
+                    for s in self._loader.sheets
+                    if s["type"] not in changes or any(changes[s["type"]])
+                }
+            )
+        # Plugins recalculate frequencies of current selection with new data,
+        # quantities of opened project are aggregated in quadstore
+        quadstore = self._relations
+        if not isinstance(quadstore, QuadstoreRelations):
+            quadstore = None
         self._plugin_manager.set_data(
-            self.locations, self.items, self.orders, self.inventory
+            self.locations, self.items, self.orders, self.inventory, quadstore
         )
 
+        self._progress_text = ""
+        self._progress_blocking = True
         self.progress_value = 1
         self.drawModeChanged.emit()
+
+        self._loading = False
+        self._reload_next()